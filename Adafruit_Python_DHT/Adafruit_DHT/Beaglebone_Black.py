@@ -194,7 +194,18 @@ pin_to_gpio = {
     "71": (2,7)
 }
 
-def read(sensor, pin):
+def _check(result, humidity, temp):
+    if result in common.TRANSIENT_ERRORS:
+        # Signal no result could be obtained, but the caller can retry.
+        return (None, None)
+    elif result == common.DHT_ERROR_GPIO:
+        raise RuntimeError('Error accessing GPIO. Make sure program is run as root with sudo!')
+    elif result != common.DHT_SUCCESS:
+        # Some kind of error occured.
+        raise RuntimeError('Error calling DHT test driver read: {0}'.format(result))
+    return (humidity, temp)
+
+def _gpio(pin):
     # Validate GPIO and map it to GPIO base and number.
     gpio = pin_to_gpio.get(str(pin).upper(), None)
     if gpio is None:
@@ -204,14 +215,40 @@ def read(sensor, pin):
             gpio = (int(match.group(1)), int(match.group(2)))
     if gpio is None or gpio[0] < 0 or gpio[0] > 3 or gpio[1] < 0 or gpio[1] > 31:
         raise ValueError('Pin must be a valid GPIO identifier like P9_12 or GPIO1_28.')
+    return gpio
+
+def read(sensor, pin):
+    gpio = _gpio(pin)
     # Get a reading from C driver code.
     result, humidity, temp = driver.read(sensor, gpio[0], gpio[1])
-    if result in common.TRANSIENT_ERRORS:
-        # Signal no result could be obtained, but the caller can retry.
-        return (None, None)
-    elif result == common.DHT_ERROR_GPIO:
-        raise RuntimeError('Error accessing GPIO. Make sure program is run as root with sudo!')
-    elif result != common.DHT_SUCCESS:
-        # Some kind of error occured.
-        raise RuntimeError('Error calling DHT test driver read: {0}'.format(result))
-    return (humidity, temp)
+    return _check(result, humidity, temp)
+
+def bind(sensor, pin):
+    """Return a function that reads the sensor, with the pin validated and
+    mapped once here instead of on every read."""
+    base, number = _gpio(pin)
+    def read_bound():
+        result, humidity, temp = driver.read(sensor, base, number)
+        return _check(result, humidity, temp)
+    return read_bound
+
+def open(sensor, pin):
+    """Open the sensor for repeated reads with read_session and return its
+    handle. GPIO is set up once here instead of on every read."""
+    gpio = _gpio(pin)
+    result, handle = driver.open(sensor, gpio[0], gpio[1])
+    _check(result, None, None)
+    return handle
+
+def read_session(handle):
+    result, humidity, temp = driver.read_session(handle)
+    return _check(result, humidity, temp)
+
+def read_diagnostics(handle):
+    """Read an open sensor and return the driver's raw tuple of result code,
+    humidity, temperature, pulse counts, threshold, timeout count and elapsed
+    microseconds. Errors are returned as result codes, not raised."""
+    return driver.read_diagnostics(handle)
+
+def close(handle):
+    driver.close(handle)
@@ -21,12 +21,7 @@
 from . import common
 from . import Raspberry_Pi_Driver as driver
 
-def read(sensor, pin):
-    # Validate pin is a valid GPIO.
-    if pin is None or int(pin) < 0 or int(pin) > 31:
-        raise ValueError('Pin must be a valid GPIO number 0 to 31.')
-    # Get a reading from C driver code.
-    result, humidity, temp = driver.read(sensor, int(pin))
+def _check(result, humidity, temp):
     if result in common.TRANSIENT_ERRORS:
         # Signal no result could be obtained, but the caller can retry.
         return (None, None)
@@ -38,3 +33,46 @@ def read(sensor, pin):
         # Some kind of error occured.
         raise RuntimeError('Error calling DHT test driver read: {0}'.format(result))
     return (humidity, temp)
+
+def read(sensor, pin):
+    # Validate pin is a valid GPIO.
+    if pin is None or int(pin) < 0 or int(pin) > 31:
+        raise ValueError('Pin must be a valid GPIO number 0 to 31.')
+    # Get a reading from C driver code.
+    result, humidity, temp = driver.read(sensor, int(pin))
+    return _check(result, humidity, temp)
+
+def bind(sensor, pin):
+    """Return a function that reads the sensor, with the pin validated and
+    mapped once here instead of on every read."""
+    # Validate pin is a valid GPIO.
+    if pin is None or int(pin) < 0 or int(pin) > 31:
+        raise ValueError('Pin must be a valid GPIO number 0 to 31.')
+    pin = int(pin)
+    def read_bound():
+        result, humidity, temp = driver.read(sensor, pin)
+        return _check(result, humidity, temp)
+    return read_bound
+
+def open(sensor, pin):
+    """Open the sensor for repeated reads with read_session and return its
+    handle. GPIO is set up once here instead of on every read."""
+    # Validate pin is a valid GPIO.
+    if pin is None or int(pin) < 0 or int(pin) > 31:
+        raise ValueError('Pin must be a valid GPIO number 0 to 31.')
+    result, handle = driver.open(sensor, int(pin))
+    _check(result, None, None)
+    return handle
+
+def read_session(handle):
+    result, humidity, temp = driver.read_session(handle)
+    return _check(result, humidity, temp)
+
+def read_diagnostics(handle):
+    """Read an open sensor and return the driver's raw tuple of result code,
+    humidity, temperature, pulse counts, threshold, timeout count and elapsed
+    microseconds. Errors are returned as result codes, not raised."""
+    return driver.read_diagnostics(handle)
+
+def close(handle):
+    driver.close(handle)
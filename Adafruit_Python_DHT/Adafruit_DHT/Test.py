@@ -21,9 +21,7 @@
 from . import common
 from . import Test_Driver as driver
 
-def read(sensor, pin):
-    # Get a reading from C driver code.
-    result, humidity, temp = driver.read(sensor, pin)
+def _check(result, humidity, temp):
     if result in common.TRANSIENT_ERRORS:
         # Signal no result could be obtained, but the caller can retry.
         return (None, None)
@@ -31,3 +29,90 @@ def read(sensor, pin):
         # Some kind of error occured.
         raise RuntimeError('Error calling DHT test driver read: {0}'.format(result))
     return (humidity, temp)
+
+def read(sensor, pin):
+    # Get a reading from C driver code.
+    result, humidity, temp = driver.read(sensor, pin)
+    return _check(result, humidity, temp)
+
+def bind(sensor, pin):
+    """Return a function that reads the sensor, with the pin validated and
+    mapped once here instead of on every read."""
+    def read_bound():
+        result, humidity, temp = driver.read(sensor, pin)
+        return _check(result, humidity, temp)
+    return read_bound
+
+def open(sensor, pin):
+    """Open the mock sensor for repeated reads with read_session and return
+    its handle."""
+    result, handle = driver.open(sensor, pin)
+    _check(result, None, None)
+    return handle
+
+def read_session(handle):
+    result, humidity, temp = driver.read_session(handle)
+    return _check(result, humidity, temp)
+
+def read_diagnostics(handle):
+    """Read an open sensor and return the driver's raw tuple of result code,
+    humidity, temperature, pulse counts, threshold, timeout count and elapsed
+    microseconds. Errors are returned as result codes, not raised."""
+    return driver.read_diagnostics(handle)
+
+def close(handle):
+    driver.close(handle)
+
+# The mock sensor below is shared by every read and session. By default it
+# answers 50% and 42C at once and never fails.
+
+def set_latency(seconds, jitter=0.0):
+    """Make every mock read take seconds plus a random 0 to jitter seconds,
+    like a read on real hardware."""
+    driver.set_latency(int(seconds * 1000), int(jitter * 1000))
+
+def set_setup(seconds):
+    """Make every one-shot read and every session open take seconds more,
+    like mapping GPIO and setting up the pin on real hardware. Session reads
+    skip it, as they do on hardware."""
+    driver.set_setup(int(seconds * 1000))
+
+def set_errors(checksum=0.0, timeout=0.0):
+    """Make mock reads fail with a checksum error or a timeout with these
+    probabilities (0 to 1), which read() turns into (None, None)."""
+    driver.set_errors(checksum, timeout)
+
+def set_values(values):
+    """Make good mock reads cycle through a sequence of (humidity,
+    temperature) pairs."""
+    driver.set_sequence([(float(h), float(t)) for h, t in values])
+
+def set_random_walk(humidity, temperature, humidity_step=0.5, temperature_step=0.1):
+    """Make good mock reads wander from humidity and temperature by up to the
+    steps either way each time."""
+    driver.set_random_walk(humidity, temperature, humidity_step, temperature_step)
+
+def seed(value):
+    """Seed the random latency jitter, errors and random walk, so runs can
+    be repeated."""
+    driver.seed(value)
+
+def configure(latency=0.0, jitter=0.0, checksum=0.0, timeout=0.0, values=None, walk=None, seed=None,
+              setup=0.0):
+    """Reset the mock sensor and set it up in one go. Values is a sequence of
+    (humidity, temperature) pairs and walk a tuple of arguments to
+    set_random_walk(); the other parameters are as in the functions above."""
+    reset()
+    set_latency(latency, jitter)
+    set_setup(setup)
+    set_errors(checksum, timeout)
+    if values is not None:
+        set_values(values)
+    if walk is not None:
+        set_random_walk(*walk)
+    if seed is not None:
+        driver.seed(seed)
+
+def reset():
+    """Put the mock sensor back to its defaults."""
+    driver.reset()
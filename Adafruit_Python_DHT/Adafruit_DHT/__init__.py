@@ -18,4 +18,7 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-from .common import DHT11, DHT22, AM2302, read, read_retry
+from .common import DHT11, DHT22, AM2302, Diagnostics, DHTSensor, DHTSession, read, read_async, read_retry
+from .filters import DHTFilter, FilterStats
+from .retry import Reading, RetryingSensor, RetryPolicy, SensorStats
+from .sampler import DHTSampler
@@ -18,7 +18,9 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import threading
 import time
+from collections import namedtuple
 
 from . import platform_detect
 
@@ -31,15 +33,43 @@ DHT_ERROR_ARGUMENT = -3
 DHT_ERROR_GPIO     = -4
 TRANSIENT_ERRORS = [DHT_ERROR_CHECKSUM, DHT_ERROR_TIMEOUT]
 
+# Result of DHTSession.read_diagnostics(). Result is the driver's result code
+# (DHT_SUCCESS or an error constant above) and humidity and temperature are None
+# unless it is DHT_SUCCESS. Pulses are the loop counts of each low and high
+# pulse, starting with the DHT's response; threshold is the average low count
+# that high pulses are compared to, and margins are each data bit's high count
+# minus threshold (negative for a 0 bit, positive for a 1 bit, near zero when
+# the decision was close). A pulse that reached max_count timed out. Elapsed is
+# the seconds from the start signal to the last pulse.
+Diagnostics = namedtuple('Diagnostics',
+                         'result humidity temperature pulses threshold margins max_count elapsed')
+
 # Define sensor type constants.
 DHT11  = 11
 DHT22  = 22
 AM2302 = 22
 SENSORS = [DHT11, DHT22, AM2302]
 
+# Platform interface found by get_platform(), detected once per process.
+_platform = None
+
+# One lock for all GPIO access in the process. The C drivers run a read
+# without the GIL, and reads on different pins aren't independent either: a
+# pin's mode is set with a read-modify-write of a function select register
+# shared by ten GPIOs, and the GPIO mapping and busy wait calibration are
+# process-wide, so two concurrent reads could undo each other's pin setup.
+# Other Python threads still run during a read.
+_hardware_lock = threading.Lock()
+
 
 def get_platform():
     """Return a DHT platform interface for the currently detected platform."""
+    global _platform
+    if _platform is None:
+        _platform = _detect_platform()
+    return _platform
+
+def _detect_platform():
     plat = platform_detect.platform_detect()
     if plat == platform_detect.RASPBERRY_PI:
         # Check for version 1 or 2 of the pi.
@@ -78,7 +108,28 @@ def read(sensor, pin, platform=None):
         raise ValueError('Expected DHT11, DHT22, or AM2302 sensor value.')
     if platform is None:
         platform = get_platform()
-    return platform.read(sensor, pin)
+    with _hardware_lock:
+        return platform.read(sensor, pin)
+
+def read_async(sensor, pin, platform=None, executor=None):
+    """Read DHT sensor like read(), but in an executor so an asyncio event
+    loop keeps running meanwhile. Returns a future to await for the tuple of
+    humidity and temperature, for example:
+
+        humidity, temperature = await Adafruit_DHT.read_async(DHT22, 4)
+
+    The C drivers release the GIL during a read, so other threads run too;
+    reads from several threads still take turns. Executor defaults to the event
+    loop's default thread pool. Call it from a coroutine or callback running
+    in the event loop.
+    """
+    import asyncio
+    if sensor not in SENSORS:
+        raise ValueError('Expected DHT11, DHT22, or AM2302 sensor value.')
+    if platform is None:
+        platform = get_platform()
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(executor, read, sensor, pin, platform)
 
 def read_retry(sensor, pin, retries=15, delay_seconds=2, platform=None):
     """Read DHT sensor of specified sensor type (DHT11, DHT22, or AM2302) on
@@ -90,9 +141,107 @@ def read_retry(sensor, pin, retries=15, delay_seconds=2, platform=None):
     of (None, None) is returned. The delay between retries is by default 2
     seconds, but can be overridden.
     """
-    for i in range(retries):
-        humidity, temperature = read(sensor, pin, platform)
-        if humidity is not None and temperature is not None:
-            return (humidity, temperature)
-        time.sleep(delay_seconds)
-    return (None, None)
+    return DHTSensor(sensor, pin, platform).read_retry(retries, delay_seconds)
+
+class DHTSensor(object):
+    """DHT sensor of specified sensor type (DHT11, DHT22, or AM2302) on
+    specified pin. The sensor type, platform and pin are checked and resolved
+    once here, so read() goes straight to the C driver; use it instead of the
+    read function when the same sensor is read over and over. Platform works
+    like in read().
+    """
+
+    def __init__(self, sensor, pin, platform=None):
+        if sensor not in SENSORS:
+            raise ValueError('Expected DHT11, DHT22, or AM2302 sensor value.')
+        if platform is None:
+            platform = get_platform()
+        self.sensor = sensor
+        self.pin = pin
+        self.platform = platform
+        self._read = platform.bind(sensor, pin)
+        self._lock = _hardware_lock
+
+    def read(self):
+        """Read the sensor once and return a tuple of humidity and temperature,
+        or (None, None) if the read should be retried, like read()."""
+        with self._lock:
+            return self._read()
+
+    def read_retry(self, retries=15, delay_seconds=2):
+        """Read the sensor until a good reading is found, like read_retry()."""
+        read = self.read
+        for i in range(retries):
+            humidity, temperature = read()
+            if humidity is not None and temperature is not None:
+                return (humidity, temperature)
+            time.sleep(delay_seconds)
+        return (None, None)
+
+class DHTSession(object):
+    """Open DHT sensor of specified sensor type (DHT11, DHT22, or AM2302) on
+    specified pin for repeated reads. GPIO is mapped and the pin configured
+    once when the session is opened and kept that way between reads, so
+    read() only does the timing critical part and holds real time priority
+    just for that. The pin stays driven high between reads until close() is
+    called, or the session is used as a context manager; after a read that
+    timed out it is left an input, held high by the pull-up, until the next
+    read. Platform works like in read().
+    """
+
+    def __init__(self, sensor, pin, platform=None):
+        if sensor not in SENSORS:
+            raise ValueError('Expected DHT11, DHT22, or AM2302 sensor value.')
+        if platform is None:
+            platform = get_platform()
+        self.sensor = sensor
+        self.pin = pin
+        self._platform = platform
+        self._lock = _hardware_lock
+        with self._lock:
+            self._handle = platform.open(sensor, pin)
+
+    def read(self):
+        """Read the sensor once and return a tuple of humidity and temperature,
+        or (None, None) if the read should be retried, like read()."""
+        with self._lock:
+            if self._handle is None:
+                raise RuntimeError('DHT session is closed.')
+            return self._platform.read_session(self._handle)
+
+    def read_retry(self, retries=15, delay_seconds=2):
+        """Read the sensor until a good reading is found, like read_retry()."""
+        for i in range(retries):
+            humidity, temperature = self.read()
+            if humidity is not None and temperature is not None:
+                return (humidity, temperature)
+            time.sleep(delay_seconds)
+        return (None, None)
+
+    def read_diagnostics(self):
+        """Read the sensor once like read(), but also return the raw pulse
+        timing of the read as Diagnostics, for tuning and troubleshooting.
+        Transient and other driver errors are reported in Diagnostics.result
+        instead of raised."""
+        with self._lock:
+            if self._handle is None:
+                raise RuntimeError('DHT session is closed.')
+            result, humidity, temperature, pulses, threshold, max_count, elapsed = \
+                self._platform.read_diagnostics(self._handle)
+        if result != DHT_SUCCESS:
+            humidity = temperature = None
+        margins = [count - threshold for count in pulses[3::2]]
+        return Diagnostics(result, humidity, temperature, list(pulses), threshold, margins,
+                           max_count, elapsed / 1e6)
+
+    def close(self):
+        with self._lock:
+            if self._handle is not None:
+                self._platform.close(self._handle)
+                self._handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
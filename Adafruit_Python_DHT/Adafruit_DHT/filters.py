@@ -0,0 +1,151 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import bisect
+from collections import deque
+
+from . import common
+from .retry import _monotonic
+
+
+# Measuring range of each sensor type from the datasheets, as
+# ((humidity low, high), (temperature low, high)). Anything outside is a glitch.
+RANGES = {
+    common.DHT11: ((20.0, 90.0), (0.0, 50.0)),
+    common.DHT22: ((0.0, 100.0), (-40.0, 80.0)),
+}
+
+# Smallest step each sensor type reports (humidity, temperature); a change of
+# one step passes the rate limit whatever the time between samples.
+RESOLUTIONS = {
+    common.DHT11: (1.0, 1.0),
+    common.DHT22: (0.1, 0.1),
+}
+
+
+class FilterStats(object):
+    """Counts of the samples a DHTFilter has seen."""
+
+    def __init__(self):
+        self.samples = 0        # calls to update()
+        self.missing = 0        # values that were None (failed reads)
+        self.out_of_range = 0   # values outside the sensor's range
+        self.too_fast = 0       # values that changed faster than max_rate
+        self.resyncs = 0        # times a run of too fast values was accepted
+
+    @property
+    def rejected(self):
+        return self.out_of_range + self.too_fast
+
+    def __repr__(self):
+        return 'samples={0} missing={1} out_of_range={2} too_fast={3} resyncs={4}'.format(
+            self.samples, self.missing, self.out_of_range, self.too_fast, self.resyncs)
+
+
+class _Channel(object):
+    # Range check, rate limit and rolling median of one quantity.
+
+    def __init__(self, low, high, max_rate, step, window, max_rejects, stats):
+        self.low = low
+        self.high = high
+        self.max_rate = max_rate
+        self.step = step
+        self.max_rejects = max_rejects
+        self.stats = stats
+        self.recent = deque(maxlen=window)  # accepted values, oldest first
+        self.ordered = []                   # the same values, sorted
+        self.last = None                    # last accepted value and its time
+        self.last_time = None
+        self.rejects = 0                    # too fast values in a row
+
+    def update(self, value, t):
+        if value is None:
+            self.stats.missing += 1
+            return self.median()
+        if not self.low <= value <= self.high:
+            self.stats.out_of_range += 1
+            return self.median()
+        if self.last is not None and self.max_rate is not None:
+            allowed = self.max_rate * max(t - self.last_time, 0.0) + self.step
+            if abs(value - self.last) > allowed:
+                self.rejects += 1
+                if self.rejects <= self.max_rejects:
+                    self.stats.too_fast += 1
+                    return self.median()
+                # It kept reading the new level, so it is real: start over from it.
+                self.stats.resyncs += 1
+                self.recent.clear()
+                del self.ordered[:]
+        self.rejects = 0
+        self.last = value
+        self.last_time = t
+        if len(self.recent) == self.recent.maxlen:
+            del self.ordered[bisect.bisect_left(self.ordered, self.recent[0])]
+        self.recent.append(value)
+        bisect.insort(self.ordered, value)
+        return self.median()
+
+    def median(self):
+        n = len(self.ordered)
+        if not n:
+            return None
+        if n % 2:
+            return self.ordered[n // 2]
+        return (self.ordered[n // 2 - 1] + self.ordered[n // 2]) / 2.0
+
+
+class DHTFilter(object):
+    """Streaming clean-up of readings from a DHT sensor of specified sensor
+    type (DHT11, DHT22, or AM2302), one (humidity, temperature) pair at a
+    time in constant memory and time.
+
+    Each value is checked against the sensor's measuring range (RANGES) and
+    against max_rate, the most humidity (%) and temperature (C) can change
+    per second, measured from the last accepted value. Values that pass go
+    into a rolling median over the last window accepted values, which
+    update() returns. A rejected or missing value leaves the median as it
+    was, so single sample glitches never show up in the output. If more than
+    max_rejects values in a row are too fast, the level really changed and
+    the filter restarts from the new value. Set max_rate to None to turn off
+    rate limiting. Stats holds a FilterStats of the samples seen.
+    """
+
+    def __init__(self, sensor, window=5, max_rate=(5.0, 1.0), max_rejects=3, ranges=None):
+        if sensor not in common.SENSORS:
+            raise ValueError('Expected DHT11, DHT22, or AM2302 sensor value.')
+        if window < 1:
+            raise ValueError('Window must hold at least one value.')
+        self.sensor = sensor
+        self.stats = FilterStats()
+        ranges = ranges or RANGES[sensor]
+        max_rate = max_rate or (None, None)
+        self._channels = [
+            _Channel(low, high, rate, step, window, max_rejects, self.stats)
+            for (low, high), rate, step in zip(ranges, max_rate, RESOLUTIONS[sensor])
+        ]
+
+    def update(self, humidity, temperature, timestamp=None):
+        """Add a reading taken at timestamp (seconds, the monotonic clock now
+        if None) and return the filtered (humidity, temperature). Either is
+        None until its first value is accepted."""
+        t = _monotonic() if timestamp is None else timestamp
+        self.stats.samples += 1
+        return (self._channels[0].update(humidity, t),
+                self._channels[1].update(temperature, t))
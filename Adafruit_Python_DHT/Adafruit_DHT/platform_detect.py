@@ -24,6 +24,7 @@
 # TODO: Add dependency on Adafruit Python GPIO and use its platform detect
 # functions.
 
+import functools
 import platform
 import re
 
@@ -33,6 +34,19 @@ RASPBERRY_PI     = 1
 BEAGLEBONE_BLACK = 2
 
 
+def _cached(func):
+    # Detection reads /proc/cpuinfo, and the answer can't change while the
+    # process runs, so work it out once per process.
+    results = []
+    @functools.wraps(func)
+    def wrapper():
+        if not results:
+            results.append(func())
+        return results[0]
+    return wrapper
+
+
+@_cached
 def platform_detect():
     """Detect if running on the Raspberry Pi or Beaglebone Black and return the
     platform type.  Will return RASPBERRY_PI, BEAGLEBONE_BLACK, or UNKNOWN."""
@@ -58,6 +72,7 @@ def platform_detect():
     return UNKNOWN
 
 
+@_cached
 def pi_revision():
     """Detect the revision number of a Raspberry Pi, useful for changing
     functionality like default I2C bus based on revision."""
@@ -77,6 +92,7 @@ def pi_revision():
         raise RuntimeError('Could not determine Raspberry Pi revision.')
 
 
+@_cached
 def pi_version():
     """Detect the version of the Raspberry Pi.  Returns either 1, 2, 3 or
     None depending on if it's a Raspberry Pi 1 (model A, B, A+, B+),
@@ -0,0 +1,154 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import random
+import time
+from collections import namedtuple
+
+from . import common
+
+
+# Monotonic clock for deadlines and intervals where available (Python 3).
+_monotonic = getattr(time, 'monotonic', time.time)
+
+# Result of RetryingSensor.read(). Timestamp is the wall clock time (as from
+# time.time()) the values were read and age how many seconds ago that was.
+# Fresh is False when the deadline expired and the values are the last good
+# reading, or all None when there is no usable one.
+Reading = namedtuple('Reading', 'humidity temperature timestamp age fresh')
+
+
+class RetryPolicy(object):
+    """How RetryingSensor retries a failed read.
+
+    Deadline is the most seconds one read() may take in total. The delay
+    before the next attempt starts at min_interval (the DHT can't be read
+    faster than about once every 2 seconds), grows by backoff after each
+    failure in a row up to max_delay, and gets up to jitter (as a fraction)
+    added at random so sensors on one bus don't retry in lockstep. Jitter only
+    lengthens the delay, so it never goes below min_interval. When the
+    deadline expires and last_good is True, the last good reading is returned
+    instead of None values if it is at most max_age seconds old (any age if
+    max_age is None). Seed makes the jitter repeatable.
+    """
+
+    def __init__(self, deadline=5.0, min_interval=2.0, backoff=2.0, max_delay=16.0,
+                 jitter=0.1, last_good=True, max_age=None, seed=None):
+        if deadline < 0 or min_interval < 0 or backoff < 1 or jitter < 0:
+            raise ValueError('Expected deadline, min_interval and jitter >= 0 and backoff >= 1.')
+        self.deadline = deadline
+        self.min_interval = min_interval
+        self.backoff = backoff
+        self.max_delay = max(max_delay, min_interval)
+        self.jitter = jitter
+        self.last_good = last_good
+        self.max_age = max_age
+        self._random = random.Random(seed)
+
+    def delay(self, failures):
+        """Seconds to wait after an attempt that ended a run of failures
+        failed attempts in a row (0 after a good read)."""
+        if failures == 0:
+            return self.min_interval
+        delay = min(self.max_delay, self.min_interval * self.backoff ** (failures - 1))
+        return delay * (1 + self.jitter * self._random.random())
+
+
+class SensorStats(object):
+    """Counts of the attempts and reads of one RetryingSensor."""
+
+    def __init__(self):
+        self.attempts = 0          # calls into the driver
+        self.successes = 0         # attempts that gave a reading
+        self.reads = 0             # calls to read()
+        self.stale = 0             # read()s that returned the last good reading
+        self.missed = 0            # read()s that returned None values
+        self.failures_in_row = 0   # failed attempts since the last success
+        self.read_seconds = 0.0    # duration of the last attempt
+        self.last_success = None   # wall clock time of the last good reading
+
+    @property
+    def success_rate(self):
+        # Fraction of driver attempts that succeeded; None before the first.
+        if not self.attempts:
+            return None
+        return float(self.successes) / self.attempts
+
+    def __repr__(self):
+        rate = self.success_rate
+        return 'attempts={0} successes={1} rate={2} reads={3} stale={4} missed={5}'.format(
+            self.attempts, self.successes, 'n/a' if rate is None else '{0:.2f}'.format(rate),
+            self.reads, self.stale, self.missed)
+
+
+class RetryingSensor(object):
+    """DHT sensor of specified sensor type (DHT11, DHT22, or AM2302) on
+    specified pin, read with a RetryPolicy (the defaults if policy is None)
+    so that read() never takes longer than the policy's deadline, unlike
+    read_retry(). The time of the last attempt and the failures in a row are
+    kept between calls, so a dead sensor is tried less and less often and a
+    read() right after another waits out the DHT's minimum interval. Stats
+    holds the sensor's SensorStats. Platform works like in read().
+    """
+
+    def __init__(self, sensor, pin, policy=None, platform=None):
+        self.sensor = common.DHTSensor(sensor, pin, platform)
+        self.policy = policy if policy is not None else RetryPolicy()
+        self.stats = SensorStats()
+        self.last = None            # last good Reading
+        self._last_monotonic = None
+        self._next_attempt = None   # monotonic time the next attempt may start
+
+    def read(self):
+        """Read the sensor, retrying until the policy's deadline, and return
+        a Reading."""
+        policy = self.policy
+        stats = self.stats
+        stats.reads += 1
+        end = _monotonic() + policy.deadline
+        while True:
+            now = _monotonic()
+            start = now if self._next_attempt is None else max(now, self._next_attempt)
+            # Don't start an attempt that can't finish before the deadline.
+            if start + stats.read_seconds > end:
+                break
+            if start > now:
+                time.sleep(start - now)
+            humidity, temperature = self.sensor.read()
+            finished = _monotonic()
+            stats.attempts += 1
+            stats.read_seconds = finished - start
+            if humidity is not None and temperature is not None:
+                stats.successes += 1
+                stats.failures_in_row = 0
+                stats.last_success = time.time()
+                self._last_monotonic = finished
+                self._next_attempt = finished + policy.delay(0)
+                self.last = Reading(humidity, temperature, stats.last_success, 0.0, True)
+                return self.last
+            stats.failures_in_row += 1
+            self._next_attempt = finished + policy.delay(stats.failures_in_row)
+        if policy.last_good and self.last is not None:
+            age = _monotonic() - self._last_monotonic
+            if policy.max_age is None or age <= policy.max_age:
+                stats.stale += 1
+                return Reading(self.last.humidity, self.last.temperature, self.last.timestamp, age, False)
+        stats.missed += 1
+        return Reading(None, None, None, None, False)
@@ -0,0 +1,146 @@
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import threading
+import time
+
+from . import common
+from .retry import Reading, SensorStats, _monotonic
+
+
+class DHTSampler(object):
+    """Reads DHT sensor of specified sensor type (DHT11, DHT22, or AM2302) on
+    specified pin in a background thread, once every interval seconds (the
+    DHT can't be read faster than about once every 2 seconds), and keeps the
+    last size good readings in a ring buffer. latest() and history() return
+    straight from the buffer without touching the hardware, so any number of
+    threads can poll them as often as they like.
+
+    The sensor is kept open as a DHTSession while the sampler runs. A Reading
+    counts as fresh while it is at most stale_after seconds old (three
+    intervals by default). Stats holds a SensorStats of the attempts. If the
+    driver raises an error the sampler stops and keeps it in error. Use the
+    sampler as a context manager, or call start() and stop(). Platform works
+    like in read().
+    """
+
+    def __init__(self, sensor, pin, size=1024, interval=2.0, stale_after=None, platform=None):
+        if sensor not in common.SENSORS:
+            raise ValueError('Expected DHT11, DHT22, or AM2302 sensor value.')
+        if size < 1:
+            raise ValueError('Ring buffer size must be at least 1.')
+        self.sensor = sensor
+        self.pin = pin
+        self.size = size
+        self.interval = interval
+        self.stale_after = stale_after if stale_after is not None else 3 * interval
+        self.stats = SensorStats()
+        self._platform = platform
+        # (timestamp, monotonic time, humidity, temperature) per slot. Only the
+        # sampler thread writes: it fills a slot, then bumps _count, so readers
+        # need no lock. The spare slot is the one being written, so history()
+        # can copy size readings while a new one arrives.
+        self._ring = [None] * (size + 1)
+        self._count = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.error = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return self
+        session = common.DHTSession(self.sensor, self.pin, self._platform)
+        self.error = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(session,), name='DHTSampler')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self, session):
+        stats = self.stats
+        try:
+            next_read = _monotonic()
+            while not self._stop.is_set():
+                start = _monotonic()
+                humidity, temperature = session.read()
+                finished = _monotonic()
+                stats.attempts += 1
+                stats.read_seconds = finished - start
+                if humidity is not None and temperature is not None:
+                    stats.successes += 1
+                    stats.failures_in_row = 0
+                    stats.last_success = time.time()
+                    self._ring[self._count % len(self._ring)] = (stats.last_success, finished, humidity, temperature)
+                    self._count += 1
+                else:
+                    stats.failures_in_row += 1
+                # Keep to a fixed rate, skipping slots that a slow read overran.
+                next_read += self.interval
+                if next_read < finished:
+                    next_read = finished + self.interval
+                self._stop.wait(next_read - finished)
+        except Exception as e:
+            self.error = e
+        finally:
+            session.close()
+
+    def _reading(self, sample, now):
+        timestamp, taken, humidity, temperature = sample
+        age = now - taken
+        return Reading(humidity, temperature, timestamp, age, age <= self.stale_after)
+
+    def latest(self):
+        """Return the newest good Reading, or None before the first one."""
+        count = self._count
+        if not count:
+            return None
+        return self._reading(self._ring[(count - 1) % len(self._ring)], _monotonic())
+
+    def history(self, n=None):
+        """Return up to the n newest good Readings (all buffered ones if n is
+        None), oldest first."""
+        count = self._count
+        n = min(count, self.size) if n is None else min(n, count, self.size)
+        ring = self._ring
+        samples = [ring[i % len(ring)] for i in range(count - n, count)]
+        # Drop the oldest slots if the sampler thread got round to them while
+        # they were copied.
+        overwritten = self._count - count + n - self.size
+        if overwritten > 0:
+            samples = samples[overwritten:]
+        now = _monotonic()
+        return [self._reading(sample, now) for sample in samples]
@@ -0,0 +1,135 @@
+#!/usr/bin/python
+# Copyright (c) 2014 Adafruit Industries
+# Author: Tony DiCola
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Reads a DHT sensor many times with diagnostics and prints histograms of the
+# raw pulse timing, to see why reads fail on a platform:
+#
+#   sudo ./pulse_histogram.py 22 4 --reads 2000 --json pulses.json
+#
+# - Timeouts on the response or the first pulses with counts far below the
+#   timeout count point at wiring or a missing pull-up.
+# - Pulse counts creeping up to the timeout count mean DHT_MAXCOUNT is too low
+#   for this CPU.
+# - Checksum errors with small bit margins, or a wide spread of pulse counts,
+#   mean the read was preempted or the CPU clock changed during it.
+import argparse
+import json
+import sys
+import time
+
+import Adafruit_DHT
+from Adafruit_DHT import common
+
+
+RESULTS = {
+    common.DHT_SUCCESS: 'success',
+    common.DHT_ERROR_TIMEOUT: 'timeout',
+    common.DHT_ERROR_CHECKSUM: 'checksum',
+    common.DHT_ERROR_ARGUMENT: 'argument',
+    common.DHT_ERROR_GPIO: 'gpio',
+}
+
+
+def histogram(title, values, bins=12, width=50):
+    print('{0} ({1} values)'.format(title, len(values)))
+    if not values:
+        return
+    low, high = min(values), max(values)
+    size = max(1, int((high - low) / float(bins)) + 1)
+    counts = {}
+    for value in values:
+        key = int((value - low) // size)
+        counts[key] = counts.get(key, 0) + 1
+    most = max(counts.values())
+    for key in range(max(counts) + 1):
+        start = low + key * size
+        count = counts.get(key, 0)
+        print('  {0:>8}..{1:<8} {2:7d} {3}'.format(start, start + size - 1, count,
+                                                '#' * int(round(count * width / float(most)))))
+
+
+def timeout_pulse(diagnostics):
+    # Index of the pulse that timed out, or -1 if the DHT never responded.
+    for i, count in enumerate(diagnostics.pulses):
+        if count >= diagnostics.max_count:
+            return i
+    return -1
+
+
+def main():
+    sensors = {'11': Adafruit_DHT.DHT11, '22': Adafruit_DHT.DHT22, '2302': Adafruit_DHT.AM2302}
+    parser = argparse.ArgumentParser(description='Histograms of DHT pulse timing.')
+    parser.add_argument('sensor', choices=sorted(sensors))
+    parser.add_argument('pin')
+    parser.add_argument('--reads', type=int, default=1000)
+    parser.add_argument('--interval', type=float, default=2.0, help='seconds between reads')
+    parser.add_argument('--test', action='store_true', help='use the Test driver')
+    parser.add_argument('--json', help='also save every read to this file')
+    args = parser.parse_args()
+
+    platform = None
+    pin = args.pin
+    if args.test:
+        from Adafruit_DHT import Test as platform
+        pin = int(pin)
+    reads = []
+    with Adafruit_DHT.DHTSession(sensors[args.sensor], pin, platform) as session:
+        for i in range(args.reads):
+            reads.append(session.read_diagnostics())
+            if i + 1 < args.reads:
+                time.sleep(args.interval)
+            if (i + 1) % 100 == 0:
+                sys.stderr.write('{0}/{1} reads\n'.format(i + 1, args.reads))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([d._asdict() for d in reads], f)
+
+    print('Results:')
+    for result, name in sorted(RESULTS.items(), reverse=True):
+        count = sum(1 for d in reads if d.result == result)
+        if count:
+            print('  {0:10s} {1:7d} {2:6.1%}'.format(name, count, count / float(len(reads))))
+    max_count = reads[0].max_count if reads else 0
+    print('Timeout count (DHT_MAXCOUNT): {0}'.format(max_count))
+
+    captured = [d for d in reads if d.result in (common.DHT_SUCCESS, common.DHT_ERROR_CHECKSUM)]
+    histogram('Elapsed microseconds of complete reads', [int(d.elapsed * 1e6) for d in captured])
+    histogram('Threshold (average low pulse count)', [d.threshold for d in captured])
+    histogram('Response pulse counts', [c for d in captured for c in d.pulses[:2]])
+    histogram('Low pulse counts', [c for d in captured for c in d.pulses[2::2]])
+    histogram('High pulse counts of 0 bits', [d.threshold + m for d in captured for m in d.margins if m < 0])
+    histogram('High pulse counts of 1 bits', [d.threshold + m for d in captured for m in d.margins if m >= 0])
+    histogram('Smallest bit margin per read (success)',
+              [min(abs(m) for m in d.margins) for d in captured if d.result == common.DHT_SUCCESS])
+    histogram('Smallest bit margin per read (checksum error)',
+              [min(abs(m) for m in d.margins) for d in captured if d.result == common.DHT_ERROR_CHECKSUM])
+    histogram('Pulse that timed out (-1: no response)',
+              [timeout_pulse(d) for d in reads if d.result == common.DHT_ERROR_TIMEOUT])
+    if captured:
+        highest = max(max(d.pulses) for d in captured)
+        print('Highest pulse count of a complete read: {0} ({1:.1%} of the timeout count)'.format(
+            highest, highest / float(max_count)))
+
+
+if __name__ == '__main__':
+    main()
@@ -81,7 +81,8 @@ elif platform == platform_detect.BEAGLEBONE_BLACK:
                                 extra_compile_args=['-std=gnu99']))
 elif platform == 'TEST':
     extensions.append(Extension("Adafruit_DHT.Test_Driver",
-                                ["source/_Test_Driver.c", "source/Test/test_dht_read.c"],
+                                ["source/_Test_Driver.c", "source/common_dht_read.c", "source/Test/test_dht_read.c"],
+                                libraries=['rt', 'm', 'pthread'],
                                 extra_compile_args=['-std=gnu99']))
 else:
     print('Could not detect if running on the Raspberry Pi or Beaglebone Black.  If this failure is unexpected, you can run again with --force-pi or --force-bbb parameter to force using the Raspberry Pi or Beaglebone Black respectively.')
@@ -30,11 +30,6 @@
 // Pi or Beaglebone Black then it might need to be increased.
 #define DHT_MAXCOUNT 32000
 
-// Number of bit pulses to expect from the DHT.  Note that this is 41 because
-// the first pulse is a constant 50 microsecond pulse, with 40 pulses to represent
-// the data afterwards.
-#define DHT_PULSES 41
-
 int bbb_dht_read(int type, int gpio_base, int gpio_number, float* humidity, float* temperature) {
   // Validate humidity and temperature arguments and set them to zero.
   if (humidity == NULL || temperature == NULL) {
@@ -43,30 +38,44 @@ int bbb_dht_read(int type, int gpio_base, int gpio_number, float* humidity, floa
   *temperature = 0.0f;
   *humidity = 0.0f;
 
-  // Store the count that each DHT bit pulse is low and high.
-  // Make sure array is initialized to start at zero.
-  int pulseCounts[DHT_PULSES*2] = {0};
-
-  // Get GPIO pin and set it as an output.
-  gpio_t pin;
-  if (bbb_mmio_get_gpio(gpio_base, gpio_number, &pin) < 0) {
-    return DHT_ERROR_GPIO;
+  // One-off read: open a session, read once and release the pin again.
+  bbb_dht_session session;
+  int result = bbb_dht_open(type, gpio_base, gpio_number, &session);
+  if (result != DHT_SUCCESS) {
+    return result;
   }
-  bbb_mmio_set_output(pin);
-
-  // Bump up process priority and change scheduler to try to try to make process more 'real time'.
-  set_max_priority();
+  result = bbb_dht_session_read(&session, humidity, temperature);
+  bbb_dht_close(&session);
+  return result;
+}
 
-  // Set pin high for ~500 milliseconds.
-  bbb_mmio_set_high(pin);
-  sleep_milliseconds(500);
+int bbb_dht_open(int type, int gpio_base, int gpio_number, bbb_dht_session* session) {
+  if (session == NULL) {
+    return DHT_ERROR_ARGUMENT;
+  }
 
-  // The next calls are timing critical and care should be taken
-  // to ensure no unnecssary work is done below.
+  // Get GPIO pin, mapping its GPIO memory the first time.
+  if (bbb_mmio_get_gpio(gpio_base, gpio_number, &session->pin) < 0) {
+    return DHT_ERROR_GPIO;
+  }
+  session->type = type;
+
+  // Set pin to output and high.  It stays high between reads, so a read only
+  // has to wait for whatever is left of the idle period.
+  bbb_mmio_set_output(session->pin);
+  bbb_mmio_set_high(session->pin);
+  session->ready = monotonic_milliseconds() + DHT_IDLE_MILLISECONDS;
+  return DHT_SUCCESS;
+}
 
-  // Set pin low for ~20 milliseconds.
+// Timing critical part of a read: send the start signal and count how long each
+// bit pulse is low and high.
+static int bbb_dht_read_pulses(gpio_t pin, int pulseCounts[DHT_PULSES*2]) {
+  // Set pin low for ~20 milliseconds.  It is an input if the last read timed
+  // out, so make it an output again first.
   bbb_mmio_set_low(pin);
-  busy_wait_milliseconds(20);
+  bbb_mmio_set_output(pin);
+  precise_wait_milliseconds(20);
 
   // Set pin as input.
   bbb_mmio_set_input(pin);
@@ -76,7 +85,6 @@ int bbb_dht_read(int type, int gpio_base, int gpio_number, float* humidity, floa
   while (bbb_mmio_input(pin)) {
     if (++count >= DHT_MAXCOUNT) {
       // Timeout waiting for response.
-      set_default_priority();
       return DHT_ERROR_TIMEOUT;
     }
   }
@@ -87,7 +95,6 @@ int bbb_dht_read(int type, int gpio_base, int gpio_number, float* humidity, floa
     while (!bbb_mmio_input(pin)) {
       if (++pulseCounts[i] >= DHT_MAXCOUNT) {
         // Timeout waiting for response.
-        set_default_priority();
         return DHT_ERROR_TIMEOUT;
       }
     }
@@ -95,60 +102,68 @@ int bbb_dht_read(int type, int gpio_base, int gpio_number, float* humidity, floa
     while (bbb_mmio_input(pin)) {
       if (++pulseCounts[i+1] >= DHT_MAXCOUNT) {
         // Timeout waiting for response.
-        set_default_priority();
         return DHT_ERROR_TIMEOUT;
       }
     }
   }
+  return DHT_SUCCESS;
+}
+
+int bbb_dht_session_read(bbb_dht_session* session, float* humidity, float* temperature) {
+  dht_diagnostics diagnostics;
+  return bbb_dht_session_read_diagnostics(session, humidity, temperature, &diagnostics);
+}
+
+int bbb_dht_session_read_diagnostics(bbb_dht_session* session, float* humidity, float* temperature,
+                                     dht_diagnostics* diagnostics) {
+  // Validate humidity and temperature arguments and set them to zero.
+  if (session == NULL || humidity == NULL || temperature == NULL || diagnostics == NULL) {
+    return DHT_ERROR_ARGUMENT;
+  }
+  *temperature = 0.0f;
+  *humidity = 0.0f;
+
+  // Store the count that each DHT bit pulse is low and high.
+  // Make sure array is initialized to start at zero.
+  memset(diagnostics, 0, sizeof(*diagnostics));
+  diagnostics->maxCount = DHT_MAXCOUNT;
+
+  // Make sure the pin has been high for ~500 milliseconds.
+  sleep_until_milliseconds(session->ready);
+
+  // Bump up process priority and change scheduler to try to try to make process more 'real time'.
+  // Only the start signal and the pulses need it, not the wait above.
+  set_max_priority();
 
-  // Done with timing critical code, now interpret the results.
+  // The next calls are timing critical and care should be taken
+  // to ensure no unnecssary work is done below.
+  uint64_t start = monotonic_microseconds();
+  int result = bbb_dht_read_pulses(session->pin, diagnostics->pulseCounts);
+  diagnostics->elapsedMicroseconds = (uint32_t)(monotonic_microseconds() - start);
 
-  // Drop back to normal priority.
+  // Done with timing critical code, drop back to normal priority.
   set_default_priority();
 
-  // Compute the average low pulse width to use as a 50 microsecond reference threshold.
-  // Ignore the first two readings because they are a constant 80 microsecond pulse.
-  uint32_t threshold = 0;
-  for (int i=2; i < DHT_PULSES*2; i+=2) {
-    threshold += pulseCounts[i];
+  // Let the DHT finish its last pulse, then hold the pin high again until the next read.
+  // After a timeout the DHT (or whatever else is on the line) may still be driving
+  // it, so leave the pin an input and let the pull-up hold the line high instead.
+  sleep_milliseconds(1);
+  if (result != DHT_ERROR_TIMEOUT) {
+    bbb_mmio_set_output(session->pin);
+    bbb_mmio_set_high(session->pin);
   }
-  threshold /= DHT_PULSES-1;
-
-  // Interpret each high pulse as a 0 or 1 by comparing it to the 50us reference.
-  // If the count is less than 50us it must be a ~28us 0 pulse, and if it's higher
-  // then it must be a ~70us 1 pulse.
-  uint8_t data[5] = {0};
-  for (int i=3; i < DHT_PULSES*2; i+=2) {
-    int index = (i-3)/16;
-    data[index] <<= 1;
-    if (pulseCounts[i] >= threshold) {
-      // One bit for long pulse.
-      data[index] |= 1;
-    }
-    // Else zero bit for short pulse.
-  }
-
-  // Useful debug info:
-  //printf("Data: 0x%x 0x%x 0x%x 0x%x 0x%x\n", data[0], data[1], data[2], data[3], data[4]);
+  session->ready = monotonic_milliseconds() + DHT_IDLE_MILLISECONDS;
 
-  // Verify checksum of received data.
-  if (data[4] == ((data[0] + data[1] + data[2] + data[3]) & 0xFF)) {
-    if (type == DHT11) {
-      // Get humidity and temp for DHT11 sensor.
-      *humidity = (float)data[0];
-      *temperature = (float)data[2];
-    }
-    else if (type == DHT22) {
-      // Calculate humidity and temp for DHT22 sensor.
-      *humidity = (data[0] * 256 + data[1]) / 10.0f;
-      *temperature = ((data[2] & 0x7F) * 256 + data[3]) / 10.0f;
-      if (data[2] & 0x80) {
-        *temperature *= -1.0f;
-      }
-    }
-    return DHT_SUCCESS;
+  diagnostics->threshold = dht_pulse_threshold(diagnostics->pulseCounts);
+  if (result != DHT_SUCCESS) {
+    return result;
   }
-  else {
-    return DHT_ERROR_CHECKSUM;
+  return decode_dht_pulses(session->type, diagnostics->pulseCounts, humidity, temperature);
+}
+
+void bbb_dht_close(bbb_dht_session* session) {
+  if (session != NULL) {
+    // Release the pin.
+    bbb_mmio_set_input(session->pin);
   }
 }
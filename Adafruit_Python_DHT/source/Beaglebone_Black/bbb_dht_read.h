@@ -22,6 +22,7 @@
 #define BBB_DHT_READ_H
 
 #include "../common_dht_read.h"
+#include "bbb_mmio.h"
 
 // Read DHT sensor connected to GPIO bin GPIO<base>_<number>, for example P8_11 is GPIO1_13 with
 // base = 1 and number = 13.  Humidity and temperature will be returned in the provided parameters.
@@ -30,4 +31,28 @@
 // and retried, specifically DHT_ERROR_TIMEOUT or DHT_ERROR_CHECKSUM.
 int bbb_dht_read(int type, int gpio_base, int gpio_number, float* humidity, float* temperature);
 
+// An open sensor: GPIO is mapped and the pin configured once by bbb_dht_open and
+// kept that way between reads until bbb_dht_close.
+typedef struct {
+  int type;
+  gpio_t pin;
+  // Monotonic time in milliseconds when the pin has been high long enough to start a read.
+  uint64_t ready;
+} bbb_dht_session;
+
+// Open a session for a DHT sensor on pin GPIO<base>_<number>.  Returns DHT_SUCCESS or
+// DHT_ERROR_GPIO if the pin is invalid or GPIO memory couldn't be mapped.
+int bbb_dht_open(int type, int gpio_base, int gpio_number, bbb_dht_session* session);
+
+// Read an open sensor.  Same results as bbb_dht_read, without the per-read setup.
+int bbb_dht_session_read(bbb_dht_session* session, float* humidity, float* temperature);
+
+// Read an open sensor like bbb_dht_session_read and also fill in the raw pulse counts,
+// threshold and timing of the read, for tuning and troubleshooting.
+int bbb_dht_session_read_diagnostics(bbb_dht_session* session, float* humidity, float* temperature,
+                                     dht_diagnostics* diagnostics);
+
+// Release the pin of an open sensor.
+void bbb_dht_close(bbb_dht_session* session);
+
 #endif
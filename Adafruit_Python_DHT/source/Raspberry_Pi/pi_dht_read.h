@@ -29,4 +29,28 @@
 // be returned.  Some errors can be ignored and retried, specifically DHT_ERROR_TIMEOUT or DHT_ERROR_CHECKSUM.
 int pi_dht_read(int sensor, int pin, float* humidity, float* temperature);
 
+// An open sensor: GPIO is mapped and the pin configured once by pi_dht_open and
+// kept that way between reads until pi_dht_close.
+typedef struct {
+  int type;
+  int pin;
+  // Monotonic time in milliseconds when the pin has been high long enough to start a read.
+  uint64_t ready;
+} pi_dht_session;
+
+// Open a session for a DHT sensor on a GPIO pin (using BCM numbering).  Returns DHT_SUCCESS
+// or DHT_ERROR_GPIO if GPIO memory couldn't be mapped.
+int pi_dht_open(int sensor, int pin, pi_dht_session* session);
+
+// Read an open sensor.  Same results as pi_dht_read, without the per-read setup.
+int pi_dht_session_read(pi_dht_session* session, float* humidity, float* temperature);
+
+// Read an open sensor like pi_dht_session_read and also fill in the raw pulse counts,
+// threshold and timing of the read, for tuning and troubleshooting.
+int pi_dht_session_read_diagnostics(pi_dht_session* session, float* humidity, float* temperature,
+                                    dht_diagnostics* diagnostics);
+
+// Release the pin of an open sensor.
+void pi_dht_close(pi_dht_session* session);
+
 #endif
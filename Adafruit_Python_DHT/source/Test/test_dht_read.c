@@ -17,18 +17,273 @@
 // AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
 // LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 // OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
-// SOFTWARE.
+#include <math.h>
+#include <pthread.h>
 #include <stdlib.h>
+#include <string.h>
 
 #include "test_dht_read.h"
 
+// Timeout count reported in diagnostics, like the platform drivers' DHT_MAXCOUNT.
+#define TEST_MAXCOUNT 32000
+
+// Mock sensor configuration and state, shared by all reads.  Reads run without
+// the GIL, so the lock keeps concurrent reads from tearing it.
+static pthread_mutex_t lock = PTHREAD_MUTEX_INITIALIZER;
+static uint32_t latency_milliseconds = 0;
+static uint32_t setup_milliseconds = 0;
+static uint32_t jitter_milliseconds = 0;
+static double checksum_probability = 0.0;
+static double timeout_probability = 0.0;
+static uint64_t rng_state = 1;
+// Values are either a sequence, cycled through one good read at a time, or a
+// random walk when walk_steps is set.
+static float default_values[2] = {50.0f, 42.0f};
+static float* sequence = default_values;
+static int sequence_length = 1;
+static int sequence_index = 0;
+static int walk = 0;
+static float walk_values[2];
+static float walk_steps[2];
+
+// splitmix64, so runs can be repeated from a seed independently of rand().
+static uint64_t next_random(void) {
+  uint64_t z = (rng_state += 0x9E3779B97F4A7C15ULL);
+  z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL;
+  z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL;
+  return z ^ (z >> 31);
+}
+
+// Uniform double in [0, 1).
+static double random_unit(void) {
+  return (next_random() >> 11) * (1.0 / 9007199254740992.0);
+}
+
+static float clamp(float value, float low, float high) {
+  return value < low ? low : value > high ? high : value;
+}
+
+// Next pair of mock values, rounded to what the sensor type can report.  Only
+// good reads move on to the next values; a failed one peeks at them.
+static void next_values(int type, int advance, float* humidity, float* temperature) {
+  if (walk) {
+    if (advance) {
+      walk_values[0] = clamp(walk_values[0] + (float)((random_unit() * 2 - 1) * walk_steps[0]), 0.0f, 100.0f);
+      walk_values[1] = clamp(walk_values[1] + (float)((random_unit() * 2 - 1) * walk_steps[1]), -40.0f, 80.0f);
+    }
+    *humidity = walk_values[0];
+    *temperature = walk_values[1];
+  }
+  else {
+    *humidity = sequence[2*sequence_index];
+    *temperature = sequence[2*sequence_index + 1];
+    if (advance) {
+      sequence_index = (sequence_index + 1) % sequence_length;
+    }
+  }
+  if (type == DHT11) {
+    *humidity = floorf(*humidity);
+    *temperature = floorf(*temperature);
+  }
+  else {
+    *humidity = roundf(*humidity * 10.0f) / 10.0f;
+    *temperature = roundf(*temperature * 10.0f) / 10.0f;
+  }
+}
+
+// Fill in the pulse counts a DHT would send for the values, one count per
+// microsecond: ~80us response, then a ~50us low and a ~28us (0) or ~70us (1)
+// high pulse per bit.  A timeout stops at a random pulse and a checksum error
+// flips one bit.
+static void encode_pulses(int type, float humidity, float temperature, int result,
+                          dht_diagnostics* diagnostics) {
+  uint8_t data[5] = {0};
+  if (type == DHT11) {
+    data[0] = (uint8_t)humidity;
+    data[2] = (uint8_t)temperature;
+  }
+  else {
+    int h = (int)(humidity * 10.0f + 0.5f);
+    int t = (int)(fabsf(temperature) * 10.0f + 0.5f);
+    data[0] = h >> 8;
+    data[1] = h & 0xFF;
+    data[2] = (t >> 8) | (temperature < 0 ? 0x80 : 0);
+    data[3] = t & 0xFF;
+  }
+  data[4] = (data[0] + data[1] + data[2] + data[3]) & 0xFF;
+  int flipped = result == DHT_ERROR_CHECKSUM ? (int)(next_random() % 40) : -1;
+  int last = result == DHT_ERROR_TIMEOUT ? (int)(next_random() % (DHT_PULSES*2)) : DHT_PULSES*2;
+  diagnostics->pulseCounts[0] = 80;
+  diagnostics->pulseCounts[1] = 80;
+  for (int i=3; i < DHT_PULSES*2; i+=2) {
+    int bit = (i-3)/2;
+    int one = (data[bit/8] >> (7 - bit%8)) & 1;
+    diagnostics->pulseCounts[i-1] = 50;
+    // A flipped bit is a pulse that lands just on the wrong side of the threshold.
+    diagnostics->pulseCounts[i] = bit == flipped ? (one ? 48 : 52) : (one ? 70 : 28);
+  }
+  if (last < DHT_PULSES*2) {
+    diagnostics->pulseCounts[last] = TEST_MAXCOUNT;
+    memset(&diagnostics->pulseCounts[last+1], 0, (DHT_PULSES*2 - last - 1) * sizeof(int));
+  }
+  for (int i=0; i < DHT_PULSES*2 && i <= last; ++i) {
+    diagnostics->elapsedMicroseconds += diagnostics->pulseCounts[i];
+  }
+  diagnostics->threshold = dht_pulse_threshold(diagnostics->pulseCounts);
+}
+
+// One mock read: wait out the latency, then fail or produce the next values.
+static int mock_read(int type, float* humidity, float* temperature, dht_diagnostics* diagnostics) {
+  pthread_mutex_lock(&lock);
+  uint32_t wait = latency_milliseconds;
+  if (jitter_milliseconds > 0) {
+    wait += (uint32_t)(next_random() % (jitter_milliseconds + 1));
+  }
+  pthread_mutex_unlock(&lock);
+  if (wait > 0) {
+    sleep_milliseconds(wait);
+  }
+
+  pthread_mutex_lock(&lock);
+  int result = DHT_SUCCESS;
+  double draw = random_unit();
+  if (draw < timeout_probability) {
+    result = DHT_ERROR_TIMEOUT;
+  }
+  else if (draw < timeout_probability + checksum_probability) {
+    result = DHT_ERROR_CHECKSUM;
+  }
+  float h = 0.0f, t = 0.0f;
+  if (result == DHT_SUCCESS || diagnostics != NULL) {
+    next_values(type, result == DHT_SUCCESS, &h, &t);
+  }
+  if (diagnostics != NULL) {
+    memset(diagnostics, 0, sizeof(*diagnostics));
+    diagnostics->maxCount = TEST_MAXCOUNT;
+    encode_pulses(type, h, t, result, diagnostics);
+  }
+  pthread_mutex_unlock(&lock);
+  if (result == DHT_SUCCESS) {
+    *humidity = h;
+    *temperature = t;
+  }
+  return result;
+}
+
+// Wait out the setup cost of a one-shot read or a session open.
+static void mock_setup(void) {
+  pthread_mutex_lock(&lock);
+  uint32_t wait = setup_milliseconds;
+  pthread_mutex_unlock(&lock);
+  if (wait > 0) {
+    sleep_milliseconds(wait);
+  }
+}
+
 int test_dht_read(int type, int pin, float* humidity, float* temperature) {
   // Validate humidity and temperature arguments and set them to zero.
   if (humidity == NULL || temperature == NULL) {
-    return -1;
+    return DHT_ERROR_ARGUMENT;
+  }
+  *temperature = 0.0f;
+  *humidity = 0.0f;
+  mock_setup();
+  return mock_read(type, humidity, temperature, NULL);
+}
+
+int test_dht_open(int type, int pin, test_dht_session* session) {
+  if (session == NULL) {
+    return DHT_ERROR_ARGUMENT;
+  }
+  mock_setup();
+  session->type = type;
+  session->pin = pin;
+  return DHT_SUCCESS;
+}
+
+int test_dht_session_read(test_dht_session* session, float* humidity, float* temperature) {
+  if (session == NULL || humidity == NULL || temperature == NULL) {
+    return DHT_ERROR_ARGUMENT;
+  }
+  *temperature = 0.0f;
+  *humidity = 0.0f;
+  return mock_read(session->type, humidity, temperature, NULL);
+}
+
+int test_dht_session_read_diagnostics(test_dht_session* session, float* humidity, float* temperature,
+                                      dht_diagnostics* diagnostics) {
+  if (session == NULL || humidity == NULL || temperature == NULL || diagnostics == NULL) {
+    return DHT_ERROR_ARGUMENT;
+  }
+  *temperature = 0.0f;
+  *humidity = 0.0f;
+  return mock_read(session->type, humidity, temperature, diagnostics);
+}
+
+void test_dht_close(test_dht_session* session) {
+}
+
+void test_dht_set_latency(uint32_t millis, uint32_t jitter) {
+  pthread_mutex_lock(&lock);
+  latency_milliseconds = millis;
+  jitter_milliseconds = jitter;
+  pthread_mutex_unlock(&lock);
+}
+
+void test_dht_set_setup(uint32_t millis) {
+  pthread_mutex_lock(&lock);
+  setup_milliseconds = millis;
+  pthread_mutex_unlock(&lock);
+}
+
+void test_dht_set_errors(double checksum, double timeout) {
+  pthread_mutex_lock(&lock);
+  checksum_probability = checksum;
+  timeout_probability = timeout;
+  pthread_mutex_unlock(&lock);
+}
+
+int test_dht_set_sequence(const float* values, int count) {
+  if (values == NULL || count < 1) {
+    return DHT_ERROR_ARGUMENT;
   }
-  *temperature = 42.0f;
-  *humidity = 50.0f;
+  float* copy = malloc(2 * count * sizeof(float));
+  if (copy == NULL) {
+    return DHT_ERROR_ARGUMENT;
+  }
+  memcpy(copy, values, 2 * count * sizeof(float));
+  pthread_mutex_lock(&lock);
+  if (sequence != default_values) {
+    free(sequence);
+  }
+  sequence = copy;
+  sequence_length = count;
+  sequence_index = 0;
+  walk = 0;
+  pthread_mutex_unlock(&lock);
+  return DHT_SUCCESS;
+}
+
+void test_dht_set_random_walk(float humidity, float temperature, float humidity_step, float temperature_step) {
+  pthread_mutex_lock(&lock);
+  walk_values[0] = humidity;
+  walk_values[1] = temperature;
+  walk_steps[0] = humidity_step;
+  walk_steps[1] = temperature_step;
+  walk = 1;
+  pthread_mutex_unlock(&lock);
+}
+
+void test_dht_seed(uint64_t seed) {
+  pthread_mutex_lock(&lock);
+  rng_state = seed;
+  pthread_mutex_unlock(&lock);
+}
 
-  return 0;
+void test_dht_reset(void) {
+  test_dht_set_latency(0, 0);
+  test_dht_set_setup(0);
+  test_dht_set_errors(0.0, 0.0);
+  test_dht_set_sequence(default_values, 1);
+  test_dht_seed(1);
 }
@@ -21,6 +21,50 @@
 #ifndef TEST_DHT_READ_H
 #define TEST_DHT_READ_H
 
+#include "../common_dht_read.h"
+
 int test_dht_read(int sensor, int pin, float* humidity, float* temperature);
 
+// Session API with the same shape as the platform drivers.
+typedef struct {
+  int type;
+  int pin;
+} test_dht_session;
+
+int test_dht_open(int sensor, int pin, test_dht_session* session);
+int test_dht_session_read(test_dht_session* session, float* humidity, float* temperature);
+void test_dht_close(test_dht_session* session);
+
+// Session read that also fills in the pulse counts a DHT would send for the mock
+// values, one count per microsecond.
+int test_dht_session_read_diagnostics(test_dht_session* session, float* humidity, float* temperature,
+                                      dht_diagnostics* diagnostics);
+
+// Mock sensor configuration, shared by all reads and sessions.  The defaults
+// (and test_dht_reset) give an instant, always good read of 50% and 42C.
+
+// Make every read sleep millis plus a random 0 to jitter milliseconds first, like
+// the idle time of a real read.
+void test_dht_set_latency(uint32_t millis, uint32_t jitter);
+
+// Make every one-shot read and every session open sleep millis first, like the
+// GPIO mapping and pin setup that a session only does once.  Session reads skip it.
+void test_dht_set_setup(uint32_t millis);
+
+// Chance (0 to 1) that a read fails with DHT_ERROR_CHECKSUM or DHT_ERROR_TIMEOUT.
+void test_dht_set_errors(double checksum, double timeout);
+
+// Cycle through count pairs of humidity and temperature, one per good read.
+int test_dht_set_sequence(const float* values, int count);
+
+// Let humidity and temperature wander from the start values by up to the step
+// either way per good read, within the range of the sensor.
+void test_dht_set_random_walk(float humidity, float temperature, float humidity_step, float temperature_step);
+
+// Seed the generator behind latency jitter, errors and random walks.
+void test_dht_seed(uint64_t seed);
+
+// Back to the defaults.
+void test_dht_reset(void);
+
 #endif
@@ -30,16 +30,146 @@ static PyObject* Raspberry_Pi_Driver_read(PyObject *self, PyObject *args)
     if (!PyArg_ParseTuple(args, "ii", &sensor, &pin)) {
         return NULL;
     }
-    // Call dht_read and return result code, humidity, and temperature.
+    // Call dht_read and return result code, humidity, and temperature.  The read
+    // sleeps and busy waits for most of a second, so let other Python threads
+    // run meanwhile.
     float humidity = 0, temperature = 0;
-    int result = pi_dht_read(sensor, pin, &humidity, &temperature);
+    int result;
+    Py_BEGIN_ALLOW_THREADS
+    result = pi_dht_read(sensor, pin, &humidity, &temperature);
+    Py_END_ALLOW_THREADS
     return Py_BuildValue("iff", result, humidity, temperature);
 }
 
+// Open sensors, indexed by the handle returned to Python.
+#define MAX_SESSIONS 16
+static pi_dht_session sessions[MAX_SESSIONS];
+static int session_open[MAX_SESSIONS];
+// Set while a read of the session runs without the GIL, so another thread
+// can't read or close it at the same time.
+static int session_busy[MAX_SESSIONS];
+
+// Look up the session of a handle passed in from Python and mark it busy,
+// raising ValueError if there is none and RuntimeError if another thread is
+// using it. The flag is tested and set in one step while the GIL is held, so
+// two threads can't both claim the session; release it with release_session().
+static pi_dht_session* claim_session(int handle)
+{
+    if (handle < 0 || handle >= MAX_SESSIONS || !session_open[handle]) {
+        PyErr_SetString(PyExc_ValueError, "Invalid or closed DHT session handle.");
+        return NULL;
+    }
+    if (session_busy[handle]) {
+        PyErr_SetString(PyExc_RuntimeError, "DHT session is being read by another thread.");
+        return NULL;
+    }
+    session_busy[handle] = 1;
+    return &sessions[handle];
+}
+
+static void release_session(int handle)
+{
+    session_busy[handle] = 0;
+}
+
+// Open a sensor once for repeated reads and return the result code and a session handle.
+static PyObject* Raspberry_Pi_Driver_open(PyObject *self, PyObject *args)
+{
+    int sensor, pin;
+    if (!PyArg_ParseTuple(args, "ii", &sensor, &pin)) {
+        return NULL;
+    }
+    int handle = 0;
+    while (handle < MAX_SESSIONS && session_open[handle]) {
+        ++handle;
+    }
+    if (handle == MAX_SESSIONS) {
+        PyErr_SetString(PyExc_RuntimeError, "Too many open DHT sessions.");
+        return NULL;
+    }
+    int result = pi_dht_open(sensor, pin, &sessions[handle]);
+    if (result == DHT_SUCCESS) {
+        session_open[handle] = 1;
+    }
+    return Py_BuildValue("ii", result, handle);
+}
+
+// Read an open sensor and return result code, humidity, and temperature.
+static PyObject* Raspberry_Pi_Driver_read_session(PyObject *self, PyObject *args)
+{
+    int handle;
+    if (!PyArg_ParseTuple(args, "i", &handle)) {
+        return NULL;
+    }
+    pi_dht_session* session = claim_session(handle);
+    if (session == NULL) {
+        return NULL;
+    }
+    float humidity = 0, temperature = 0;
+    int result;
+    Py_BEGIN_ALLOW_THREADS
+    result = pi_dht_session_read(session, &humidity, &temperature);
+    Py_END_ALLOW_THREADS
+    release_session(handle);
+    return Py_BuildValue("iff", result, humidity, temperature);
+}
+
+// Read an open sensor and return result code, humidity, temperature, the tuple of
+// raw pulse counts, threshold, timeout count and elapsed microseconds of the read.
+static PyObject* Raspberry_Pi_Driver_read_diagnostics(PyObject *self, PyObject *args)
+{
+    int handle;
+    if (!PyArg_ParseTuple(args, "i", &handle)) {
+        return NULL;
+    }
+    pi_dht_session* session = claim_session(handle);
+    if (session == NULL) {
+        return NULL;
+    }
+    float humidity = 0, temperature = 0;
+    dht_diagnostics diagnostics;
+    int result;
+    Py_BEGIN_ALLOW_THREADS
+    result = pi_dht_session_read_diagnostics(session, &humidity, &temperature, &diagnostics);
+    Py_END_ALLOW_THREADS
+    release_session(handle);
+    PyObject* pulses = PyTuple_New(DHT_PULSES*2);
+    if (pulses == NULL) {
+        return NULL;
+    }
+    for (int i = 0; i < DHT_PULSES*2; ++i) {
+        PyTuple_SET_ITEM(pulses, i, Py_BuildValue("i", diagnostics.pulseCounts[i]));
+    }
+    return Py_BuildValue("iffNkik", result, humidity, temperature, pulses,
+                         (unsigned long)diagnostics.threshold, diagnostics.maxCount,
+                         (unsigned long)diagnostics.elapsedMicroseconds);
+}
+
+// Release the pin of an open sensor and free its handle.
+static PyObject* Raspberry_Pi_Driver_close(PyObject *self, PyObject *args)
+{
+    int handle;
+    if (!PyArg_ParseTuple(args, "i", &handle)) {
+        return NULL;
+    }
+    pi_dht_session* session = claim_session(handle);
+    if (session == NULL) {
+        return NULL;
+    }
+    pi_dht_close(session);
+    session_open[handle] = 0;
+    release_session(handle);
+    Py_RETURN_NONE;
+}
+
 // Boilerplate python module method list and initialization functions below.
 
 static PyMethodDef module_methods[] = {
     {"read", Raspberry_Pi_Driver_read, METH_VARARGS, "Read DHT sensor value on a Raspberry Pi."},
+    {"open", Raspberry_Pi_Driver_open, METH_VARARGS, "Open DHT sensor on a Raspberry Pi for repeated reads."},
+    {"read_session", Raspberry_Pi_Driver_read_session, METH_VARARGS, "Read an open DHT sensor."},
+    {"close", Raspberry_Pi_Driver_close, METH_VARARGS, "Close an open DHT sensor."},
+    {"read_diagnostics", Raspberry_Pi_Driver_read_diagnostics, METH_VARARGS, "Read an open DHT sensor and return raw pulse timing too."},
     {NULL, NULL, 0, NULL}
 };
 
@@ -30,16 +30,283 @@ static PyObject* Test_Driver_read(PyObject *self, PyObject *args)
     if (!PyArg_ParseTuple(args, "ii", &sensor, &pin)) {
         return NULL;
     }
-    // Call dht_read and return result code, humidity, and temperature.
+    // Call dht_read and return result code, humidity, and temperature.  Like the
+    // platform drivers, let other Python threads run during the (simulated) read.
     float humidity = 0, temperature = 0;
-    int result = test_dht_read(sensor, pin, &humidity, &temperature);
+    int result;
+    Py_BEGIN_ALLOW_THREADS
+    result = test_dht_read(sensor, pin, &humidity, &temperature);
+    Py_END_ALLOW_THREADS
     return Py_BuildValue("iff", result, humidity, temperature);
 }
 
+// Open sensors, indexed by the handle returned to Python.
+#define MAX_SESSIONS 16
+static test_dht_session sessions[MAX_SESSIONS];
+static int session_open[MAX_SESSIONS];
+// Set while a read of the session runs without the GIL, so another thread
+// can't read or close it at the same time.
+static int session_busy[MAX_SESSIONS];
+
+// Look up the session of a handle passed in from Python and mark it busy,
+// raising ValueError if there is none and RuntimeError if another thread is
+// using it. The flag is tested and set in one step while the GIL is held, so
+// two threads can't both claim the session; release it with release_session().
+static test_dht_session* claim_session(int handle)
+{
+    if (handle < 0 || handle >= MAX_SESSIONS || !session_open[handle]) {
+        PyErr_SetString(PyExc_ValueError, "Invalid or closed DHT session handle.");
+        return NULL;
+    }
+    if (session_busy[handle]) {
+        PyErr_SetString(PyExc_RuntimeError, "DHT session is being read by another thread.");
+        return NULL;
+    }
+    session_busy[handle] = 1;
+    return &sessions[handle];
+}
+
+static void release_session(int handle)
+{
+    session_busy[handle] = 0;
+}
+
+// Open a sensor once for repeated reads and return the result code and a session handle.
+static PyObject* Test_Driver_open(PyObject *self, PyObject *args)
+{
+    int sensor, pin;
+    if (!PyArg_ParseTuple(args, "ii", &sensor, &pin)) {
+        return NULL;
+    }
+    int handle = 0;
+    while (handle < MAX_SESSIONS && session_open[handle]) {
+        ++handle;
+    }
+    if (handle == MAX_SESSIONS) {
+        PyErr_SetString(PyExc_RuntimeError, "Too many open DHT sessions.");
+        return NULL;
+    }
+    int result = test_dht_open(sensor, pin, &sessions[handle]);
+    if (result == 0) {
+        session_open[handle] = 1;
+    }
+    return Py_BuildValue("ii", result, handle);
+}
+
+// Read an open sensor and return result code, humidity, and temperature.
+static PyObject* Test_Driver_read_session(PyObject *self, PyObject *args)
+{
+    int handle;
+    if (!PyArg_ParseTuple(args, "i", &handle)) {
+        return NULL;
+    }
+    test_dht_session* session = claim_session(handle);
+    if (session == NULL) {
+        return NULL;
+    }
+    float humidity = 0, temperature = 0;
+    int result;
+    Py_BEGIN_ALLOW_THREADS
+    result = test_dht_session_read(session, &humidity, &temperature);
+    Py_END_ALLOW_THREADS
+    release_session(handle);
+    return Py_BuildValue("iff", result, humidity, temperature);
+}
+
+// Read an open sensor and return result code, humidity, temperature, the tuple of
+// raw pulse counts, threshold, timeout count and elapsed microseconds of the read.
+static PyObject* Test_Driver_read_diagnostics(PyObject *self, PyObject *args)
+{
+    int handle;
+    if (!PyArg_ParseTuple(args, "i", &handle)) {
+        return NULL;
+    }
+    test_dht_session* session = claim_session(handle);
+    if (session == NULL) {
+        return NULL;
+    }
+    float humidity = 0, temperature = 0;
+    dht_diagnostics diagnostics;
+    int result;
+    Py_BEGIN_ALLOW_THREADS
+    result = test_dht_session_read_diagnostics(session, &humidity, &temperature, &diagnostics);
+    Py_END_ALLOW_THREADS
+    release_session(handle);
+    PyObject* pulses = PyTuple_New(DHT_PULSES*2);
+    if (pulses == NULL) {
+        return NULL;
+    }
+    for (int i = 0; i < DHT_PULSES*2; ++i) {
+        PyTuple_SET_ITEM(pulses, i, Py_BuildValue("i", diagnostics.pulseCounts[i]));
+    }
+    return Py_BuildValue("iffNkik", result, humidity, temperature, pulses,
+                         (unsigned long)diagnostics.threshold, diagnostics.maxCount,
+                         (unsigned long)diagnostics.elapsedMicroseconds);
+}
+
+// Release the pin of an open sensor and free its handle.
+static PyObject* Test_Driver_close(PyObject *self, PyObject *args)
+{
+    int handle;
+    if (!PyArg_ParseTuple(args, "i", &handle)) {
+        return NULL;
+    }
+    test_dht_session* session = claim_session(handle);
+    if (session == NULL) {
+        return NULL;
+    }
+    test_dht_close(session);
+    session_open[handle] = 0;
+    release_session(handle);
+    Py_RETURN_NONE;
+}
+
+// Set how long each mock read takes, to stand in for the timing of a real sensor.
+static PyObject* Test_Driver_set_latency(PyObject *self, PyObject *args)
+{
+    int milliseconds, jitter = 0;
+    if (!PyArg_ParseTuple(args, "i|i", &milliseconds, &jitter)) {
+        return NULL;
+    }
+    if (milliseconds < 0 || jitter < 0) {
+        PyErr_SetString(PyExc_ValueError, "Latency and jitter must not be negative.");
+        return NULL;
+    }
+    test_dht_set_latency(milliseconds, jitter);
+    Py_RETURN_NONE;
+}
+
+// Set how long the setup of each one-shot read or session open takes.
+static PyObject* Test_Driver_set_setup(PyObject *self, PyObject *args)
+{
+    int milliseconds;
+    if (!PyArg_ParseTuple(args, "i", &milliseconds)) {
+        return NULL;
+    }
+    if (milliseconds < 0) {
+        PyErr_SetString(PyExc_ValueError, "Setup time must not be negative.");
+        return NULL;
+    }
+    test_dht_set_setup(milliseconds);
+    Py_RETURN_NONE;
+}
+
+// Set the chances that a mock read fails with a checksum error or a timeout.
+static PyObject* Test_Driver_set_errors(PyObject *self, PyObject *args)
+{
+    double checksum, timeout;
+    if (!PyArg_ParseTuple(args, "dd", &checksum, &timeout)) {
+        return NULL;
+    }
+    if (checksum < 0 || timeout < 0 || checksum + timeout > 1) {
+        PyErr_SetString(PyExc_ValueError, "Error probabilities must be between 0 and 1 and add up to at most 1.");
+        return NULL;
+    }
+    test_dht_set_errors(checksum, timeout);
+    Py_RETURN_NONE;
+}
+
+// Set a sequence of (humidity, temperature) pairs for good mock reads to cycle through.
+static PyObject* Test_Driver_set_sequence(PyObject *self, PyObject *args)
+{
+    PyObject* values;
+    if (!PyArg_ParseTuple(args, "O", &values)) {
+        return NULL;
+    }
+    PyObject* fast = PySequence_Fast(values, "Expected a sequence of (humidity, temperature) pairs.");
+    if (fast == NULL) {
+        return NULL;
+    }
+    Py_ssize_t count = PySequence_Fast_GET_SIZE(fast);
+    if (count < 1) {
+        Py_DECREF(fast);
+        PyErr_SetString(PyExc_ValueError, "Expected at least one (humidity, temperature) pair.");
+        return NULL;
+    }
+    float* pairs = PyMem_Malloc(2 * count * sizeof(float));
+    if (pairs == NULL) {
+        Py_DECREF(fast);
+        return PyErr_NoMemory();
+    }
+    for (Py_ssize_t i = 0; i < count; ++i) {
+        if (!PyArg_ParseTuple(PySequence_Fast_GET_ITEM(fast, i), "ff;Expected (humidity, temperature) pairs.",
+                              &pairs[2*i], &pairs[2*i + 1])) {
+            PyMem_Free(pairs);
+            Py_DECREF(fast);
+            return NULL;
+        }
+    }
+    Py_DECREF(fast);
+    int result = test_dht_set_sequence(pairs, (int)count);
+    PyMem_Free(pairs);
+    if (result != 0) {
+        return PyErr_NoMemory();
+    }
+    Py_RETURN_NONE;
+}
+
+// Let good mock reads wander randomly from a starting humidity and temperature.
+static PyObject* Test_Driver_set_random_walk(PyObject *self, PyObject *args)
+{
+    float humidity, temperature, humidity_step, temperature_step;
+    if (!PyArg_ParseTuple(args, "ffff", &humidity, &temperature, &humidity_step, &temperature_step)) {
+        return NULL;
+    }
+    test_dht_set_random_walk(humidity, temperature, humidity_step, temperature_step);
+    Py_RETURN_NONE;
+}
+
+// Seed the mock's random number generator so runs can be repeated.
+static PyObject* Test_Driver_seed(PyObject *self, PyObject *args)
+{
+    unsigned long long seed;
+    if (!PyArg_ParseTuple(args, "K", &seed)) {
+        return NULL;
+    }
+    test_dht_seed(seed);
+    Py_RETURN_NONE;
+}
+
+// Put the mock back to its defaults.
+static PyObject* Test_Driver_reset(PyObject *self, PyObject *args)
+{
+    test_dht_reset();
+    Py_RETURN_NONE;
+}
+
+// Run the start signal delay of the platform drivers, for measuring its timing and CPU use.
+static PyObject* Test_Driver_precise_wait(PyObject *self, PyObject *args)
+{
+    int milliseconds;
+    if (!PyArg_ParseTuple(args, "i", &milliseconds)) {
+        return NULL;
+    }
+    if (milliseconds < 0) {
+        PyErr_SetString(PyExc_ValueError, "Wait must not be negative.");
+        return NULL;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    precise_wait_milliseconds(milliseconds);
+    Py_END_ALLOW_THREADS
+    Py_RETURN_NONE;
+}
+
 // Boilerplate python module method list and initialization functions below.
 
 static PyMethodDef module_methods[] = {
     {"read", Test_Driver_read, METH_VARARGS, "Mock DHT read function."},
+    {"open", Test_Driver_open, METH_VARARGS, "Mock DHT open function."},
+    {"read_session", Test_Driver_read_session, METH_VARARGS, "Mock DHT session read function."},
+    {"close", Test_Driver_close, METH_VARARGS, "Mock DHT close function."},
+    {"read_diagnostics", Test_Driver_read_diagnostics, METH_VARARGS, "Read an open DHT sensor and return raw pulse timing too."},
+    {"set_latency", Test_Driver_set_latency, METH_VARARGS, "Set how many milliseconds (plus random jitter) a mock DHT read takes."},
+    {"set_setup", Test_Driver_set_setup, METH_VARARGS, "Set how many milliseconds the setup of a one-shot mock DHT read or session open takes."},
+    {"set_errors", Test_Driver_set_errors, METH_VARARGS, "Set the checksum error and timeout probabilities of mock DHT reads."},
+    {"set_sequence", Test_Driver_set_sequence, METH_VARARGS, "Set (humidity, temperature) pairs for mock DHT reads to cycle through."},
+    {"set_random_walk", Test_Driver_set_random_walk, METH_VARARGS, "Let mock DHT values wander randomly from a start."},
+    {"seed", Test_Driver_seed, METH_VARARGS, "Seed the random number generator of the mock DHT."},
+    {"reset", Test_Driver_reset, METH_NOARGS, "Reset the mock DHT to its defaults."},
+    {"precise_wait", Test_Driver_precise_wait, METH_VARARGS, "Wait milliseconds like the DHT start signal does."},
     {NULL, NULL, 0, NULL}
 };
 
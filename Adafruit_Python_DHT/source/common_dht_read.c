@@ -21,24 +21,47 @@
 #include <errno.h>
 #include <sched.h>
 #include <string.h>
-#include <sys/time.h>
 #include <time.h>
 
 #include "common_dht_read.h"
 
-void busy_wait_milliseconds(uint32_t millis) {
-  // Set delay time period.
-  struct timeval deltatime;
-  deltatime.tv_sec = millis / 1000;
-  deltatime.tv_usec = (millis % 1000) * 1000;
-  struct timeval walltime;
-  // Get current time and add delay to find end time.
-  gettimeofday(&walltime, NULL);
-  struct timeval endtime;
-  timeradd(&walltime, &deltatime, &endtime);
-  // Tight loop to waste time (and CPU) until enough time as elapsed.
-  while (timercmp(&walltime, &endtime, <)) {
-    gettimeofday(&walltime, NULL);
+// How long before the deadline precise_wait_milliseconds stops sleeping and spins,
+// in nanoseconds.  Starts generous and follows the measured wake-up latency.
+#define SPIN_MIN_NANOSECONDS 20000L
+#define SPIN_MAX_NANOSECONDS 2000000L
+static long spin_nanoseconds = SPIN_MAX_NANOSECONDS / 4;
+
+static int64_t timespec_nanoseconds(const struct timespec* t) {
+  return (int64_t)t->tv_sec * 1000000000L + t->tv_nsec;
+}
+
+static struct timespec nanoseconds_timespec(int64_t ns) {
+  struct timespec t;
+  t.tv_sec = ns / 1000000000L;
+  t.tv_nsec = ns % 1000000000L;
+  return t;
+}
+
+void precise_wait_milliseconds(uint32_t millis) {
+  struct timespec now;
+  clock_gettime(CLOCK_MONOTONIC, &now);
+  int64_t deadline = timespec_nanoseconds(&now) + (int64_t)millis * 1000000L;
+  // Sleep until shortly before the deadline.  Absolute time, so an interrupted
+  // sleep just resumes.
+  int64_t wake = deadline - spin_nanoseconds;
+  if (wake > timespec_nanoseconds(&now)) {
+    struct timespec target = nanoseconds_timespec(wake);
+    while (clock_nanosleep(CLOCK_MONOTONIC, TIMER_ABSTIME, &target, NULL) == EINTR);
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    // Calibrate: aim the spin at twice the smoothed wake-up latency.
+    long late = (long)(timespec_nanoseconds(&now) - wake);
+    long spin = spin_nanoseconds + (2 * late - spin_nanoseconds) / 8;
+    spin_nanoseconds = spin < SPIN_MIN_NANOSECONDS ? SPIN_MIN_NANOSECONDS :
+                       spin > SPIN_MAX_NANOSECONDS ? SPIN_MAX_NANOSECONDS : spin;
+  }
+  // Spin out the rest for accurate timing.
+  while (timespec_nanoseconds(&now) < deadline) {
+    clock_gettime(CLOCK_MONOTONIC, &now);
   }
 }
 
@@ -49,6 +72,77 @@ void sleep_milliseconds(uint32_t millis) {
   while (clock_nanosleep(CLOCK_MONOTONIC, 0, &sleep, &sleep) && errno == EINTR);
 }
 
+uint64_t monotonic_milliseconds(void) {
+  struct timespec now;
+  clock_gettime(CLOCK_MONOTONIC, &now);
+  return (uint64_t)now.tv_sec * 1000 + now.tv_nsec / 1000000;
+}
+
+uint64_t monotonic_microseconds(void) {
+  struct timespec now;
+  clock_gettime(CLOCK_MONOTONIC, &now);
+  return (uint64_t)now.tv_sec * 1000000 + now.tv_nsec / 1000;
+}
+
+void sleep_until_milliseconds(uint64_t deadline) {
+  uint64_t now = monotonic_milliseconds();
+  if (now < deadline) {
+    sleep_milliseconds((uint32_t)(deadline - now));
+  }
+}
+
+uint32_t dht_pulse_threshold(const int pulseCounts[DHT_PULSES*2]) {
+  // Compute the average low pulse width to use as a 50 microsecond reference threshold.
+  // Ignore the first two readings because they are a constant 80 microsecond pulse.
+  uint32_t threshold = 0;
+  for (int i=2; i < DHT_PULSES*2; i+=2) {
+    threshold += pulseCounts[i];
+  }
+  return threshold / (DHT_PULSES-1);
+}
+
+int decode_dht_pulses(int type, const int pulseCounts[DHT_PULSES*2], float* humidity, float* temperature) {
+  uint32_t threshold = dht_pulse_threshold(pulseCounts);
+
+  // Interpret each high pulse as a 0 or 1 by comparing it to the 50us reference.
+  // If the count is less than 50us it must be a ~28us 0 pulse, and if it's higher
+  // then it must be a ~70us 1 pulse.
+  uint8_t data[5] = {0};
+  for (int i=3; i < DHT_PULSES*2; i+=2) {
+    int index = (i-3)/16;
+    data[index] <<= 1;
+    if (pulseCounts[i] >= threshold) {
+      // One bit for long pulse.
+      data[index] |= 1;
+    }
+    // Else zero bit for short pulse.
+  }
+
+  // Useful debug info:
+  //printf("Data: 0x%x 0x%x 0x%x 0x%x 0x%x\n", data[0], data[1], data[2], data[3], data[4]);
+
+  // Verify checksum of received data.
+  if (data[4] == ((data[0] + data[1] + data[2] + data[3]) & 0xFF)) {
+    if (type == DHT11) {
+      // Get humidity and temp for DHT11 sensor.
+      *humidity = (float)data[0];
+      *temperature = (float)data[2];
+    }
+    else if (type == DHT22) {
+      // Calculate humidity and temp for DHT22 sensor.
+      *humidity = (data[0] * 256 + data[1]) / 10.0f;
+      *temperature = ((data[2] & 0x7F) * 256 + data[3]) / 10.0f;
+      if (data[2] & 0x80) {
+        *temperature *= -1.0f;
+      }
+    }
+    return DHT_SUCCESS;
+  }
+  else {
+    return DHT_ERROR_CHECKSUM;
+  }
+}
+
 void set_max_priority(void) {
   struct sched_param sched;
   memset(&sched, 0, sizeof(sched));
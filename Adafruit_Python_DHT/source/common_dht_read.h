@@ -35,13 +35,53 @@
 #define DHT22 22
 #define AM2302 22
 
-// Busy wait delay for most accurate timing, but high CPU usage.
-// Only use this for short periods of time (a few hundred milliseconds at most)!
-void busy_wait_milliseconds(uint32_t millis);
+// Number of bit pulses to expect from the DHT.  Note that this is 41 because
+// the first pulse is a constant 50 microsecond pulse, with 40 pulses to represent
+// the data afterwards.
+#define DHT_PULSES 41
+
+// How long the data line is held high before the start signal of a read.
+#define DHT_IDLE_MILLISECONDS 500
+
+// What a diagnostic read captures besides humidity and temperature, to see why
+// reads fail on a given platform and wiring.
+typedef struct {
+  // Loop counts that each pulse was low (even index) and high (odd index), the
+  // first pair being the DHT's ~80 microsecond response.  A count that reached
+  // maxCount is the pulse that timed out; all zero means the DHT never responded.
+  int pulseCounts[DHT_PULSES*2];
+  // Average low pulse count that the high pulses were compared to.
+  uint32_t threshold;
+  // Timeout count of the platform (DHT_MAXCOUNT).
+  int maxCount;
+  // Microseconds from the start signal to the end of the last pulse.
+  uint32_t elapsedMicroseconds;
+} dht_diagnostics;
+
+// Accurate delay for the DHT start signal.  Sleeps on the monotonic clock for most
+// of the period and only busy waits for the last stretch, sized from how late
+// earlier sleeps woke up, so it costs little CPU even at real time priority.
+void precise_wait_milliseconds(uint32_t millis);
 
 // General delay that sleeps so CPU usage is low, but accuracy is potentially bad.
 void sleep_milliseconds(uint32_t millis);
 
+// Milliseconds on the monotonic clock, for deadlines that survive wall clock changes.
+uint64_t monotonic_milliseconds(void);
+
+// Microseconds on the monotonic clock, for timing the pulse capture.
+uint64_t monotonic_microseconds(void);
+
+// Sleep until the monotonic clock reaches the deadline; returns at once if it already has.
+void sleep_until_milliseconds(uint64_t deadline);
+
+// Average low pulse count of a read, the reference that tells 0 bits from 1 bits.
+uint32_t dht_pulse_threshold(const int pulseCounts[DHT_PULSES*2]);
+
+// Turn the low/high pulse counts of a read into humidity and temperature.  Returns
+// DHT_SUCCESS, or DHT_ERROR_CHECKSUM if the data doesn't match its checksum.
+int decode_dht_pulses(int type, const int pulseCounts[DHT_PULSES*2], float* humidity, float* temperature);
+
 // Increase scheduling priority and algorithm to try to get 'real time' results.
 void set_max_priority(void);
 
@@ -1,38 +1,73 @@
-import time
-import board
-import adafruit_dht
-import csv
 from datetime import datetime
-import digitalio
+import signal
 import random  # For simulating values
 
+from collector import SensorCollector
+from columnar import ColumnarWriter
+from hardware import get_backend
+from partitioned import PartitionedCSVWriter
+from rollup import ROLLUP_FIELDS, RollupEngine
+from scheduler import FixedRateScheduler
+from sqlite_store import SQLiteWriter
+from wal import DurableWriter
+
 class SensorApp:
-    def __init__(self):
+    LOG_INTERVAL = 10  # Seconds between logged rows
+    # Seconds between reads of each sensor; every logged row holds the latest
+    # reading of each one.
+    SAMPLE_INTERVALS = {'gas': 0.5, 'soil_moisture': 1.0, 'smoke': 1.0, 'dht': 2.0,
+                        'pkn': 10.0, 'ph': 10.0}
+
+    def __init__(self, concurrent=True, backend=None, storage='csv', durable=True):
+        # Real devices by default, simulated ones with AGRO_BACKEND=sim
+        self.hw = backend if backend is not None else get_backend()
+
         # Define the pins where the sensors are connected
-        self.DHT_PIN = board.D4  # DHT sensor pin
-        self.SOIL_MOISTURE_PIN = board.D17  # Soil moisture sensor pin
-        self.SMOKE_SENSOR_PIN = board.D18  # Smoke sensor pin
-        self.PH_SENSOR_PIN = board.D12  # Digital pH sensor pin
+        self.DHT_PIN = self.hw.pin('D4')  # DHT sensor pin
+        self.SOIL_MOISTURE_PIN = self.hw.pin('D17')  # Soil moisture sensor pin
+        self.SMOKE_SENSOR_PIN = self.hw.pin('D18')  # Smoke sensor pin
+        self.PH_SENSOR_PIN = self.hw.pin('D12')  # Digital pH sensor pin
 
         # Create instances for the sensors
-        self.dht_sensor = adafruit_dht.DHT11(self.DHT_PIN)
-        self.smoke_sensor = digitalio.DigitalInOut(self.SMOKE_SENSOR_PIN)
-        self.smoke_sensor.direction = digitalio.Direction.INPUT
-        self.soil_moisture_sensor = digitalio.DigitalInOut(self.SOIL_MOISTURE_PIN)
-        self.soil_moisture_sensor.direction = digitalio.Direction.INPUT
-        self.ph_sensor = digitalio.DigitalInOut(self.PH_SENSOR_PIN)
-        self.ph_sensor.direction = digitalio.Direction.INPUT
-
-        # Set up the CSV file
-        self.csvfile = open('sensorData.csv', mode='w', newline='')
-        self.writer = csv.DictWriter(self.csvfile, fieldnames=self.get_fieldnames())
-        self.writer.writeheader()
-
-        # Initialize max and min values
-        self.max_temperature = float('-inf')
-        self.min_temperature = float('inf')
-        self.max_humidity = float('-inf')
-        self.min_humidity = float('inf')
+        self.dht_sensor = self.hw.dht11(self.DHT_PIN)
+        self.smoke_sensor = self.hw.digital_input(self.SMOKE_SENSOR_PIN)
+        self.soil_moisture_sensor = self.hw.digital_input(self.SOIL_MOISTURE_PIN)
+        self.ph_sensor = self.hw.digital_input(self.PH_SENSOR_PIN)
+
+        # Set up the output file
+        self.writer = self.create_writer(storage)
+        if durable:
+            # Rows go to the write-ahead log in wal/ in groups of 6, one fsync
+            # per group, before reaching the output file, so a power cut loses
+            # at most the last 5 rows (50 s at LOG_INTERVAL). Rows the output
+            # file missed are replayed into it on the next start.
+            self.writer = DurableWriter(self.writer, 'wal', commit_rows=6, apply_rows=6)
+
+        # Min/max/mean/stddev of each reading over 1 min, 1 h and 1 day
+        # windows. Every closed window is written to rollups/ as its own row.
+        self.rollups = RollupEngine()
+        self.rollup_writer = PartitionedCSVWriter('rollups', ROLLUP_FIELDS, period='month', prefix='rollups',
+                                                  time_field='End', flush_rows=60, flush_interval=60.0)
+
+        # Read all sensors in parallel so a slow DHT read only delays itself
+        self.collector = self.create_collector(concurrent)
+        self.scheduler = FixedRateScheduler()
+
+    def create_writer(self, storage):
+        if storage == 'csv':
+            # One CSV file per day under logs/, appended to across restarts.
+            # Rows are committed in groups of 6 (one minute of data) instead
+            # of flushing the SD card on every row.
+            return PartitionedCSVWriter('logs', self.get_fieldnames(),
+                                        flush_rows=6, flush_interval=60.0)
+        if storage == 'columnar':
+            # One typed binary file per field, readable with columnar.ColumnarReader
+            return ColumnarWriter('sensorData', self.get_fieldnames(), flush_rows=6,
+                                  types={'Smoke Detected': 'bool', 'pH Condition': 'category'})
+        if storage == 'sqlite':
+            # One row per reading in sensorData.db, queryable with sqlite_store.SQLiteStore
+            return SQLiteWriter('sensorData.db', self.get_fieldnames(), batch_rows=6)
+        raise ValueError(f'Unknown storage type: {storage}')
 
     def get_fieldnames(self):
         return [
@@ -84,6 +119,17 @@ class SensorApp:
         # Simulate pH reading (replace with actual sensor logic)
         return random.uniform(0, 14)  # pH scale typically ranges from 0 to 14
 
+    def create_collector(self, concurrent):
+        collector = SensorCollector(concurrent=concurrent)
+        # The DHT can take a couple of seconds when it retries internally
+        collector.add_reader('dht', self.read_dht_sensor, timeout=3.0, default=(None, None))
+        collector.add_reader('pkn', self.read_pkn, timeout=1.0, default=0.0)
+        collector.add_reader('soil_moisture', self.read_soil_moisture, timeout=1.0)
+        collector.add_reader('smoke', self.read_smoke_sensor, timeout=1.0)
+        collector.add_reader('gas', self.read_gas_concentrations, timeout=1.0, default=(0.0, 0.0, 0.0, 0.0))
+        collector.add_reader('ph', self.read_ph_sensor, timeout=1.0, default=7.0)
+        return collector
+
     def get_ph_condition(self, ph_value):
         if ph_value < 5.5:
             return "More Acidic"
@@ -96,71 +142,84 @@ class SensorApp:
         else:
             return "More Basic"
 
+    def log_once(self):
+        current_time = datetime.now()
+        print(f"Current time: {current_time.isoformat()}", flush=True)
+
+        readings = self.collector.latest()
+        temperature, humidity = readings['dht']
+        pkn = readings['pkn']
+        soil_moisture = readings['soil_moisture']
+        soil_moisture_percentage = 100 if soil_moisture else 0
+        smoke_detected = readings['smoke']
+        benzene, alcohol, ammonia, co2 = readings['gas']
+        ph_value = readings['ph']
+        ph_condition = self.get_ph_condition(ph_value)
+
+        # Print the data to the console
+        print(f'Temperature: {temperature}°C  Humidity: {humidity}%  PKN: {pkn}  '
+              f'Soil Moisture: {soil_moisture_percentage:.2f}%  Smoke Detected: {"Yes" if smoke_detected else "No"}', flush=True)
+        print(f'Gas Concentrations - Benzene: {benzene:.2f} ppm, Alcohol: {alcohol:.2f} ppm, '
+              f'Ammonia: {ammonia:.2f} ppm, CO2: {co2:.2f} ppm', flush=True)
+        print(f'pH Level: {ph_value:.2f}  pH Condition: {ph_condition}', flush=True)
+        print(f'Read times: {readings.format_durations()}', flush=True)
+
+        # Update the window statistics; today's window gives the daily max/min
+        self.rollup_writer.writerows(self.rollups.update({
+            'Temperature (°C)': temperature,
+            'Humidity (%)': humidity,
+            'PKN (units)': pkn,
+            'Benzene Concentration (ppm)': benzene,
+            'Alcohol Concentration (ppm)': alcohol,
+            'Ammonia Concentration (ppm)': ammonia,
+            'CO2 Concentration (ppm)': co2,
+            'pH Level': ph_value,
+        }, current_time))
+        today = self.rollups.tumbling('Temperature (°C)', '1day')
+
+        # Get the current timestamp
+        timestamp = current_time.isoformat()
+
+        # Write the data to the CSV file
+        self.writer.writerow({
+            'Timestamp': timestamp,
+            'Temperature (°C)': f'{temperature}' if temperature is not None else 'N/A',
+            'Humidity (%)': f'{humidity}' if humidity is not None else 'N/A',
+            'Max Temperature (°C)': f'{today.max:.2f}' if today.count else 'N/A',
+            'Min Temperature (°C)': f'{today.min:.2f}' if today.count else 'N/A',
+            'PKN (units)': f'{pkn}',
+            'Soil Moisture (%)': f'{soil_moisture_percentage:.2f}',
+            'Smoke Detected': 'Yes' if smoke_detected else 'No',
+            'Benzene Concentration (ppm)': f'{benzene:.2f}',
+            'Alcohol Concentration (ppm)': f'{alcohol:.2f}',
+            'Ammonia Concentration (ppm)': f'{ammonia:.2f}',
+            'CO2 Concentration (ppm)': f'{co2:.2f}',
+            'pH Level': f'{ph_value:.2f}',
+            'pH Condition': ph_condition
+        })
+        print(f'Schedule:\n{self.scheduler.report()}', flush=True)
+
     def log_data(self):
-        while True:
-            current_time = datetime.now()
-            print(f"Current time: {current_time.isoformat()}", flush=True)
-
-            temperature, humidity = self.read_dht_sensor()
-            pkn = self.read_pkn()
-            soil_moisture = self.read_soil_moisture()
-            soil_moisture_percentage = 100 if soil_moisture else 0
-            smoke_detected = self.read_smoke_sensor()
-            benzene, alcohol, ammonia, co2 = self.read_gas_concentrations()
-            ph_value = self.read_ph_sensor()
-            ph_condition = self.get_ph_condition(ph_value)
-
-            # Update max and min values
-            if temperature is not None:
-                if temperature > self.max_temperature:
-                    self.max_temperature = temperature
-                if temperature < self.min_temperature:
-                    self.min_temperature = temperature
-            
-            if humidity is not None:
-                if humidity > self.max_humidity:
-                    self.max_humidity = humidity
-                if humidity < self.min_humidity:
-                    self.min_humidity = humidity
-
-            # Print the data to the console
-            print(f'Temperature: {temperature}°C  Humidity: {humidity}%  PKN: {pkn}  '
-                  f'Soil Moisture: {soil_moisture_percentage:.2f}%  Smoke Detected: {"Yes" if smoke_detected else "No"}', flush=True)
-            print(f'Gas Concentrations - Benzene: {benzene:.2f} ppm, Alcohol: {alcohol:.2f} ppm, '
-                  f'Ammonia: {ammonia:.2f} ppm, CO2: {co2:.2f} ppm', flush=True)
-            print(f'pH Level: {ph_value:.2f}  pH Condition: {ph_condition}', flush=True)
-
-            # Get the current timestamp
-            timestamp = current_time.isoformat()
-
-            # Write the data to the CSV file
-            self.writer.writerow({
-                'Timestamp': timestamp,
-                'Temperature (°C)': f'{temperature}' if temperature is not None else 'N/A',
-                'Humidity (%)': f'{humidity}' if humidity is not None else 'N/A',
-                'Max Temperature (°C)': f'{self.max_temperature:.2f}',
-                'Min Temperature (°C)': f'{self.min_temperature:.2f}',
-                'PKN (units)': f'{pkn}',
-                'Soil Moisture (%)': f'{soil_moisture_percentage:.2f}',
-                'Smoke Detected': 'Yes' if smoke_detected else 'No',
-                'Benzene Concentration (ppm)': f'{benzene:.2f}',
-                'Alcohol Concentration (ppm)': f'{alcohol:.2f}',
-                'Ammonia Concentration (ppm)': f'{ammonia:.2f}',
-                'CO2 Concentration (ppm)': f'{co2:.2f}',
-                'pH Level': f'{ph_value:.2f}',
-                'pH Condition': ph_condition
-            })
-            # Write an empty row for better visualization
-            self.writer.writerow({})  # Adds an empty row
-
-            self.csvfile.flush()
-            time.sleep(10)  # Wait for 10 seconds before the next reading
+        # Each sensor is read on its own fixed-rate grid. The reads run on the
+        # collector's workers, not the scheduler thread, so a DHT read that
+        # retries for seconds doesn't hold up the 0.5 s gas job. Rows are
+        # logged on a fixed 10 second grid, starting one interval in so every
+        # sensor has been read.
+        for name, interval in self.SAMPLE_INTERVALS.items():
+            self.scheduler.add_job(name, interval, lambda name=name: self.collector.sample(name))
+        self.scheduler.add_job('log', self.LOG_INTERVAL, self.log_once, delay=self.LOG_INTERVAL)
+        self.scheduler.run()
 
     def close(self):
-        self.csvfile.close()
+        self.scheduler.stop()
+        self.collector.close()
+        self.writer.close()
+        self.rollup_writer.close()
         print("Exiting the program.")
 
 if __name__ == '__main__':
+    # Treat SIGTERM like Ctrl+C so buffered rows are written on shutdown
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
     app = SensorApp()
     try:
         app.log_data()
@@ -6,8 +6,15 @@ https://newbiely.com/tutorials/raspberry-pi/raspberry-pi-gas-sensor
 """
 
 
-import RPi.GPIO as GPIO
-import time
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hardware import get_backend
+from scheduler import FixedRateScheduler
+
+# RPi.GPIO on the Pi, a simulated stand-in with AGRO_BACKEND=sim
+GPIO = get_backend().gpio()
 
 # Set up the GPIO mode
 GPIO.setmode(GPIO.BCM)
@@ -16,24 +23,29 @@ GPIO.setmode(GPIO.BCM)
 DO_PIN = 7  # Replace with the actual GPIO pin number
 GPIO.setup(DO_PIN, GPIO.IN)
 
-try:
-    while True:
-        # Read the state of the DO pin
-        gas_present = GPIO.input(DO_PIN)
+def read_gas():
+    # Read the state of the DO pin
+    gas_present = GPIO.input(DO_PIN)
 
-        # Determine if gas is present or not
-        if gas_present == GPIO.LOW:
-            gas_state = "Gas Present"
-        else:
-            gas_state = "No Gas"
+    # Determine if gas is present or not
+    if gas_present == GPIO.LOW:
+        gas_state = "Gas Present"
+    else:
+        gas_state = "No Gas"
 
-        # Print the gas state
-        print(f"Gas State: {gas_state}")
+    # Print the gas state
+    print(f"Gas State: {gas_state}")
 
-        time.sleep(0.5)  # Wait for a short period before reading again
+# Read every 0.5 seconds on a fixed grid
+scheduler = FixedRateScheduler()
+scheduler.add_job('gas', 0.5, read_gas)
+
+try:
+    scheduler.run()
 
 except KeyboardInterrupt:
     print("Gas detection stopped by user")
+    print(scheduler.report())
 
 finally:
     # Clean up GPIO settings
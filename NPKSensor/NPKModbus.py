@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hardware import get_backend
+from modbus import NPKModbusReader
+from scheduler import FixedRateScheduler
+
+# Modbus-RTU soil NPK probes on one RS485 line (USB adapter at AGRO_MODBUS_PORT,
+# /dev/ttyUSB0 by default; simulated probes with AGRO_BACKEND=sim)
+SLAVE_ADDRESSES = range(1, 21)  # Replace with the addresses of your probes
+BAUDRATE = 9600
+TIMEOUT = 0.2  # Seconds a probe has to answer
+
+backend = get_backend()
+port = backend.modbus_port(slaves=SLAVE_ADDRESSES, baudrate=BAUDRATE)
+reader = NPKModbusReader(port, SLAVE_ADDRESSES, baudrate=BAUDRATE, timeout=TIMEOUT)
+
+def read_npk():
+    # Poll every probe once, back to back
+    for slave, values in reader.poll().items():
+        if values is None:
+            print(f'Probe {slave}: no reading')
+            continue
+        print(f'Probe {slave}: N {values["nitrogen"]:.0f}  P {values["phosphorus"]:.0f}  '
+              f'K {values["potassium"]:.0f} mg/kg  Moisture {values["moisture"]:.1f}%  '
+              f'Temperature {values["temperature"]:.1f}°C  EC {values["ec"]:.0f} uS/cm  '
+              f'pH {values["ph"]:.1f}')
+
+# Poll all probes every 10 seconds on a fixed grid
+scheduler = FixedRateScheduler()
+scheduler.add_job('npk', 10, read_npk)
+
+try:
+    scheduler.run()
+
+except KeyboardInterrupt:
+    print("NPK polling stopped by user")
+    print(scheduler.report())
+    print(reader.report())
+
+finally:
+    reader.close()
+    backend.close()
@@ -1,37 +1,331 @@
-import spidev
+import ctypes
+import fcntl
+import os
+import sys
+import threading
 import time
+from collections import deque
 
-# Initialize SPI
-spi = spidev.SpiDev()
-spi.open(0, 0)  # Open bus 0, device 0
-spi.max_speed_hz = 1350000
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from buses import get_bus_manager
+from calibration import load_calibrations
+
+# Initialize SPI (a simulated MCP3008 with AGRO_BACKEND=sim). The bus manager
+# owns the device, so other collectors in this process share it safely.
+buses = get_bus_manager()
+backend = buses.backend
+
+def open_spi():
+    # The MCP3008 on bus 0, device 0; reopened if the bus manager was closed.
+    return buses.spi(0, 0, max_speed_hz=1350000)
+
+spi = open_spi()
+
+# Calibration curves of the probes (see calibration.py for the format)
+CALIBRATION_FILE = os.environ.get('AGRO_CALIBRATION', 'calibration.json')
 
 def read_channel(channel):
     # Read SPI data from the MCP3008 chip
-    adc = spi.xfer2([1, (8 + channel) << 4, 0])
+    adc = open_spi().xfer2([1, (8 + channel) << 4, 0])
     data = ((adc[1] & 3) << 8) + adc[2]
     return data
 
+
+# struct spi_ioc_transfer from linux/spi/spidev.h: one segment of a message.
+class _SpiIocTransfer(ctypes.Structure):
+    _fields_ = [
+        ('tx_buf', ctypes.c_uint64),
+        ('rx_buf', ctypes.c_uint64),
+        ('len', ctypes.c_uint32),
+        ('speed_hz', ctypes.c_uint32),
+        ('delay_usecs', ctypes.c_uint16),
+        ('bits_per_word', ctypes.c_uint8),
+        ('cs_change', ctypes.c_uint8),
+        ('tx_nbits', ctypes.c_uint8),
+        ('rx_nbits', ctypes.c_uint8),
+        ('word_delay_usecs', ctypes.c_uint8),
+        ('pad', ctypes.c_uint8),
+    ]
+
+
+def _spi_ioc_message(count):
+    # SPI_IOC_MESSAGE(count) = _IOW('k', 0, char[count * sizeof(spi_ioc_transfer)])
+    return (1 << 30) | (count * ctypes.sizeof(_SpiIocTransfer) << 16) | (ord('k') << 8)
+
+
+class Scanner:
+    """Reads a fixed set of MCP3008 channels in one SPI transaction.
+
+    The MCP3008 needs chip select raised between conversions, so one
+    concatenated xfer2 won't do. Instead all conversion requests go to the
+    kernel as a single SPI_IOC_MESSAGE with one 3 byte segment per channel
+    and cs_change set between them: one ioctl per scan instead of one per
+    channel. Buffers and the message are built once here. The simulated
+    MCP3008 treats every 3 byte group of an xfer2 as its own conversion, so
+    with AGRO_BACKEND=sim the requests go out as one xfer2 instead.
+    """
+
+    def __init__(self, channels=range(8), device=None):
+        self.channels = np.array(list(channels), dtype=np.uint8)
+        if not len(self.channels) or self.channels.max() > 7:
+            raise ValueError('Expected MCP3008 channels 0 to 7')
+        self.spi = device if device is not None else open_spi()
+        # Transfers on a shared device hold its bus for the whole scan.
+        self.bus = getattr(self.spi, 'bus', None)
+        count = len(self.channels)
+        # Start bit, then single-ended mode and the channel in the top nibble.
+        self.tx = np.zeros((count, 3), dtype=np.uint8)
+        self.tx[:, 0] = 1
+        self.tx[:, 1] = (8 + self.channels) << 4
+        self.rx = np.zeros((count, 3), dtype=np.uint8)
+        self.values = np.empty(count, dtype=np.uint16)
+        self.fd = self.spi.fileno() if hasattr(self.spi, 'fileno') else None
+        if self.fd is not None:
+            self.message = (_SpiIocTransfer * count)()
+            for i, transfer in enumerate(self.message):
+                transfer.tx_buf = self.tx.ctypes.data + 3 * i
+                transfer.rx_buf = self.rx.ctypes.data + 3 * i
+                transfer.len = 3
+                transfer.speed_hz = self.spi.max_speed_hz
+                transfer.cs_change = 1 if i < count - 1 else 0
+            self.request = _spi_ioc_message(count)
+
+    def read(self):
+        """Convert every channel and return their 10 bit values as a uint16
+        array in the order of channels. The array is reused by the next
+        read(); copy it to keep it."""
+        if self.bus is not None:
+            self.bus.acquire()
+        try:
+            if self.fd is not None:
+                fcntl.ioctl(self.fd, self.request, self.message)
+            else:
+                self.rx.ravel()[:] = self.spi.xfer2(self.tx.ravel().tolist())
+        finally:
+            if self.bus is not None:
+                self.bus.release()
+        # Bits 9-8 are the low two bits of the second byte, bits 7-0 the third.
+        values = self.values
+        np.bitwise_and(self.rx[:, 1], 3, out=values)
+        values <<= 8
+        values |= self.rx[:, 2]
+        return values
+
+
+_scanners = {}
+# Cached scanners hold the SPI handle, which closing the bus manager closes.
+buses.on_close(_scanners.clear)
+
+def scan(channels=range(8)):
+    """Read any set of MCP3008 channels in one SPI transaction and return a
+    new uint16 array of their values, in the order given."""
+    key = tuple(channels)
+    scanner = _scanners.get(key)
+    if scanner is None:
+        scanner = _scanners[key] = Scanner(key)
+    return scanner.read().copy()
+
+
+class OversamplerStats:
+    # Counters of an Oversampler's acquisition thread. Late counts sample
+    # slots that were skipped because a read or the scheduler ran behind.
+    def __init__(self):
+        self.samples = 0
+        self.late = 0
+        self.errors = 0
+        self.rejected = 0
+        self.blocks = 0
+
+    def __repr__(self):
+        return (f'samples={self.samples} late={self.late} errors={self.errors} '
+                f'rejected={self.rejected} blocks={self.blocks}')
+
+
+def _cic_weights(length, order):
+    # Impulse response of an order stage CIC (cascaded boxcar) decimator that
+    # fits in length samples, normalized to unity DC gain.
+    box = max(1, (length - 1) // order + 1)
+    weights = np.ones(1)
+    for _ in range(order):
+        weights = np.convolve(weights, np.ones(box))
+    return weights / weights.sum()
+
+
+class Oversampler:
+    """Samples MCP3008 channels at a high rate in a background thread and
+    reduces every interval seconds of samples to one clean value per channel.
+
+    Each block of rate * interval scans goes into one preallocated uint16
+    buffer, so memory stays fixed however long it runs. The same thread
+    reduces a full block before sampling the next; that takes well under a
+    millisecond for 1000 scans of 8 channels, and slots it pushes back are
+    caught up on the sample grid or counted as late. Samples further than reject
+    robust standard deviations (median absolute deviation * 1.4826) from the
+    block median are replaced by the median, then the block is decimated to
+    one float per channel with method:
+
+      'mean'    boxcar average of the whole block (a first order CIC)
+      'cic'     order stage CIC, which rejects interference between its nulls
+                better than a single boxcar
+      'median'  block median, for spiky probes
+
+    Averaging n samples of white noise gains about log2(n) / 2 bits over
+    the 10 bit converter. The last keep results are held as
+    (timestamp, values) pairs; latest() returns the newest without blocking,
+    so the logging loop never waits on the ADC. Set reject to None to keep
+    every sample.
+    """
+
+    METHODS = ('mean', 'cic', 'median')
+
+    def __init__(self, channels=(0,), rate=1000.0, interval=1.0, method='mean', order=3,
+                 reject=3.5, keep=60, scanner=None):
+        if method not in self.METHODS:
+            raise ValueError(f'Expected method to be one of {", ".join(self.METHODS)}')
+        if rate <= 0 or interval <= 0:
+            raise ValueError('Rate and interval must be greater than zero.')
+        self.scanner = scanner if scanner is not None else Scanner(channels)
+        self.channels = self.scanner.channels.tolist()
+        self.rate = rate
+        self.interval = interval
+        self.method = method
+        self.reject = reject
+        self.block = max(1, round(rate * interval))
+        shape = (self.block, len(self.channels))
+        self.buffer = np.empty(shape, dtype=np.uint16)
+        self.weights = _cic_weights(self.block, order) if method == 'cic' else None
+        self.results = deque(maxlen=keep)
+        self.stats = OversamplerStats()
+        self.error = None  # last exception from the ADC
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='oversampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def latest(self):
+        """Newest (timestamp, values) result, or None before the first block.
+        Values is a float64 array in the order of channels."""
+        try:
+            return self.results[-1]
+        except IndexError:
+            return None
+
+    def history(self, n=None):
+        """The last n results (all kept results if None), oldest first."""
+        results = list(self.results)
+        return results if n is None else results[-n:]
+
+    def _run(self):
+        period = 1.0 / self.rate
+        clock = time.perf_counter
+        origin = clock()
+        slot = 0
+        buffer = self.buffer
+        while not self.stop_event.is_set():
+            filled = 0
+            while filled < self.block and not self.stop_event.is_set():
+                # Sample on the grid origin + slot * period so sleep overshoot
+                # doesn't lower the rate; skip slots we are already past.
+                deadline = origin + slot * period
+                now = clock()
+                if deadline > now:
+                    time.sleep(deadline - now)
+                elif now - deadline > period:
+                    behind = int((now - deadline) / period)
+                    self.stats.late += behind
+                    slot += behind
+                slot += 1
+                try:
+                    buffer[filled] = self.scanner.read()
+                except Exception as e:
+                    self.error = e
+                    self.stats.errors += 1
+                    continue
+                filled += 1
+            if filled < self.block:
+                break
+            self.stats.samples += filled
+            self.results.append((time.time(), self.reduce(buffer)))
+            self.stats.blocks += 1
+
+    def reduce(self, block):
+        """Outlier rejection and decimation of one (samples, channels) block
+        to a float64 value per channel."""
+        samples = block.astype(np.float64)
+        if self.reject is not None:
+            median = np.median(samples, axis=0)
+            spread = np.median(np.abs(samples - median), axis=0) * 1.4826
+            # Floor the spread at half a count so a quiet channel keeps its
+            # +-1 count converter noise.
+            outliers = np.abs(samples - median) > self.reject * np.maximum(spread, 0.5)
+            rejected = int(np.count_nonzero(outliers))
+            if rejected:
+                self.stats.rejected += rejected
+                samples = np.where(outliers, median, samples)
+        if self.method == 'median':
+            return np.median(samples, axis=0)
+        if self.method == 'cic':
+            return self.weights @ samples[-len(self.weights):]
+        return samples.mean(axis=0)
+
+
 def main():
+    # Probes without a calibration are printed as raw counts
+    calibrations = {}
+    if os.path.exists(CALIBRATION_FILE):
+        calibrations = {name: table for name, table in load_calibrations(CALIBRATION_FILE).items()
+                        if table.channel is not None}
+
+    # Sample all probes at 1 kHz and log one clean value per second (the NPK
+    # sensor is on channel 0)
+    sampler = Oversampler(channels=range(8), rate=1000.0, interval=1.0)
     try:
+        sampler.start()
         while True:
-            # Read NPK values (assuming you connect NPK sensor to channel 0)
-            npk_value = read_channel(0)
-
-            # Print the raw NPK sensor value
-            print(f'NPK Sensor Value: {npk_value}')
+            time.sleep(1)
+            result = sampler.latest()
+            if result is None:
+                continue
+            values = result[1]
+            npk_value = values[0]
 
-            # Add your conversion logic here if necessary
-            # For example, map the value to N, P, K levels
-            # e.g., npk_nitrogen = npk_value * conversion_factor
+            # Print the filtered NPK sensor value and the other channels
+            print(f'NPK Sensor Value: {npk_value:.2f}  channels: {values.round(2).tolist()}')
 
-            time.sleep(1)
+            # Convert the calibrated probes, e.g. the NPK sensor to mg/kg
+            if calibrations:
+                print('  '.join(f'{name}: {table.convert(values[table.channel]):.2f} {table.unit}'
+                                for name, table in calibrations.items()))
 
     except KeyboardInterrupt:
         print("Program stopped")
 
     finally:
-        spi.close()
+        sampler.stop()
+        print(f'Sampler: {sampler.stats}')
+        print(buses.report())
+        buses.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,330 @@
+import csv
+import io
+import re
+from collections import namedtuple
+from itertools import islice
+
+import numpy as np
+
+from partitioned import PartitionIndex
+
+
+# Offline analysis of the logger's CSV files with numpy.
+#
+# Files are parsed chunk_rows lines at a time by numpy's C parser into typed
+# arrays: timestamps become datetime64[us], numeric columns float64 with
+# missing readings ('N/A', 'None', '', and the 'inf'/'-inf' written by the
+# old max/min tracking) as NaN, Yes/No and True/False columns bool, and
+# anything else a string column.
+
+BOOL_VALUES = {'Yes': True, 'True': True, 'No': False, 'False': False}
+MISSING = ('', 'N/A', 'None', 'nan', 'NaN', 'inf', '-inf')
+
+# Missing cells are rewritten to 'nan' in the raw text of a chunk so numpy
+# can parse numeric columns without a Python call per cell. Each rewrite runs
+# twice to catch runs of adjacent missing cells.
+_REWRITES = [(f',{token}{end}', f',nan{end}') for token in ('N/A', 'None', '') for end in (',', '\r', '\n')]
+
+_UNITS = {'s': 's', 'min': 'm', 'm': 'm', 'h': 'h', 'D': 'D', 'd': 'D', 'W': 'W'}
+
+# Per-bin statistics returned by resample(); empty bins have count 0 and NaN
+# statistics.
+Aggregate = namedtuple('Aggregate', 'time count min max mean std')
+
+
+def infer_types(header, rows):
+    # 'float', 'bool' or 'str' for every column after the first, from a sample.
+    types = {}
+    for index, name in enumerate(header[1:], start=1):
+        values = {row[index].strip() for row in rows if index < len(row)} - set(MISSING)
+        if values and values <= set(BOOL_VALUES):
+            types[name] = 'bool'
+            continue
+        try:
+            for value in values:
+                float(value)
+            types[name] = 'float'
+        except ValueError:
+            types[name] = 'str'
+    return types
+
+
+class SensorTable:
+    """Typed columns of a sensor log.
+
+    timestamps is a datetime64[us] array and table[name] the column array.
+    mask(name) is True where the column has a reading.
+    """
+
+    def __init__(self, timestamps, columns, masks=None):
+        self.timestamps = timestamps
+        self.columns = columns
+        self.masks = masks or {}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def fieldnames(self):
+        return list(self.columns)
+
+    @property
+    def types(self):
+        # Column kinds in the form load_csv(types=...) accepts.
+        kinds = {'b': 'bool', 'f': 'float', 'U': 'str'}
+        return {name: kinds[values.dtype.kind] for name, values in self.columns.items()}
+
+    def mask(self, name):
+        values = self.columns[name]
+        if name in self.masks:
+            return self.masks[name]
+        if values.dtype.kind == 'f':
+            return ~np.isnan(values)
+        return values != ''
+
+    def take(self, index):
+        # New table holding the rows selected by an index or boolean array.
+        return SensorTable(self.timestamps[index],
+                           {name: values[index] for name, values in self.columns.items()},
+                           {name: mask[index] for name, mask in self.masks.items()})
+
+    def between(self, start=None, end=None):
+        # Rows with start <= timestamp <= end; both accept datetimes or ISO strings.
+        keep = np.ones(len(self), dtype=bool)
+        if start is not None:
+            keep &= self.timestamps >= np.datetime64(start, 'us')
+        if end is not None:
+            keep &= self.timestamps <= np.datetime64(end, 'us')
+        return self.take(keep)
+
+    @classmethod
+    def concat(cls, tables):
+        tables = [t for t in tables if len(t)]
+        if not tables:
+            return cls(np.empty(0, 'datetime64[us]'), {})
+        names = tables[0].fieldnames
+        for table in tables[1:]:
+            if table.fieldnames != names:
+                raise ValueError(f'Cannot concatenate logs with different fields: {table.fieldnames}')
+        masks = {name: np.concatenate([t.masks[name] for t in tables]) for name in tables[0].masks}
+        return cls(np.concatenate([t.timestamps for t in tables]),
+                   {name: np.concatenate([t.columns[name] for t in tables]) for name in names},
+                   masks)
+
+
+def _dtype(header, types):
+    fields = [('t', 'M8[us]')]
+    for index, name in enumerate(header[1:], start=1):
+        kind = types[name]
+        fields.append((f'c{index}', {'str': 'U64', 'bool': 'U8'}.get(kind, 'f8')))
+    return np.dtype(fields)
+
+
+def _parse_fast(lines, dtype):
+    text = ''.join(lines)
+    for old, new in _REWRITES:
+        if old in text:
+            text = text.replace(old, new).replace(old, new)
+    return np.loadtxt(io.StringIO(text), delimiter=',', quotechar='"', dtype=dtype, ndmin=1)
+
+
+def _parse_slow(lines, dtype):
+    # Cell by cell, for chunks the fast path rejects (short rows, stray text
+    # in a numeric column). Unparseable cells become missing.
+    rows = [row for row in csv.reader(lines) if row and row[0].strip()]
+    out = np.empty(len(rows), dtype=dtype)
+    out['t'] = [np.datetime64(row[0].strip(), 'us') for row in rows]
+    for index, name in enumerate(dtype.names[1:], start=1):
+        cells = [row[index].strip() if index < len(row) else '' for row in rows]
+        if dtype[name].kind == 'U':
+            out[name] = cells
+            continue
+        values = np.full(len(rows), np.nan)
+        for i, cell in enumerate(cells):
+            if cell not in MISSING:
+                try:
+                    values[i] = float(cell)
+                except ValueError:
+                    pass
+        out[name] = values
+    return out
+
+
+def load_csv(path, types=None, time_field='Timestamp', chunk_rows=100_000):
+    """Load one logger CSV file into a SensorTable.
+
+    types maps a field to 'float', 'bool' or 'str'; fields not listed are
+    inferred from the first chunk. Header names and cells are stripped of
+    the padding some loggers add.
+    """
+    with open(path, newline='', encoding='utf-8') as infile:
+        header = [name.strip() for name in next(csv.reader([infile.readline()]), [])]
+        if not header:
+            return SensorTable(np.empty(0, 'datetime64[us]'), {})
+        if header[0] != time_field:
+            raise ValueError(f'{path}: first column is {header[0]!r}, expected {time_field!r}')
+        chunks = []
+        kinds = None
+        while True:
+            lines = list(islice(infile, chunk_rows))
+            if not lines:
+                break
+            if not lines[-1].endswith('\n'):
+                lines.pop()  # torn last line of a log that is still being written
+            lines = [line for line in lines if line.strip()]
+            if not lines:
+                continue
+            if kinds is None:
+                kinds = infer_types(header, list(csv.reader(lines[:1000])))
+                kinds.update(types or {})
+                dtype = _dtype(header, kinds)
+            try:
+                chunks.append(_parse_fast(lines, dtype))
+            except ValueError:
+                chunks.append(_parse_slow(lines, dtype))
+
+    if kinds is None:
+        kinds = infer_types(header, [])
+        kinds.update(types or {})
+    data = np.concatenate(chunks) if chunks else np.empty(0, dtype=_dtype(header, kinds))
+    columns = {}
+    masks = {}
+    for index, name in enumerate(header[1:], start=1):
+        values = data[f'c{index}']
+        if kinds[name] == 'str':
+            values = np.where(np.isin(values, MISSING), '', values)
+        elif kinds[name] == 'bool':
+            masks[name] = ~np.isin(values, MISSING)
+            values = np.isin(values, [word for word, flag in BOOL_VALUES.items() if flag])
+        else:
+            # Old logs wrote -inf/inf as max/min before the first reading
+            values = np.where(np.isfinite(values), values, np.nan)
+        columns[name] = values
+    return SensorTable(data['t'], columns, masks)
+
+
+def load_partitions(directory, start=None, end=None, prefix='sensorData', types=None,
+                    time_field='Timestamp', chunk_rows=100_000):
+    """Load the rows with start <= timestamp <= end from a partitioned log
+    directory (see partitioned.PartitionedCSVWriter), opening only the
+    partitions that overlap the range."""
+    index = PartitionIndex(directory, prefix, time_field)
+    tables = []
+    for entry in index.partitions_for(start, end):
+        table = load_csv(index.path(entry['file']), types, time_field, chunk_rows)
+        if len(table):
+            # Keep column types consistent with the first partition
+            types = dict(table.types, **(types or {}))
+            tables.append(table)
+    table = SensorTable.concat(tables)
+    if start is not None or end is not None:
+        table = table.between(start, end)
+    return table
+
+
+def _period(period):
+    if isinstance(period, np.timedelta64):
+        return period
+    match = re.fullmatch(r'\s*(\d*)\s*([A-Za-z]+)\s*', period)
+    if match is None or match.group(2) not in _UNITS:
+        raise ValueError(f'Unknown period {period!r}, use e.g. 10s, 5min, 1h, 1D')
+    return np.timedelta64(int(match.group(1) or 1), _UNITS[match.group(2)])
+
+
+def resample(timestamps, values, period='1h'):
+    """Aggregate values into consecutive bins of length period ('10min',
+    '1h', '1D', ...) aligned to the wall clock. Missing values are ignored.
+    Returns an Aggregate of arrays with one entry per bin from the first to
+    the last reading."""
+    values = np.asarray(values, dtype=np.float64)
+    step = _period(period).astype('timedelta64[us]')
+    ok = ~np.isnan(values)
+    times = np.asarray(timestamps, dtype='datetime64[us]')[ok]
+    values = values[ok]
+    if not len(values):
+        empty = np.empty(0)
+        return Aggregate(np.empty(0, 'datetime64[us]'), np.empty(0, np.int64), empty, empty, empty, empty)
+
+    offsets = times - np.datetime64(0, 'us')
+    first = offsets.min() // step
+    bins = (offsets // step - first).astype(np.int64)
+    size = int(bins.max()) + 1
+
+    count = np.bincount(bins, minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(bins, weights=values, minlength=size) / count
+        squares = np.bincount(bins, weights=(values - mean[bins]) ** 2, minlength=size)
+        std = np.sqrt(squares / (count - 1))
+    std[count == 1] = 0.0
+    std[count == 0] = np.nan  # 0 / -1 above gives -0.0, not NaN
+
+    order = np.argsort(bins, kind='stable')
+    bins, values = bins[order], values[order]
+    used, starts = np.unique(bins, return_index=True)
+    low = np.full(size, np.nan)
+    high = np.full(size, np.nan)
+    low[used] = np.minimum.reduceat(values, starts)
+    high[used] = np.maximum.reduceat(values, starts)
+
+    time = np.datetime64(0, 'us') + (first + np.arange(size)) * step
+    return Aggregate(time, count, low, high, mean, std)
+
+
+def daily(timestamps, values):
+    # Per-day (local midnight to midnight) count, min, max, mean and std.
+    return resample(timestamps, values, '1D')
+
+
+def rolling(values, window, stat='mean', min_count=1):
+    """Statistic over each value and the window - 1 values before it.
+
+    stat is 'mean', 'std', 'min', 'max' or 'count'. Missing values are
+    ignored; positions with fewer than min_count readings are NaN. Runs in
+    O(n) whatever the window size.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    ok = ~np.isnan(values)
+    index = np.arange(len(values))
+    low = np.maximum(index - window + 1, 0)
+    counts = np.concatenate(([0], np.cumsum(ok)))
+    count = counts[index + 1] - counts[low]
+
+    if stat == 'count':
+        return count
+    if stat in ('mean', 'std'):
+        # Centre first so the running sums don't lose precision
+        centre = values[ok].mean() if ok.any() else 0.0
+        centred = np.where(ok, values - centre, 0.0)
+        sums = np.concatenate(([0.0], np.cumsum(centred)))
+        total = sums[index + 1] - sums[low]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if stat == 'mean':
+                result = total / count + centre
+            else:
+                squares = np.concatenate(([0.0], np.cumsum(centred ** 2)))
+                variance = (squares[index + 1] - squares[low] - total ** 2 / count) / (count - 1)
+                result = np.sqrt(np.maximum(variance, 0.0))
+                result[count == 1] = 0.0
+    elif stat in ('min', 'max'):
+        result = _rolling_extreme(values, window, np.fmin if stat == 'min' else np.fmax)
+    else:
+        raise ValueError(f'Unknown statistic {stat!r}')
+    result[count < max(min_count, 1)] = np.nan
+    return result
+
+
+def _rolling_extreme(values, window, func):
+    # van Herk/Gil-Werman: running extremes within blocks of window values,
+    # from the left and from the right, combined for each window position.
+    # fmin/fmax skip NaN.
+    size = len(values)
+    padded = np.full(window - 1 + size + (-(window - 1 + size)) % window, np.nan)
+    padded[window - 1:window - 1 + size] = values
+    blocks = padded.reshape(-1, window)
+    prefix = func.accumulate(blocks, axis=1).ravel()
+    suffix = func.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    index = np.arange(size)
+    return func(suffix[index], prefix[index + window - 1])
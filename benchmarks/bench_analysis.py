@@ -0,0 +1,89 @@
+# Load and analysis time of analysis.py on a synthetic sensorData CSV
+# against row-by-row parsing with csv.DictReader.
+#
+#   python benchmarks/bench_analysis.py --rows 3153600   # a year of 10 s rows
+#
+# Needs numpy.
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from analysis import daily, load_csv, resample, rolling
+
+FIELDNAMES = ['Timestamp', 'Temperature (°C)', 'Humidity (%)', 'Max Temperature (°C)',
+              'Min Temperature (°C)', 'Soil Moisture (%)', 'Smoke Detected', 'Lux (lux)',
+              'CO2 (ppm)', 'pH Level', 'pH Condition']
+
+
+def write_csv(path, count):
+    rng = random.Random(1)
+    start = datetime(2024, 1, 1)
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(FIELDNAMES)
+        for i in range(count):
+            ph = rng.uniform(0, 14)
+            dht = i % 50 != 0
+            writer.writerow([
+                (start + timedelta(seconds=10 * i)).isoformat(timespec='microseconds'),
+                f'{rng.uniform(10, 35):.1f}' if dht else 'N/A',
+                f'{rng.uniform(20, 90):.1f}' if dht else 'N/A',
+                '35.00', '10.00',
+                rng.choice(('True', 'False')),
+                'Yes' if rng.random() < 0.1 else 'No',
+                f'{rng.uniform(0, 30000):.2f}',
+                f'{rng.uniform(0, 1500):.2f}',
+                f'{ph:.2f}',
+                'Acidic' if ph < 7 else 'Basic',
+            ])
+
+
+def load_rows(path):
+    columns = {name: [] for name in FIELDNAMES}
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
+            columns['Timestamp'].append(datetime.fromisoformat(row['Timestamp']))
+            for name in ('Temperature (°C)', 'Humidity (%)', 'Lux (lux)', 'CO2 (ppm)', 'pH Level'):
+                value = row[name]
+                columns[name].append(float('nan') if value == 'N/A' else float(value))
+            columns['Smoke Detected'].append(row['Smoke Detected'] == 'Yes')
+    return columns
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f'{label:28s} {(time.perf_counter() - start) * 1000:10.1f} ms')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--window', type=int, default=360, help='rolling window in rows (360 = 1 h)')
+    parser.add_argument('--skip-rows', action='store_true', help='skip the csv.DictReader baseline')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sensorData.csv')
+        timed('write csv', lambda: write_csv(path, args.rows))
+        print(f'csv size {os.path.getsize(path) / 1e6:.1f} MB, {args.rows} rows')
+        if not args.skip_rows:
+            timed('load csv.DictReader', lambda: load_rows(path))
+        table = timed('load_csv', lambda: load_csv(path))
+
+    temperature = table['Temperature (°C)']
+    timed('daily', lambda: daily(table.timestamps, temperature))
+    timed('resample 1h', lambda: resample(table.timestamps, temperature, '1h'))
+    for stat in ('mean', 'std', 'min', 'max'):
+        timed(f'rolling {stat} ({args.window})', lambda: rolling(temperature, args.window, stat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# Lock overhead and contention of the shared bus manager (buses.py), with
+# simulated I2C sensors read from several threads at once.
+#
+#   python benchmarks/bench_buses.py --threads 4 --reads 50
+#
+# First the cost of one locked property read with zero device latency, then
+# concurrent readers of the TSL2561, BH1750 and BMP280 on the one I2C bus,
+# once read one by one and once in batches, with the bus report of each.
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from buses import BusManager
+from hardware import SimDeviceConfig, get_backend
+
+
+def per_call(func, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def concurrent(threads, reads, read):
+    workers = [threading.Thread(target=lambda: [read() for _ in range(reads)]) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--reads', type=int, default=50, help='reads of every sensor per thread')
+    parser.add_argument('--latency', type=float, default=0.002, help='seconds per simulated I2C read')
+    args = parser.parse_args()
+
+    config = {kind: SimDeviceConfig(latency=0.0, models=get_backend('sim').config[kind].models)
+              for kind in ('tsl2561', 'bh1750', 'bmp280')}
+    manager = BusManager(get_backend('sim', seed=1, config=config))
+    lux = manager.device('tsl2561')
+    raw = lux.device
+    print(f'{"unlocked lux read":24s} {per_call(lambda: raw.lux, 100000):8.2f} us')
+    print(f'{"locked lux read":24s} {per_call(lambda: lux.lux, 100000):8.2f} us')
+
+    for device_config in config.values():
+        device_config.latency = args.latency
+    bh1750 = manager.device('bh1750')
+    bmp280 = manager.device('bmp280')
+    reads = [lambda: lux.lux, lambda: bh1750.lux, lambda: bmp280.pressure]
+    bus = manager.i2c()
+    for label, read in (('one by one', lambda: [func() for func in reads]),
+                        ('batched', lambda: bus.batch(*reads))):
+        manager.reset_stats()
+        elapsed = concurrent(args.threads, args.reads, read)
+        count = args.threads * args.reads * len(reads)
+        print(f'{label:24s} {count / elapsed:8.0f} reads/s  {bus.stats}')
+
+
+if __name__ == '__main__':
+    main()
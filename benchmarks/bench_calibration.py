@@ -0,0 +1,92 @@
+# Cost of converting raw MCP3008 counts with calibration.CalibrationTable
+# against evaluating the curve for every sample, vectorized and per sample.
+#
+#   python benchmarks/bench_calibration.py --samples 1000000
+#
+# Every curve type is measured at the reference temperature and with a
+# temperature per sample, so compensated tables index by row and count.
+#
+# The fair baseline is the vectorized curve.evaluate, not per sample Python.
+# Against it the table wins for integer counts at the reference temperature,
+# and with a temperature per sample only when the curve or its compensation
+# is costly (piecewise, MQ): finding the temperature row costs about as much
+# as evaluating a polynomial with Nernst compensation directly. Interpolating
+# fractional counts is slower than evaluating any of these curves.
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from calibration import table_from_spec
+
+SPECS = {
+    'piecewise': {'type': 'piecewise', 'points': [[40, 0], [300, 150], [700, 600], [1023, 1400]],
+                  'compensation': {'type': 'linear', 'coefficient': 0.019}},
+    'polynomial': {'type': 'polynomial', 'coefficients': [15.5, -0.0176, 1e-7],
+                   'compensation': {'type': 'nernst'}, 'low': 0, 'high': 14},
+    'mq': {'type': 'mq', 'a': 110.47, 'b': -2.862, 'r0': 76.6, 'low': 10, 'high': 10000,
+           'factors': [[-10, 1.2], [20, 1.0], [50, 0.85]]},
+}
+
+
+def best(func, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def mq_sample(curve, raw, temperature):
+    # The same MQ formula in plain Python, one sample at a time.
+    volts = raw * curve.vref / 1023
+    if volts <= 0:
+        return 10.0
+    ratio = curve.rl * (curve.supply - volts) / volts / curve.r0
+    ratio /= float(np.interp(temperature, *curve.factors))
+    return min(10000.0, max(10.0, curve.a * math.pow(max(ratio, 1e-12), curve.b)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--samples', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    raw = rng.integers(0, 1024, args.samples).astype(np.uint16)
+    fractional = raw + rng.random(args.samples)
+    temperature = rng.uniform(0.0, 40.0, args.samples)
+    n = args.samples
+    for name, spec in SPECS.items():
+        start = time.perf_counter()
+        table = table_from_spec(spec)
+        build = time.perf_counter() - start
+        print(f'{name}: table {table.table.shape} built in {build * 1000:.2f} ms')
+        rows = [
+            ('table, reference', lambda: table.convert(raw)),
+            ('curve.evaluate, reference', lambda: table.curve.evaluate(raw)),
+            ('table, integer counts', lambda: table.convert(raw, temperature)),
+            ('table, fractional counts', lambda: table.convert(fractional, temperature)),
+            ('curve.evaluate', lambda: table.curve.evaluate(raw, temperature)),
+        ]
+        times = {}
+        for label, func in rows:
+            times[label] = elapsed = best(func)
+            print(f'  {label:26s} {elapsed / n * 1e9:8.2f} ns/sample')
+        print(f'  {"speedup over curve.evaluate":26s} '
+              f'{times["curve.evaluate, reference"] / times["table, reference"]:5.2f}x at reference, '
+              f'{times["curve.evaluate"] / times["table, integer counts"]:5.2f}x integer, '
+              f'{times["curve.evaluate"] / times["table, fractional counts"]:5.2f}x fractional')
+        if name == 'mq':
+            count = min(n, 20000)
+            elapsed = best(lambda: [mq_sample(table.curve, int(raw[i]), temperature[i]) for i in range(count)], 1)
+            print(f'  {"per sample Python":26s} {elapsed / count * 1e9:8.2f} ns/sample')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# Load test of one collection cycle against the simulated device backend.
+#
+#   python benchmarks/bench_collection.py --cycles 20 --dht-failure-rate 0.3
+#
+# Runs the same set of readers sequentially and concurrently and prints the
+# cycle time and per-reader latency for each mode. Runs on any Linux box.
+import argparse
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collector import SensorCollector
+from hardware import SimulatedBackend, SimDeviceConfig, default_sim_config
+
+
+def build_collector(backend, concurrent):
+    dht = backend.dht22('D4')
+    soil = backend.digital_input('D17')
+    smoke = backend.digital_input('D18')
+    i2c = backend.i2c()
+    lux = backend.tsl2561(i2c)
+    bmp = backend.bmp280(i2c)
+    spi = backend.spi_device()
+    spi.open(0, 0)
+
+    def read_dht():
+        # Drop the 2 second cache so every cycle really talks to the sensor.
+        dht.last_read = None
+        return dht.temperature, dht.humidity
+
+    def read_adc():
+        return [spi.xfer2([1, (8 + ch) << 4, 0]) for ch in range(8)]
+
+    collector = SensorCollector(concurrent=concurrent)
+    collector.add_reader('dht', read_dht, timeout=3.0, default=(None, None))
+    collector.add_reader('soil_moisture', lambda: soil.value, timeout=1.0)
+    collector.add_reader('smoke', lambda: smoke.value, timeout=1.0)
+    collector.add_reader('lux', lambda: lux.lux, timeout=1.0)
+    collector.add_reader('pressure', lambda: bmp.pressure, timeout=1.0)
+    collector.add_reader('adc', read_adc, timeout=1.0)
+    return collector
+
+
+def run(concurrent, args):
+    config = default_sim_config()
+    config['dht'] = SimDeviceConfig(latency=args.dht_latency, jitter=0.05,
+                                    failure_rate=args.dht_failure_rate,
+                                    models=config['dht'].models)
+    backend = SimulatedBackend(seed=args.seed, config=config)
+    collector = build_collector(backend, concurrent)
+    cycles = []
+    durations = {}
+    failures = 0
+    for _ in range(args.cycles):
+        result = collector.collect()
+        cycles.append(result.elapsed)
+        failures += len(result.errors) + len(result.timed_out)
+        for name, duration in result.durations.items():
+            if duration is not None:
+                durations.setdefault(name, []).append(duration)
+    collector.close()
+
+    mode = 'concurrent' if concurrent else 'sequential'
+    print(f'{mode}: cycle mean {statistics.mean(cycles) * 1000:.1f} ms  '
+          f'max {max(cycles) * 1000:.1f} ms  failed reads {failures}')
+    for name, values in durations.items():
+        print(f'  {name:14s} mean {statistics.mean(values) * 1000:8.2f} ms  '
+              f'max {max(values) * 1000:8.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cycles', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--dht-latency', type=float, default=0.25)
+    parser.add_argument('--dht-failure-rate', type=float, default=0.1)
+    args = parser.parse_args()
+    run(False, args)
+    run(True, args)
+
+
+if __name__ == '__main__':
+    main()
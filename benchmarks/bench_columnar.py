@@ -0,0 +1,90 @@
+# Write and load time of the columnar log against sensorData.csv.
+#
+#   python benchmarks/bench_columnar.py --rows 260000   # a month of 10 s rows
+#
+# Needs numpy for the columnar read side.
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from columnar import ColumnarReader, ColumnarWriter
+
+FIELDNAMES = ['Timestamp', 'Temperature (°C)', 'Humidity (%)', 'Lux (lux)', 'CO2 (ppm)',
+              'pH Level', 'Smoke Detected', 'pH Condition']
+TYPES = {'Smoke Detected': 'bool', 'pH Condition': 'category'}
+
+
+def make_rows(count):
+    rng = random.Random(1)
+    start = datetime(2024, 10, 1)
+    for i in range(count):
+        ph = rng.uniform(0, 14)
+        yield {
+            'Timestamp': (start + timedelta(seconds=10 * i)).isoformat(),
+            'Temperature (°C)': f'{rng.uniform(10, 35):.2f}' if i % 50 else 'N/A',
+            'Humidity (%)': f'{rng.uniform(20, 90):.2f}' if i % 50 else 'N/A',
+            'Lux (lux)': f'{rng.uniform(0, 30000):.2f}',
+            'CO2 (ppm)': f'{rng.uniform(0, 1500):.2f}',
+            'pH Level': f'{ph:.2f}',
+            'Smoke Detected': 'Yes' if rng.random() < 0.1 else 'No',
+            'pH Condition': 'Acidic' if ph < 7 else 'Basic',
+        }
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f'{label:28s} {(time.perf_counter() - start) * 1000:10.1f} ms')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'sensorData.csv')
+        col_path = os.path.join(tmp, 'sensorData')
+
+        def write_csv():
+            with open(csv_path, 'w', newline='') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+                writer.writeheader()
+                writer.writerows(make_rows(args.rows))
+
+        def write_columnar():
+            with ColumnarWriter(col_path, FIELDNAMES, types=TYPES, flush_rows=4096) as writer:
+                writer.writerows(make_rows(args.rows))
+
+        def load_csv():
+            columns = {name: [] for name in FIELDNAMES}
+            with open(csv_path, newline='') as csvfile:
+                for row in csv.DictReader(csvfile):
+                    columns['Timestamp'].append(datetime.fromisoformat(row['Timestamp']))
+                    for name in FIELDNAMES[1:6]:
+                        value = row[name]
+                        columns[name].append(float('nan') if value == 'N/A' else float(value))
+            return columns
+
+        def load_columnar():
+            reader = ColumnarReader(col_path)
+            return reader.timestamps, [reader.column(name) for name in FIELDNAMES[1:6]]
+
+        timed('write csv', write_csv)
+        timed('write columnar', write_columnar)
+        timed('load csv', load_csv)
+        timed('load columnar (NaN copies)', load_columnar)
+        timed('map columnar (zero-copy)', lambda: ColumnarReader(col_path).values('CO2 (ppm)').sum())
+        print(f'csv size {os.path.getsize(csv_path) / 1e6:.1f} MB  columnar size '
+              f'{sum(os.path.getsize(os.path.join(col_path, f)) for f in os.listdir(col_path)) / 1e6:.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# Throughput of the buffered group-commit CSV writer against the old
+# writerow() + flush() per row.
+#
+#   python benchmarks/bench_csv_writer.py --rows 20000 --fsync
+#
+# "caller" is the time the sampling loop spends inside writerow(); "total"
+# includes waiting for the last commit.
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from csv_writer import BufferedCSVWriter
+
+FIELDNAMES = ['Timestamp', 'Temperature (°C)', 'Humidity (%)', 'Lux (lux)',
+              'CO2 (ppm)', 'pH Level', 'Smoke Detected']
+
+
+def make_rows(count):
+    rng = random.Random(1)
+    return [{
+        'Timestamp': f'2024-10-09T09:{i // 60 % 60:02d}:{i % 60:02d}.000000',
+        'Temperature (°C)': f'{rng.uniform(10, 35):.2f}',
+        'Humidity (%)': f'{rng.uniform(20, 90):.2f}',
+        'Lux (lux)': f'{rng.uniform(0, 30000):.2f}',
+        'CO2 (ppm)': f'{rng.uniform(0, 1500):.2f}',
+        'pH Level': f'{rng.uniform(0, 14):.2f}',
+        'Smoke Detected': 'No',
+    } for i in range(count)]
+
+
+def per_row_flush(path, rows, fsync):
+    start = time.perf_counter()
+    with open(path, mode='w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            csvfile.flush()
+            if fsync:
+                os.fsync(csvfile.fileno())
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, len(rows)
+
+
+def group_commit(path, rows, fsync, flush_rows):
+    start = time.perf_counter()
+    writer = BufferedCSVWriter(path, FIELDNAMES, flush_rows=flush_rows, fsync=fsync)
+    for row in rows:
+        writer.writerow(row)
+    caller = time.perf_counter() - start
+    writer.close()
+    return caller, time.perf_counter() - start, writer.commits
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--flush-rows', type=int, default=60)
+    parser.add_argument('--fsync', action='store_true')
+    parser.add_argument('--dir', default=None, help='directory to write to, e.g. on the SD card')
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        results = [
+            ('per-row flush', per_row_flush(os.path.join(tmp, 'flush.csv'), rows, args.fsync)),
+            (f'group commit ({args.flush_rows})',
+             group_commit(os.path.join(tmp, 'group.csv'), rows, args.fsync, args.flush_rows)),
+        ]
+    for name, (caller, total, commits) in results:
+        print(f'{name:22s} {args.rows / total:10.0f} rows/s  caller {caller * 1e6 / args.rows:7.2f} us/row  '
+              f'total {total:.3f} s  commits {commits}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+# Benchmark suite for the Adafruit_DHT read path: platform detection, pin
+# mapping, the C extension round trip, read(), DHTSensor/DHTSession reads,
+# read_retry() under injected faults, and read success rate and latency
+# against CPU load. Results are written as JSON and can be checked against
+# regression thresholds.
+#
+#   python benchmarks/bench_dht.py --out dht.json --check benchmarks/dht_thresholds.json
+#   python benchmarks/bench_dht.py --write-thresholds my_thresholds.json --margin 3
+#   sudo python benchmarks/bench_dht.py --platform auto --pin 4 --load-reads 20
+#
+# Thresholds map a result name to {"max": value} (times, in microseconds) or
+# {"min": value} (rates); any result outside its threshold fails the check
+# and the script exits 1. Results missing from a run are reported, not failed.
+# benchmarks/dht_thresholds.json was made with --margin 5 on an x86 dev box
+# with the Test driver; make your own on the target for tighter limits.
+# Success rate under load is only recorded with --platform auto: the Test
+# driver's reads sleep instead of timing pulses, so CPU load can't make them
+# fail and its rate would always be 1.0.
+# Needs Adafruit_DHT installed (python setup.py install --force-test for the
+# Test driver).
+import argparse
+import json
+import multiprocessing
+import os
+import platform as host
+import sys
+import time
+
+import Adafruit_DHT
+from Adafruit_DHT import common, platform_detect
+
+
+def per_call(func, number, repeat=5):
+    # Best of repeat runs of number calls, in microseconds per call.
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = (time.perf_counter() - start) / number * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def burn(stop):
+    while not stop.is_set():
+        pass
+
+
+def under_load(workers, func, reads, interval):
+    # Success rate and latencies of reads with workers busy processes running.
+    stop = multiprocessing.Event()
+    procs = [multiprocessing.Process(target=burn, args=(stop,), daemon=True) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    try:
+        good, latencies = 0, []
+        for _ in range(reads):
+            start = time.perf_counter()
+            humidity, temperature = func()
+            latencies.append((time.perf_counter() - start) * 1e6)
+            good += humidity is not None and temperature is not None
+            time.sleep(interval)
+    finally:
+        stop.set()
+        for proc in procs:
+            proc.join()
+    latencies.sort()
+    return good / reads, latencies[len(latencies) // 2], latencies[min(reads - 1, int(reads * 0.95))]
+
+
+def run(args):
+    results = {}
+
+    def record(name, value, unit='us'):
+        results[name] = {'value': round(value, 4), 'unit': unit}
+        print(f'{name:36s} {value:14.3f} {unit}')
+
+    if args.platform == 'test':
+        from Adafruit_DHT import Test as plat
+        from Adafruit_DHT import Test_Driver as driver
+        plat.reset()
+    else:
+        plat = common.get_platform()
+        driver = plat.driver
+    sensor = args.sensor
+    pin = int(args.pin) if args.pin.isdigit() else args.pin
+    fast = args.number
+
+    # Platform detection, uncached (reads /proc/cpuinfo) and cached.
+    record('detect.platform_detect_uncached', per_call(platform_detect.platform_detect.__wrapped__, fast // 100 or 1))
+    record('detect.platform_detect', per_call(platform_detect.platform_detect, fast))
+    if platform_detect.platform_detect() != platform_detect.UNKNOWN:
+        record('detect.get_platform', per_call(common.get_platform, fast))
+
+    # Pin mapping: validating and binding a pin, and the Beaglebone pin table.
+    record('pin.bind', per_call(lambda: plat.bind(sensor, pin), fast))
+    try:
+        from Adafruit_DHT import Beaglebone_Black
+    except ImportError:
+        pass
+    else:
+        record('pin.beaglebone_gpio', per_call(lambda: Beaglebone_Black._gpio('P8_11'), fast))
+
+    if args.platform == 'test':
+        # Raw C extension round trip, then each Python layer on top of it.
+        record('c.read', per_call(lambda: driver.read(sensor, pin), fast))
+        handle = driver.open(sensor, pin)[1]
+        record('c.read_session', per_call(lambda: driver.read_session(handle), fast))
+        driver.close(handle)
+        record('py.read', per_call(lambda: Adafruit_DHT.read(sensor, pin, plat), fast))
+        record('py.DHTSensor.read', per_call(Adafruit_DHT.DHTSensor(sensor, pin, plat).read, fast))
+        with Adafruit_DHT.DHTSession(sensor, pin, plat) as session:
+            record('py.DHTSession.read', per_call(session.read, fast))
+        # read_retry when 30% of reads fail, without the 2 s delay.
+        plat.configure(checksum=0.2, timeout=0.1, seed=1)
+        record('py.read_retry_30pct_errors',
+               per_call(lambda: Adafruit_DHT.read_retry(sensor, pin, delay_seconds=0, platform=plat), fast // 10))
+        plat.configure(latency=args.latency, seed=1)
+
+    # Success rate and latency with 0, half, all and twice the CPUs busy.
+    cpus = os.cpu_count() or 1
+    reader = Adafruit_DHT.DHTSensor(sensor, pin, plat).read
+    for level, workers in (('none', 0), ('half', max(1, cpus // 2)), ('all', cpus), ('double', 2 * cpus)):
+        rate, median, p95 = under_load(workers, reader, args.load_reads, args.interval)
+        if args.platform != 'test':
+            record(f'load.{level}.success_rate', rate, 'ratio')
+        record(f'load.{level}.median', median)
+        record(f'load.{level}.p95', p95)
+    if args.platform == 'test':
+        plat.reset()
+    return results
+
+
+def check(results, thresholds):
+    failures = []
+    for name, limit in sorted(thresholds.items()):
+        if name not in results:
+            print(f'{name:36s} not measured')
+            continue
+        value = results[name]['value']
+        if 'max' in limit and value > limit['max']:
+            failures.append(f'{name} = {value} > {limit["max"]}')
+        if 'min' in limit and value < limit['min']:
+            failures.append(f'{name} = {value} < {limit["min"]}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--platform', choices=('test', 'auto'), default='test')
+    parser.add_argument('--sensor', type=int, default=Adafruit_DHT.DHT22)
+    parser.add_argument('--pin', default='4', help='GPIO number, or a Beaglebone pin name')
+    parser.add_argument('--number', type=int, default=20000, help='calls per timing run')
+    parser.add_argument('--load-reads', type=int, default=50, help='reads per CPU load level')
+    parser.add_argument('--interval', type=float, default=0.0,
+                        help='seconds between reads under load, 2 on real hardware')
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='seconds a Test driver read takes under load')
+    parser.add_argument('--out', help='write results as JSON to this file')
+    parser.add_argument('--check', help='JSON thresholds to check the results against')
+    parser.add_argument('--write-thresholds', help='write thresholds from this run to this file')
+    parser.add_argument('--margin', type=float, default=2.0,
+                        help='factor between results and written thresholds')
+    args = parser.parse_args()
+
+    results = run(args)
+    report = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'machine': host.machine(),
+            'cpus': os.cpu_count(),
+            'platform': args.platform,
+            'sensor': args.sensor,
+        },
+        'results': results,
+    }
+    if args.write_thresholds:
+        thresholds = {}
+        for name, result in results.items():
+            if result['unit'] == 'ratio':
+                thresholds[name] = {'min': round(result['value'] / args.margin, 4)}
+            else:
+                thresholds[name] = {'max': round(result['value'] * args.margin, 4)}
+        with open(args.write_thresholds, 'w') as f:
+            json.dump(thresholds, f, indent=2, sort_keys=True)
+    failures = []
+    if args.check:
+        with open(args.check) as f:
+            failures = check(results, json.load(f))
+        report['failures'] = failures
+        for failure in failures:
+            print('REGRESSION', failure)
+        print('thresholds ok' if not failures else f'{len(failures)} regressions')
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
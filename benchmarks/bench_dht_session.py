@@ -0,0 +1,77 @@
+# Per-call cost of Adafruit_DHT.read() against a DHTSensor and an open
+# DHTSession.
+#
+#   python benchmarks/bench_dht_session.py                 # Test driver
+#   python benchmarks/bench_dht_session.py --setup 0.5     # model a longer setup
+#   sudo python benchmarks/bench_dht_session.py --platform auto --pin 4 --reads 5
+#
+# On a Pi or Beaglebone each read() also maps GPIO, sets up the pin and holds
+# it high for 500 ms at real-time priority; DHTSensor only skips the per-call
+# checks and platform lookup, a session skips that when reads are at least
+# 500 ms apart (the DHT needs 2 s anyway). The Test driver has no GPIO, so
+# there the rows only measure call overhead, and the session gain is printed
+# as a model: --setup seconds of GPIO setup added to each one-shot read. That
+# figure is an assumption, not a result; measure the gain with --platform
+# auto on hardware.
+# Needs Adafruit_DHT installed (python setup.py install --force-test for the
+# Test driver).
+import argparse
+import time
+
+import Adafruit_DHT
+from Adafruit_DHT import common
+
+
+def timed(label, reads, func):
+    # Returns wall seconds per read.
+    start = time.perf_counter()
+    cpu = time.process_time()
+    for _ in range(reads):
+        func()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    print(f'{label:22s} {elapsed / reads * 1e6:12.1f} us/read  cpu {cpu / reads * 1e6:10.1f} us/read')
+    return elapsed / reads
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--platform', choices=('test', 'auto'), default='test')
+    parser.add_argument('--sensor', type=int, default=Adafruit_DHT.DHT22)
+    parser.add_argument('--pin', default=4)
+    parser.add_argument('--reads', type=int, default=200)
+    parser.add_argument('--interval', type=float, default=0.0,
+                        help='seconds between reads, e.g. 2 on real hardware')
+    parser.add_argument('--setup', type=float, default=0.01,
+                        help='modelled seconds of GPIO setup per one-shot read (Test driver only)')
+    args = parser.parse_args()
+
+    if args.platform == 'test':
+        from Adafruit_DHT import Test as platform
+        platform.set_setup(0.0)
+    else:
+        platform = common.get_platform()
+
+    def spaced(func):
+        if not args.interval:
+            return func
+        def call():
+            func()
+            time.sleep(args.interval)
+        return call
+
+    one_shot = timed('read()', args.reads, spaced(lambda: Adafruit_DHT.read(args.sensor, args.pin, platform)))
+    timed('DHTSensor.read()', args.reads, spaced(Adafruit_DHT.DHTSensor(args.sensor, args.pin, platform).read))
+    with Adafruit_DHT.DHTSession(args.sensor, args.pin, platform) as session:
+        held = timed('DHTSession.read()', args.reads, spaced(session.read))
+
+    if args.platform == 'test':
+        # Modelled, not measured: the Test driver does no GPIO setup.
+        modelled = one_shot + args.setup
+        print(f'modelled with {args.setup * 1e3:.1f} ms setup per read(): '
+              f'read() {modelled * 1e6:.1f} us, DHTSession.read() {held * 1e6:.1f} us, '
+              f'{modelled / held:.0f}x')
+
+
+if __name__ == '__main__':
+    main()
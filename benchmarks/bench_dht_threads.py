@@ -0,0 +1,108 @@
+# Checks that other Python threads keep running while a DHT read is in the
+# C driver, and that Adafruit_DHT.read_async leaves an asyncio loop free.
+#
+#   python benchmarks/bench_dht_threads.py                  # Test driver
+#   sudo python benchmarks/bench_dht_threads.py --platform auto --pin 4
+#
+# A counter thread spins while the main thread reads; its rate is compared
+# with the rate when nothing is read. A driver that held the GIL would stall
+# the counter for the whole read (about 0.5 s per read on hardware, and
+# --latency on the Test driver). Exits 1 if the counter or the event loop
+# fell below --min-ratio of its idle rate.
+# Needs Adafruit_DHT installed (python setup.py install --force-test for the
+# Test driver).
+import argparse
+import asyncio
+import sys
+import threading
+import time
+
+import Adafruit_DHT
+from Adafruit_DHT import common
+
+
+def count_during(func, seconds=None):
+    # Increments a counter thread manages while func runs (or for seconds).
+    count = 0
+    done = threading.Event()
+
+    def spin():
+        nonlocal count
+        while not done.is_set():
+            count += 1
+
+    thread = threading.Thread(target=spin)
+    start = time.perf_counter()
+    thread.start()
+    if func is None:
+        time.sleep(seconds)
+    else:
+        func()
+    done.set()
+    thread.join()
+    return count / (time.perf_counter() - start)
+
+
+async def ticks_during(read, reads, tick=0.01):
+    # Ticks of a 10 ms asyncio timer while reads run through read_async.
+    ticks = 0
+    done = False
+
+    async def ticker():
+        nonlocal ticks
+        while not done:
+            await asyncio.sleep(tick)
+            ticks += 1
+
+    task = asyncio.ensure_future(ticker())
+    start = time.perf_counter()
+    for _ in range(reads):
+        await read()
+    elapsed = time.perf_counter() - start
+    done = True
+    await task
+    return ticks * tick / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--platform', choices=('test', 'auto'), default='test')
+    parser.add_argument('--sensor', type=int, default=Adafruit_DHT.DHT22)
+    parser.add_argument('--pin', default=4)
+    parser.add_argument('--reads', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.5,
+                        help='seconds a Test driver read takes')
+    parser.add_argument('--min-ratio', type=float, default=0.5)
+    args = parser.parse_args()
+
+    if args.platform == 'test':
+        from Adafruit_DHT import Test as platform
+        platform.set_latency(args.latency)
+    else:
+        platform = common.get_platform()
+
+    def reads():
+        for _ in range(args.reads):
+            Adafruit_DHT.read(args.sensor, args.pin, platform)
+
+    start = time.perf_counter()
+    reading = count_during(reads)
+    seconds = time.perf_counter() - start
+    idle = count_during(None, seconds)
+    thread_ratio = reading / idle
+    print(f'counter thread  {idle:12.0f}/s idle  {reading:12.0f}/s during reads  ratio {thread_ratio:.2f}')
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    read = lambda: Adafruit_DHT.read_async(args.sensor, args.pin, platform)
+    loop_ratio = loop.run_until_complete(ticks_during(read, args.reads))
+    loop.close()
+    print(f'asyncio ticker  {loop_ratio:.2f} of expected ticks during read_async')
+
+    ok = thread_ratio >= args.min_ratio and loop_ratio >= args.min_ratio
+    print('ok' if ok else 'FAILED: reads blocked other threads')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# Timing accuracy and CPU cost of the 20 ms DHT start signal delay
+# (precise_wait_milliseconds in common_dht_read.c), through the Test driver.
+#
+#   python benchmarks/bench_dht_wait.py
+#   sudo python benchmarks/bench_dht_wait.py --fifo    # real time priority, like a read
+#
+# For comparison the same wait is also done as a full busy spin, which is
+# what the driver used to do: its CPU time equals the wall time. The start
+# signal has to last at least 18 ms, so late is fine within reason but early
+# is not.
+# Needs Adafruit_DHT installed with the Test driver (python setup.py install
+# --force-test).
+import argparse
+import os
+import time
+
+from Adafruit_DHT import Test_Driver
+
+
+def spin(milliseconds):
+    end = time.perf_counter() + milliseconds / 1000
+    while time.perf_counter() < end:
+        pass
+
+
+def measure(label, wait, milliseconds, count):
+    errors = []
+    cpu = time.thread_time()
+    for _ in range(count):
+        start = time.perf_counter()
+        wait(milliseconds)
+        errors.append((time.perf_counter() - start) * 1000 - milliseconds)
+    cpu = (time.thread_time() - cpu) * 1000 / count
+    errors.sort()
+    p99 = errors[min(count - 1, int(count * 0.99))]
+    print(f'{label:12s} cpu {cpu:7.3f} ms/wait ({cpu / milliseconds:6.1%})  '
+          f'late min {errors[0] * 1000:8.1f} us  mean {sum(errors) / count * 1000:8.1f} us  '
+          f'p99 {p99 * 1000:8.1f} us  max {errors[-1] * 1000:8.1f} us')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--milliseconds', type=int, default=20)
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--fifo', action='store_true', help='run at SCHED_FIFO max priority (root)')
+    args = parser.parse_args()
+
+    if args.fifo:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(os.sched_get_priority_max(os.SCHED_FIFO)))
+    measure('precise_wait', Test_Driver.precise_wait, args.milliseconds, args.count)
+    measure('full spin', spin, args.milliseconds, args.count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# Channels per second of NPKSenCode.scan(), one SPI transaction per scan,
+# against a read_channel() loop, one transaction per channel.
+#
+#   python benchmarks/bench_mcp3008.py
+#   python benchmarks/bench_mcp3008.py --backend hardware   # on the Pi
+#
+# The simulated MCP3008 charges --latency seconds per transaction, standing in
+# for the ioctl round trip and bus setup that dominate a 3 byte transfer; on
+# hardware the real cost is measured.
+import argparse
+import os
+import sys
+import time
+
+NPK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'NPKSensor')
+
+
+def measure(label, func, scans, channels):
+    start = time.perf_counter()
+    for _ in range(scans):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f'{label:26s} {scans * channels / elapsed:12.0f} channels/s  '
+          f'{elapsed / scans * 1e6:10.1f} us/scan')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backend', choices=('sim', 'hardware'), default='sim')
+    parser.add_argument('--scans', type=int, default=2000)
+    parser.add_argument('--channels', type=int, nargs='+', default=list(range(8)))
+    parser.add_argument('--latency', type=float, default=0.00005,
+                        help='seconds per simulated SPI transaction')
+    args = parser.parse_args()
+
+    # NPKSenCode opens the SPI device when it is imported.
+    os.environ['AGRO_BACKEND'] = args.backend
+    sys.path.insert(0, NPK_DIR)
+    import NPKSenCode
+
+    if args.backend == 'sim':
+        NPKSenCode.backend.config['mcp3008'].latency = args.latency
+    channels = args.channels
+    scanner = NPKSenCode.Scanner(channels)
+    try:
+        measure('read_channel() loop', lambda: [NPKSenCode.read_channel(c) for c in channels],
+                args.scans, len(channels))
+        measure('scan()', lambda: NPKSenCode.scan(channels), args.scans, len(channels))
+        measure('Scanner.read() (no copy)', scanner.read, args.scans, len(channels))
+    finally:
+        NPKSenCode.spi.close()
+
+
+if __name__ == '__main__':
+    main()
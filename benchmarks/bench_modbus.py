@@ -0,0 +1,81 @@
+# Modbus-RTU NPK polling (modbus.py) against simulated probes on a pseudo
+# terminal: CRC cost, and the time to poll every probe on one line compared
+# with the wire time alone, with and without dead probes backed off.
+#
+#   python benchmarks/bench_modbus.py --probes 20 --baudrate 9600
+#   python benchmarks/bench_modbus.py --probes 20 --dead 3 --turnaround 0.02
+#
+# The simulated probes answer after the wire time at --baudrate plus
+# --turnaround seconds; the first --dead addresses have no probe.
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hardware import get_backend
+from modbus import NPK_REGISTERS, NPKModbusReader, crc16
+
+
+def crc16_bitwise(data):
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+def per_byte(func, data, number=2000):
+    start = time.perf_counter()
+    for _ in range(number):
+        func(data)
+    return (time.perf_counter() - start) / number / len(data) * 1e9
+
+
+def cycles(reader, count):
+    start = time.perf_counter()
+    good = 0
+    for _ in range(count):
+        good += sum(values is not None for values in reader.poll().values())
+    return (time.perf_counter() - start) / count, good / count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--probes', type=int, default=20)
+    parser.add_argument('--dead', type=int, default=2, help='addresses without a probe')
+    parser.add_argument('--baudrate', type=int, default=9600)
+    parser.add_argument('--turnaround', type=float, default=0.01, help='seconds a probe takes to answer')
+    parser.add_argument('--timeout', type=float, default=0.2)
+    parser.add_argument('--cycles', type=int, default=5)
+    args = parser.parse_args()
+
+    data = bytes(range(256)) * 4
+    assert crc16(data) == crc16_bitwise(data)
+    print(f'{"crc16 table":28s} {per_byte(crc16, data):8.1f} ns/byte')
+    print(f'{"crc16 bitwise":28s} {per_byte(crc16_bitwise, data, 200):8.1f} ns/byte')
+
+    backend = get_backend('sim', seed=1)
+    config = backend.config['modbus']
+    config.latency, config.jitter, config.failure_rate = args.turnaround, 0.0, 0.0
+    slaves = list(range(1, args.probes + args.dead + 1))
+    port = backend.modbus_port(slaves=slaves[args.dead:], baudrate=args.baudrate)
+    count = len(NPK_REGISTERS)
+    wire = (8 + 5 + 2 * count) * 10 / args.baudrate
+    print(f'{"wire time per probe":28s} {wire * 1000:8.1f} ms  '
+          f'(+ {args.turnaround * 1000:.1f} ms turnaround)')
+    print(f'{"ideal cycle":28s} {args.probes * (wire + args.turnaround) * 1000:8.1f} ms')
+    try:
+        for label, max_failures in (('cycle, dead probes polled', 1 << 30), ('cycle, dead probes backed off', 1)):
+            with NPKModbusReader(port, slaves, baudrate=args.baudrate, timeout=args.timeout,
+                                 max_failures=max_failures) as reader:
+                reader.poll()  # backs off the dead probes when allowed
+                elapsed, good = cycles(reader, args.cycles)
+            print(f'{label:28s} {elapsed * 1000:8.1f} ms  {good:.1f} readings/cycle')
+    finally:
+        backend.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# Noise and cost of NPKSenCode.Oversampler against single raw reads, on a
+# simulated probe that holds still under gaussian noise.
+#
+#   python benchmarks/bench_oversample.py --rate 1000 --blocks 10
+#   python benchmarks/bench_oversample.py --noise 3 --spikes 0.01
+#
+# For each method the spread (standard deviation) of the per-interval values
+# is compared with that of one raw read per interval, along with the sample
+# rate the thread actually kept and the CPU time it took.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+NPK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'NPKSensor')
+
+
+class SpikyNoise:
+    # Probe at a fixed level with gaussian noise and occasional full scale spikes.
+    def __init__(self, level, noise, spikes):
+        self.level = level
+        self.noise = noise
+        self.spikes = spikes
+
+    def sample(self, t, rng):
+        if rng.random() < self.spikes:
+            return rng.choice((0.0, 1023.0))
+        return min(1023.0, max(0.0, rng.gauss(self.level, self.noise)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rate', type=float, default=1000.0, help='samples per second')
+    parser.add_argument('--interval', type=float, default=0.5, help='seconds per output value')
+    parser.add_argument('--blocks', type=int, default=8, help='output values per method')
+    parser.add_argument('--noise', type=float, default=8.0, help='probe noise in counts')
+    parser.add_argument('--spikes', type=float, default=0.002, help='fraction of full scale spikes')
+    args = parser.parse_args()
+
+    os.environ['AGRO_BACKEND'] = 'sim'
+    os.environ.setdefault('AGRO_SIM_SEED', '1')
+    sys.path.insert(0, NPK_DIR)
+    import NPKSenCode
+
+    NPKSenCode.spi.models = [SpikyNoise(512.0, args.noise, args.spikes) for _ in range(8)]
+    raw = np.array([NPKSenCode.read_channel(0) for _ in range(1000)], dtype=np.float64)
+    print(f'{"raw read":10s} stddev {raw.std():8.3f} counts')
+    try:
+        for method in NPKSenCode.Oversampler.METHODS:
+            sampler = NPKSenCode.Oversampler(channels=(0,), rate=args.rate, interval=args.interval,
+                                             method=method)
+            cpu = time.process_time()
+            start = time.perf_counter()
+            with sampler:
+                while len(sampler.results) < args.blocks:
+                    time.sleep(args.interval / 10)
+            elapsed = time.perf_counter() - start
+            cpu = time.process_time() - cpu
+            values = np.array([values[0] for _, values in sampler.history()])
+            stats = sampler.stats
+            print(f'{method:10s} stddev {values.std():8.3f} counts  '
+                  f'rate {stats.samples / elapsed:8.0f}/s  late {stats.late:5d}  '
+                  f'rejected {stats.rejected:5d}  cpu {cpu / elapsed:6.1%}')
+    finally:
+        NPKSenCode.spi.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# Sustained insert rate of the SQLite store for several batch sizes, plus
+# the cost of the range and latest queries on the resulting database.
+#
+#   python benchmarks/bench_sqlite.py --rows 20000 --cpu 0
+#
+# --cpu pins the process to one core, which together with a Pi-class
+# SD card (--dir) gives numbers close to the deployed logger. Batch size 1
+# is the old one-transaction-per-row behaviour.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_csv_writer import FIELDNAMES, make_rows
+from sqlite_store import SQLiteStore, SQLiteWriter
+
+
+def insert(path, rows, batch_rows):
+    start = time.perf_counter()
+    with SQLiteWriter(path, FIELDNAMES, batch_rows=batch_rows) as writer:
+        writer.writerows(rows)
+    return time.perf_counter() - start
+
+
+def query(path, repeat=200):
+    store = SQLiteStore(path)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        store.latest('Temperature (°C)')
+    latest = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    values = store.range('Temperature (°C)', '2024-10-09T09:10:00', '2024-10-09T09:20:00')
+    window = time.perf_counter() - start
+    store.close()
+    return latest, window, len(values)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--batches', type=int, nargs='+', default=[1, 6, 60, 600])
+    parser.add_argument('--cpu', type=int, default=None, help='pin to this core')
+    parser.add_argument('--dir', default=None, help='directory to write to, e.g. on the SD card')
+    args = parser.parse_args()
+
+    if args.cpu is not None:
+        os.sched_setaffinity(0, {args.cpu})
+
+    rows = make_rows(args.rows)
+    readings = args.rows * (len(FIELDNAMES) - 1)
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for batch_rows in args.batches:
+            path = os.path.join(tmp, f'batch{batch_rows}.db')
+            elapsed = insert(path, rows, batch_rows)
+            print(f'batch {batch_rows:5d}  {args.rows / elapsed:10.0f} rows/s  '
+                  f'{readings / elapsed:10.0f} readings/s  {elapsed:.3f} s')
+        latest, window, count = query(path)
+        print(f'latest()  {latest * 1e6:8.1f} us')
+        print(f'range()   {window * 1e3:8.2f} ms for {count} readings')
+
+
+if __name__ == '__main__':
+    main()
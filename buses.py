@@ -0,0 +1,244 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from hardware import get_backend
+
+
+# Sensor drivers that sit on the I2C bus, by the name of their backend factory.
+I2C_DEVICES = ('tsl2561', 'bh1750', 'bmp280')
+
+
+class BusStats:
+    # Usage of one bus. A transaction is one hold of the bus lock, however
+    # many transfers it covers; contended counts transactions that had to
+    # wait for another thread. Utilization is the fraction of time since the
+    # bus was opened that it was held.
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.transactions = 0
+        self.contended = 0
+        self.busy = 0.0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def mean_wait(self):
+        return self.total_wait / self.transactions if self.transactions else 0.0
+
+    @property
+    def utilization(self):
+        elapsed = self.clock() - self.started
+        return self.busy / elapsed if elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return (f'transactions={self.transactions} contended={self.contended} '
+                f'utilization={self.utilization:.1%} '
+                f'wait_mean={self.mean_wait * 1e6:.1f}us wait_max={self.max_wait * 1e6:.1f}us')
+
+
+class Bus:
+    """One physical bus: its handle (the busio.I2C object for I2C, None for
+    SPI, whose devices have their own handles), the lock that serializes
+    transactions on it and its BusStats.
+
+    The lock is reentrant within a thread, so a batch can call devices whose
+    every access also locks the bus, and nested holds count as one
+    transaction.
+    """
+
+    def __init__(self, name, handle=None, clock=time.perf_counter):
+        self.name = name
+        self.handle = handle
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.owner = None  # thread id of the holder
+        self.depth = 0
+        self.acquired = 0.0
+        self.stats = BusStats(clock)
+
+    def acquire(self):
+        me = threading.get_ident()
+        if self.owner == me:
+            self.depth += 1
+            return
+        start = self.clock()
+        contended = not self.lock.acquire(blocking=False)
+        if contended:
+            self.lock.acquire()
+        # Only the holder touches the fields below.
+        self.owner = me
+        self.depth = 1
+        self.acquired = self.clock()
+        wait = self.acquired - start
+        stats = self.stats
+        stats.transactions += 1
+        stats.contended += contended
+        stats.total_wait += wait
+        if wait > stats.max_wait:
+            stats.max_wait = wait
+
+    def release(self):
+        self.depth -= 1
+        if self.depth:
+            return
+        self.stats.busy += self.clock() - self.acquired
+        self.owner = None
+        self.lock.release()
+
+    @contextmanager
+    def locked(self):
+        """Hold the bus for a transaction made of several transfers."""
+        self.acquire()
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def run(self, func, *args):
+        with self.locked():
+            return func(*args)
+
+    def batch(self, *funcs):
+        """Call every function in one transaction and return their results in
+        order, so reads of several devices go out back to back."""
+        with self.locked():
+            return [func() for func in funcs]
+
+
+class SharedDevice:
+    """A driver object on a shared bus. Every attribute read and write and
+    every method call on it runs with the bus locked, so sensor properties
+    such as lux or pressure, which talk to the device when read, never
+    interleave with another thread's transfers. bus and device give the Bus
+    and the wrapped driver.
+    """
+
+    def __init__(self, bus, device):
+        object.__setattr__(self, 'bus', bus)
+        object.__setattr__(self, 'device', device)
+
+    def __getattr__(self, name):
+        bus = self.bus
+        device = self.device
+        # Properties and register descriptors talk to the device when read;
+        # plain attributes and fetching a method don't.
+        attribute = getattr(type(device), name, None)
+        if hasattr(attribute, '__get__') and hasattr(attribute, '__set__'):
+            with bus.locked():
+                return getattr(device, name)
+        value = getattr(device, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            with bus.locked():
+                return value(*args, **kwargs)
+        return call
+
+    def __setattr__(self, name, value):
+        with self.bus.locked():
+            setattr(self.device, name, value)
+
+
+class BusManager:
+    """Owns every bus of the process once and hands out pooled device
+    handles on them.
+
+    i2c() is the board's I2C bus, spi(bus, device) an opened spidev handle
+    and device(kind) a driver on the I2C bus; asking again returns the same
+    handle, so collectors running in one process share the buses instead of
+    reopening them. All devices on one physical bus share its lock: the two
+    chip selects of SPI bus 0 are one bus, as are all I2C sensors.
+    report() gives the utilization and lock wait of every bus. close()
+    closes them all; callbacks registered with on_close() then drop anything
+    that cached a handle.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else get_backend()
+        self.buses = {}
+        self.devices = {}
+        self.close_callbacks = []
+        self.lock = threading.Lock()
+
+    def _bus(self, name, open_handle=None):
+        bus = self.buses.get(name)
+        if bus is None:
+            bus = self.buses[name] = Bus(name, open_handle() if open_handle else None)
+        return bus
+
+    def i2c(self):
+        with self.lock:
+            return self._bus('i2c', self.backend.i2c)
+
+    def device(self, kind):
+        """Driver kind ('tsl2561', 'bh1750' or 'bmp280') on the I2C bus."""
+        if kind not in I2C_DEVICES:
+            raise ValueError(f'Unknown I2C device {kind!r}')
+        with self.lock:
+            shared = self.devices.get(kind)
+            if shared is None:
+                bus = self._bus('i2c', self.backend.i2c)
+                with bus.locked():
+                    driver = getattr(self.backend, kind)(bus.handle)
+                shared = self.devices[kind] = SharedDevice(bus, driver)
+            return shared
+
+    def spi(self, bus=0, device=0, max_speed_hz=None, mode=None):
+        """Opened SPI device on bus with chip select device. The speed and
+        mode are set when the device is first opened."""
+        key = f'spi{bus}.{device}'
+        with self.lock:
+            shared = self.devices.get(key)
+            if shared is None:
+                handle = self.backend.spi_device()
+                handle.open(bus, device)
+                if max_speed_hz is not None:
+                    handle.max_speed_hz = max_speed_hz
+                if mode is not None:
+                    handle.mode = mode
+                shared = self.devices[key] = SharedDevice(self._bus(f'spi{bus}'), handle)
+            return shared
+
+    def stats(self, name):
+        return self.buses[name].stats
+
+    def report(self):
+        return '\n'.join(f'{name}: {bus.stats}' for name, bus in self.buses.items())
+
+    def reset_stats(self):
+        # Start a new measuring period on every bus.
+        for bus in self.buses.values():
+            bus.stats = BusStats(bus.clock)
+
+    def on_close(self, callback):
+        # callback() runs after every close(), outside the manager's lock.
+        self.close_callbacks.append(callback)
+
+    def close(self):
+        with self.lock:
+            for key, shared in self.devices.items():
+                if key.startswith('spi'):
+                    shared.close()
+            for bus in self.buses.values():
+                if bus.handle is not None and hasattr(bus.handle, 'deinit'):
+                    bus.handle.deinit()
+            self.devices.clear()
+            self.buses.clear()
+        for callback in self.close_callbacks:
+            callback()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_bus_manager():
+    """The process wide BusManager, on the backend chosen by AGRO_BACKEND."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = BusManager()
+        return _manager
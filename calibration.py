@@ -0,0 +1,282 @@
+import json
+
+import numpy as np
+
+
+# Calibration of analog probes read through the 10 bit MCP3008.
+#
+# Every curve maps raw ADC counts (0 to 1023) to engineering units. A
+# CalibrationTable evaluates its curve once for every count, and for every
+# temperature on a grid when the curve is temperature compensated, so
+# converting readings afterwards is an array index instead of per-sample math.
+# Against a vectorized curve.evaluate that pays off for integer counts and
+# for costly or compensated curves; benchmarks/bench_calibration.py measures
+# where.
+#
+# Calibrations are usually loaded from a JSON file mapping a probe name to
+# its curve:
+#
+#   {
+#     "npk":  {"channel": 0, "unit": "mg/kg", "type": "piecewise",
+#              "points": [[40, 0], [300, 150], [1023, 1400]],
+#              "compensation": {"type": "linear", "coefficient": 0.019}},
+#     "ph":   {"channel": 1, "unit": "pH", "type": "polynomial",
+#              "coefficients": [15.5, -0.0176], "low": 0, "high": 14,
+#              "compensation": {"type": "nernst"}},
+#     "co2":  {"channel": 2, "unit": "ppm", "type": "mq", "a": 110.47, "b": -2.862,
+#              "r0": 76.6, "rl": 10.0, "low": 10, "high": 10000,
+#              "factors": [[-10, 1.2], [20, 1.0], [50, 0.85]]}
+#   }
+#
+# channel, unit, low and high are optional. Temperatures are in C.
+
+RAW_MAX = 1023
+KELVIN = 273.15
+
+
+class LinearCompensation:
+    # Corrects a value measured at temperature to reference temperature with a
+    # fractional change per C, as for conductivity based probes:
+    # value_ref = value / (1 + coefficient * (temperature - reference)).
+    def __init__(self, coefficient, reference=25.0):
+        self.coefficient = coefficient
+        self.reference = reference
+
+    def apply(self, value, temperature):
+        return value / (1.0 + self.coefficient * (temperature - self.reference))
+
+
+class NernstCompensation:
+    # Glass pH electrodes: the slope in mV per pH unit is proportional to the
+    # absolute temperature and pivots around the isopotential point. The curve
+    # is assumed to be calibrated at reference.
+    def __init__(self, reference=25.0, isopotential=7.0):
+        self.reference = reference
+        self.isopotential = isopotential
+
+    def apply(self, value, temperature):
+        scale = (self.reference + KELVIN) / (temperature + KELVIN)
+        return self.isopotential + (value - self.isopotential) * scale
+
+
+class PiecewiseLinear:
+    """Straight lines between (raw, value) calibration points, held flat
+    beyond the first and last point."""
+
+    def __init__(self, points, compensation=None):
+        points = sorted(points)
+        if len(points) < 2:
+            raise ValueError('A piecewise linear curve needs at least two points.')
+        self.raw = np.array([p[0] for p in points], dtype=np.float64)
+        self.values = np.array([p[1] for p in points], dtype=np.float64)
+        self.compensation = compensation
+
+    @property
+    def compensated(self):
+        return self.compensation is not None
+
+    def evaluate(self, raw, temperature=None):
+        value = np.interp(raw, self.raw, self.values)
+        if self.compensation is not None and temperature is not None:
+            value = self.compensation.apply(value, temperature)
+        return value
+
+
+class Polynomial:
+    """value = c0 + c1 * raw + c2 * raw**2 + ... for coefficients
+    [c0, c1, c2, ...]."""
+
+    def __init__(self, coefficients, compensation=None):
+        if not len(coefficients):
+            raise ValueError('A polynomial needs at least one coefficient.')
+        self.coefficients = np.array(coefficients, dtype=np.float64)
+        self.compensation = compensation
+
+    @property
+    def compensated(self):
+        return self.compensation is not None
+
+    def evaluate(self, raw, temperature=None):
+        value = np.polynomial.polynomial.polyval(raw, self.coefficients)
+        if self.compensation is not None and temperature is not None:
+            value = self.compensation.apply(value, temperature)
+        return value
+
+
+class MQCurve:
+    """MQ series gas sensor: ppm = a * (Rs / R0) ** b, the straight line of
+    the datasheet's log-log sensitivity chart.
+
+    Rs is the sensing resistance, worked out from the load resistor rl (kOhm)
+    and the module output read against the ADC reference vref with the
+    heater circuit at supply volts. r0 is Rs of this probe in its
+    calibration gas (usually clean air), in kOhm. factors lists
+    (temperature, Rs/Rs at 20 C) pairs from the datasheet's temperature
+    chart; Rs / R0 is divided by the interpolated factor before the curve
+    is applied.
+    """
+
+    def __init__(self, a, b, r0, rl=10.0, vref=3.3, supply=5.0, factors=None):
+        if r0 <= 0 or rl <= 0:
+            raise ValueError('R0 and the load resistance must be greater than zero.')
+        self.a = a
+        self.b = b
+        self.r0 = r0
+        self.rl = rl
+        self.vref = vref
+        self.supply = supply
+        self.factors = None
+        if factors:
+            factors = sorted(factors)
+            self.factors = (np.array([f[0] for f in factors], dtype=np.float64),
+                            np.array([f[1] for f in factors], dtype=np.float64))
+
+    @property
+    def compensated(self):
+        return self.factors is not None
+
+    def evaluate(self, raw, temperature=None):
+        volts = np.asarray(raw, dtype=np.float64) * (self.vref / RAW_MAX)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = self.rl * (self.supply - volts) / volts / self.r0
+            if self.factors is not None and temperature is not None:
+                ratio = ratio / np.interp(temperature, *self.factors)
+            return self.a * np.power(np.maximum(ratio, 0.0), self.b)
+
+
+_COMPENSATIONS = {
+    'linear': LinearCompensation,
+    'nernst': NernstCompensation,
+}
+
+_CURVES = {
+    'piecewise': PiecewiseLinear,
+    'polynomial': Polynomial,
+    'mq': MQCurve,
+}
+
+# Keys of a calibration spec that belong to the table, not the curve.
+_TABLE_KEYS = ('type', 'channel', 'unit', 'low', 'high', 'temperatures', 'reference')
+
+
+class CalibrationTable:
+    """A curve compiled to a dense float32 table over the 10 bit ADC range.
+
+    A temperature compensated curve gets one row per temperature on the grid
+    temperatures = (first, last, step), so the table is (rows, RAW_MAX + 1)
+    and conversion indexes the nearest row. Other curves have a single row
+    and ignore temperature. Values are clipped to [low, high]; counts where
+    the curve is undefined read as low, or 0 without one.
+    """
+
+    def __init__(self, curve, unit='', low=None, high=None, temperatures=(-10.0, 50.0, 1.0),
+                 reference=25.0, channel=None):
+        self.curve = curve
+        self.unit = unit
+        self.channel = channel
+        self.reference = reference
+        raw = np.arange(RAW_MAX + 1, dtype=np.float64)
+        if curve.compensated:
+            first, last, step = temperatures
+            if step <= 0 or last < first:
+                raise ValueError('Temperatures must be (first, last, step) with step > 0.')
+            self.temperatures = np.arange(first, last + step / 2, step)
+            self.first = first
+            self.step = step
+            values = curve.evaluate(raw[np.newaxis, :], self.temperatures[:, np.newaxis])
+        else:
+            self.temperatures = np.array([reference], dtype=np.float64)
+            self.first = reference
+            self.step = 1.0
+            values = curve.evaluate(raw)[np.newaxis, :]
+        values = np.where(np.isnan(values), low if low is not None else 0.0, values)
+        if low is not None or high is not None:
+            values = np.clip(values, low, high)
+        self.table = np.ascontiguousarray(values, dtype=np.float32)
+        self.flat = self.table.ravel()
+        self.reference_offset = self._offsets(np.float64(reference))
+
+    def _offsets(self, temperature):
+        # Start of the nearest row to temperature in the flattened table. A
+        # NaN temperature (no DHT reading) uses the reference row, as None
+        # does; cast to an index it would otherwise wrap to the first row.
+        last = len(self.temperatures) - 1
+        if not last:
+            return 0
+        temperature = np.where(np.isnan(temperature), self.reference, temperature)
+        rows = np.clip(temperature, self.first, self.first + last * self.step)
+        rows = (rows - self.first) * (1.0 / self.step)
+        rows += 0.5
+        return rows.astype(np.intp) * (RAW_MAX + 1)
+
+    def convert(self, raw, temperature=None):
+        """Convert raw counts (a number or array) to engineering units, at
+        temperature (a number or an array that broadcasts against raw) or at
+        the reference temperature if None. NaN temperatures, such as missing
+        DHT readings, also convert at the reference temperature, uncompensated.
+
+        Integer counts are a single table lookup. Fractional counts, such as
+        Oversampler output, are interpolated between neighbouring entries so
+        the extra resolution is kept; NaN counts (missing samples) convert to
+        NaN. Returns a float for scalar input and a float32 or float64 array
+        otherwise.
+        """
+        if temperature is None:
+            offsets = self.reference_offset
+        else:
+            offsets = self._offsets(np.asarray(temperature, dtype=np.float64))
+        raw = np.asarray(raw)
+        flat = self.flat
+        if raw.dtype.kind in 'iu':
+            raw = np.minimum(raw, RAW_MAX) if raw.dtype.kind == 'u' else np.clip(raw, 0, RAW_MAX)
+            value = flat.take(raw + offsets)
+        else:
+            missing = np.isnan(raw)
+            raw = np.clip(np.where(missing, 0.0, raw), 0.0, RAW_MAX)
+            index = np.minimum(raw.astype(np.intp), RAW_MAX - 1)
+            fraction = raw - index
+            # Not +=: offsets may broadcast index to a larger shape.
+            index = index + offsets
+            below = flat.take(index)
+            value = below + (flat.take(index + 1) - below) * fraction
+            if missing.any():
+                value = np.where(missing, np.nan, value)
+        return float(value) if np.ndim(value) == 0 else value
+
+
+def curve_from_spec(spec):
+    """Build a curve from one entry of a calibration file."""
+    kind = spec.get('type')
+    if kind not in _CURVES:
+        raise ValueError(f'Unknown calibration curve type {kind!r}')
+    options = {key: value for key, value in spec.items() if key not in _TABLE_KEYS}
+    compensation = options.pop('compensation', None)
+    if compensation is not None:
+        compensation = dict(compensation)
+        compensation_kind = compensation.pop('type', None)
+        if compensation_kind not in _COMPENSATIONS:
+            raise ValueError(f'Unknown temperature compensation type {compensation_kind!r}')
+        if kind == 'mq':
+            raise ValueError('MQ curves are compensated with factors, not compensation.')
+        options['compensation'] = _COMPENSATIONS[compensation_kind](**compensation)
+    return _CURVES[kind](**options)
+
+
+def table_from_spec(spec):
+    options = {key: spec[key] for key in ('channel', 'unit', 'low', 'high', 'reference') if key in spec}
+    if 'temperatures' in spec:
+        options['temperatures'] = tuple(spec['temperatures'])
+    return CalibrationTable(curve_from_spec(spec), **options)
+
+
+def load_calibrations(path):
+    """Read a calibration file and return {probe name: CalibrationTable}."""
+    with open(path) as f:
+        specs = json.load(f)
+    tables = {}
+    for name, spec in specs.items():
+        try:
+            tables[name] = table_from_spec(spec)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'{path}: calibration {name!r}: {e}') from None
+    return tables
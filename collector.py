@@ -0,0 +1,185 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+
+
+class Collection:
+    # Result of one collection cycle: the value of every reader (or its default
+    # when the read failed or missed its deadline) and how long each read took.
+    def __init__(self, values, durations, timed_out, errors, elapsed):
+        self.values = values
+        self.durations = durations  # name -> seconds, None if the read did not finish or never ran
+        self.timed_out = timed_out  # names that missed their deadline or were still busy
+        self.errors = errors  # name -> exception raised by the reader
+        self.elapsed = elapsed  # wall time of the whole cycle in seconds
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def format_durations(self):
+        parts = []
+        for name, duration in self.durations.items():
+            if name in self.errors:
+                parts.append(f'{name}: error')
+            elif name in self.timed_out:
+                parts.append(f'{name}: timeout')
+            elif duration is None:
+                parts.append(f'{name}: not read')
+            else:
+                parts.append(f'{name}: {duration * 1000:.1f} ms')
+        return '  '.join(parts)
+
+
+class SensorCollector:
+    """Run a set of named sensor read functions once per cycle.
+
+    In concurrent mode every reader runs on its own worker thread, so the cycle
+    takes as long as the slowest read (bounded by its timeout) instead of the
+    sum of all reads. A reader that is still stuck from an earlier cycle is not
+    started again; it is reported as timed out until it returns.
+
+    Readers can also be sampled one at a time on their own schedule with
+    sample(), and the most recent results read back with latest().
+    """
+
+    def __init__(self, concurrent=True, default_timeout=5.0):
+        self.concurrent = concurrent
+        self.default_timeout = default_timeout
+        self.readers = {}  # name -> (func, timeout, default)
+        self.pending = {}  # name -> future of a read that overran its deadline or was sampled
+        self.started = {}  # name -> monotonic start time of the last sampled read
+        self.samples = {}  # name -> (value, seconds) of the last sampled read
+        self.sample_errors = {}  # name -> exception raised by the last sampled read
+        self.lock = threading.Lock()  # guards samples and sample_errors
+        self.executor = None
+
+    def add_reader(self, name, func, timeout=None, default=None):
+        if timeout is None:
+            timeout = self.default_timeout
+        self.readers[name] = (func, timeout, default)
+
+    def collect(self):
+        if self.concurrent:
+            return self._collect_concurrent()
+        return self._collect_sequential()
+
+    def sample(self, name):
+        """Start one read of name and return without waiting for it.
+
+        In concurrent mode the read runs on the worker pool, so a slow reader
+        doesn't hold up the caller; in sequential mode it runs inline. The
+        result is kept for latest(). Returns False, without starting a read,
+        while the previous read of name is still running.
+        """
+        func = self.readers[name][0]
+        if not self.concurrent:
+            future = Future()
+            try:
+                future.set_result(self._timed(func))
+            except Exception as e:
+                future.set_exception(e)
+            self._store(name, future)
+            return True
+        previous = self.pending.get(name)
+        if previous is not None and not previous.done():
+            return False
+        self.started[name] = time.monotonic()
+        future = self._get_executor().submit(self._timed, func)
+        self.pending[name] = future
+        future.add_done_callback(lambda future: self._store(name, future))
+        return True
+
+    def latest(self):
+        """The most recent sample() of every reader as a Collection.
+
+        Readers not sampled yet, or whose last read failed, read as their
+        default. A reader whose read in flight has run past its timeout is
+        reported as timed out, with its default value.
+        """
+        now = time.monotonic()
+        values, durations, timed_out = {}, {}, []
+        with self.lock:
+            errors = dict(self.sample_errors)
+            for name, (func, timeout, default) in self.readers.items():
+                future = self.pending.get(name)
+                if future is not None and not future.done() and now - self.started.get(name, now) > timeout:
+                    values[name], durations[name] = default, None
+                    timed_out.append(name)
+                else:
+                    values[name], durations[name] = self.samples.get(name, (default, None))
+        return Collection(values, durations, timed_out, errors, 0.0)
+
+    def _store(self, name, future):
+        with self.lock:
+            try:
+                self.samples[name] = future.result()
+                self.sample_errors.pop(name, None)
+            except Exception as e:
+                self.samples[name] = (self.readers[name][2], None)
+                self.sample_errors[name] = e
+
+    def close(self):
+        if self.executor is not None:
+            # Don't wait on reads that are hung in hardware.
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    @staticmethod
+    def _timed(func):
+        start = time.monotonic()
+        value = func()
+        return value, time.monotonic() - start
+
+    def _collect_sequential(self):
+        start = time.monotonic()
+        values, durations, errors = {}, {}, {}
+        for name, (func, timeout, default) in self.readers.items():
+            try:
+                values[name], durations[name] = self._timed(func)
+            except Exception as e:
+                values[name], durations[name] = default, None
+                errors[name] = e
+        return Collection(values, durations, [], errors, time.monotonic() - start)
+
+    def _get_executor(self):
+        if self.executor is None:
+            # One worker per reader is enough because a reader never has more
+            # than one read in flight.
+            self.executor = ThreadPoolExecutor(max_workers=max(1, len(self.readers)),
+                                               thread_name_prefix='sensor')
+        return self.executor
+
+    def _collect_concurrent(self):
+        executor = self._get_executor()
+        start = time.monotonic()
+        values, durations, errors = {}, {}, {}
+        timed_out = []
+        futures = []
+        for name, (func, timeout, default) in self.readers.items():
+            previous = self.pending.get(name)
+            if previous is not None:
+                if not previous.done():
+                    values[name], durations[name] = default, None
+                    timed_out.append(name)
+                    continue
+                del self.pending[name]
+            futures.append((start + timeout, name, executor.submit(self._timed, func)))
+
+        # Wait on the reads in deadline order; all of them run in parallel, so
+        # the total wait is the latest of each read's finish time or deadline.
+        for deadline, name, future in sorted(futures, key=lambda item: item[0]):
+            default = self.readers[name][2]
+            try:
+                values[name], durations[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except TimeoutError:
+                values[name], durations[name] = default, None
+                timed_out.append(name)
+                self.pending[name] = future
+            except Exception as e:
+                values[name], durations[name] = default, None
+                errors[name] = e
+
+        # Report in registration order, not completion order.
+        values = {name: values[name] for name in self.readers}
+        durations = {name: durations[name] for name in self.readers}
+        return Collection(values, durations, timed_out, errors, time.monotonic() - start)
@@ -0,0 +1,281 @@
+import json
+import os
+from array import array
+from datetime import datetime
+
+
+# On-disk layout of a columnar log directory:
+#
+#   schema.json    column names, types and category labels
+#   time.i8        int64 timestamps in epoch nanoseconds, one per row
+#   NNN.f4         float32 values of column NNN (bool columns hold 0/1,
+#                  category columns hold the index into their labels)
+#   NNN.valid      validity bitmap of column NNN, bit i set when row i has a
+#                  reading (little-endian bit order, like numpy.packbits)
+#
+# Everything is append-only. The timestamp file is written last, so after a
+# crash its length is the committed row count and longer columns are
+# trimmed back to it the next time the log is opened for writing.
+
+SCHEMA_FILE = 'schema.json'
+TIME_FILE = 'time.i8'
+COLUMN_TYPES = ('float', 'bool', 'category')
+MISSING = (None, '', 'N/A', 'nan', 'NaN')
+
+
+def to_epoch_ns(value):
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    # datetime.timestamp() treats naive datetimes as local time, which is what
+    # datetime.now() in the loggers produces.
+    return int(value.timestamp()) * 1_000_000_000 + value.microsecond * 1000
+
+
+def from_epoch_ns(ns):
+    # Inverse of to_epoch_ns, exact to the microsecond.
+    return datetime.fromtimestamp(ns // 1_000_000_000).replace(microsecond=ns // 1000 % 1_000_000)
+
+
+class ColumnarWriter:
+    """Append rows to a columnar log directory.
+
+    fieldnames is the same list as SensorApp.get_fieldnames(); time_field
+    names the timestamp column. types maps a field to 'bool' or 'category';
+    every other field is stored as float32. writerow() accepts the same row
+    dicts as the CSV writer: 'N/A', '' and None are recorded as missing.
+    """
+
+    def __init__(self, path, fieldnames, types=None, time_field='Timestamp', flush_rows=60):
+        self.path = path
+        self.time_field = time_field
+        self.flush_rows = flush_rows
+        types = types or {}
+        os.makedirs(path, exist_ok=True)
+
+        schema = self._load_schema()
+        if schema is None:
+            columns = []
+            for index, name in enumerate(f for f in fieldnames if f != time_field):
+                kind = types.get(name, 'float')
+                if kind not in COLUMN_TYPES:
+                    raise ValueError(f'Unknown column type {kind} for {name}')
+                columns.append({'name': name, 'file': f'{index:03d}', 'type': kind, 'categories': []})
+            schema = {'version': 1, 'byteorder': 'little', 'time_field': time_field, 'columns': columns}
+            self._save_schema(schema)
+        else:
+            names = [c['name'] for c in schema['columns']]
+            if names != [f for f in fieldnames if f != time_field]:
+                raise ValueError(f'{path} was written with different fields: {names}')
+        self.schema = schema
+        self.columns = schema['columns']
+        self.category_index = [{label: i for i, label in enumerate(c['categories'])} for c in self.columns]
+        self.schema_dirty = False
+
+        self.rows = self._recover()
+        self._reset_buffers()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _load_schema(self):
+        try:
+            with open(self._file(SCHEMA_FILE)) as infile:
+                return json.load(infile)
+        except FileNotFoundError:
+            return None
+
+    def _save_schema(self, schema):
+        tmp = self._file(SCHEMA_FILE + '.tmp')
+        with open(tmp, 'w') as outfile:
+            json.dump(schema, outfile, indent=1)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.replace(tmp, self._file(SCHEMA_FILE))
+
+    def _recover(self):
+        # Trim every column to the committed row count and clear bitmap bits
+        # past it, so appends line up after an interrupted flush.
+        time_path = self._file(TIME_FILE)
+        if not os.path.exists(time_path):
+            open(time_path, 'wb').close()
+        rows = os.path.getsize(time_path) // 8
+        with open(time_path, 'r+b') as f:
+            f.truncate(rows * 8)
+        for column in self.columns:
+            values = self._file(column['file'] + '.f4')
+            valid = self._file(column['file'] + '.valid')
+            for path, size in ((values, rows * 4), (valid, (rows + 7) // 8)):
+                with open(path, 'ab') as f:
+                    pass
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+            if rows % 8:
+                with open(valid, 'r+b') as f:
+                    f.seek(-1, os.SEEK_END)
+                    last = f.read(1)[0] & ((1 << (rows % 8)) - 1)
+                    f.seek(-1, os.SEEK_END)
+                    f.write(bytes([last]))
+        return rows
+
+    def last_timestamp(self):
+        # Newest committed timestamp as a naive local datetime, or None.
+        if not self.rows:
+            return None
+        with open(self._file(TIME_FILE), 'rb') as f:
+            f.seek((self.rows - 1) * 8)
+            ns = array('q', f.read(8))[0]
+        return from_epoch_ns(ns)
+
+    def _reset_buffers(self):
+        self.times = array('q')
+        self.values = [array('f') for _ in self.columns]
+        self.valid = [[] for _ in self.columns]
+
+    def _convert(self, index, value):
+        # Return (float value, is_valid) for one cell.
+        if isinstance(value, str):
+            value = value.strip()
+        if value in MISSING:
+            return 0.0, False
+        kind = self.columns[index]['type']
+        if kind == 'bool':
+            if isinstance(value, str):
+                return (1.0 if value.lower() in ('yes', 'true', '1') else 0.0), True
+            return (1.0 if value else 0.0), True
+        if kind == 'category':
+            labels = self.category_index[index]
+            if value not in labels:
+                labels[value] = len(labels)
+                self.columns[index]['categories'].append(value)
+                self.schema_dirty = True
+            return float(labels[value]), True
+        if isinstance(value, str) and value in ('True', 'False'):
+            # Digital inputs are logged as True/False text.
+            return (1.0 if value == 'True' else 0.0), True
+        try:
+            return float(value), True
+        except (TypeError, ValueError):
+            return 0.0, False
+
+    def writerow(self, row):
+        for index, column in enumerate(self.columns):
+            value, ok = self._convert(index, row.get(column['name']))
+            self.values[index].append(value)
+            self.valid[index].append(ok)
+        self.times.append(to_epoch_ns(row[self.time_field]))
+        if len(self.times) >= self.flush_rows:
+            self.flush()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self):
+        if not self.times:
+            return
+        if self.schema_dirty:
+            # New category labels must be durable before rows refer to them.
+            self._save_schema(self.schema)
+            self.schema_dirty = False
+        for index, column in enumerate(self.columns):
+            with open(self._file(column['file'] + '.f4'), 'ab') as f:
+                self.values[index].tofile(f)
+            self._append_bits(self._file(column['file'] + '.valid'), self.valid[index])
+        with open(self._file(TIME_FILE), 'ab') as f:
+            self.times.tofile(f)
+        self.rows += len(self.times)
+        self._reset_buffers()
+
+    def sync(self):
+        # flush(), then force the columns to disk, the timestamps last as
+        # they define the committed row count.
+        self.flush()
+        names = [column['file'] + suffix for column in self.columns for suffix in ('.f4', '.valid')]
+        for name in names + [TIME_FILE]:
+            with open(self._file(name), 'ab') as f:
+                os.fsync(f.fileno())
+
+    def _append_bits(self, path, bits):
+        start = self.rows
+        with open(path, 'r+b') as f:
+            offset = start % 8
+            current = 0
+            if offset:
+                # Finish the partially filled last byte first.
+                f.seek(-1, os.SEEK_END)
+                current = f.read(1)[0]
+                f.seek(-1, os.SEEK_END)
+            else:
+                f.seek(0, os.SEEK_END)
+            out = bytearray()
+            for bit in bits:
+                if bit:
+                    current |= 1 << offset
+                offset += 1
+                if offset == 8:
+                    out.append(current)
+                    current = 0
+                    offset = 0
+            if offset:
+                out.append(current)
+            f.write(out)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ColumnarReader:
+    """Memory-mapped, zero-copy access to a columnar log directory.
+
+    Requires numpy. timestamps and column values are numpy.memmap views of
+    the files; nothing is parsed.
+    """
+
+    def __init__(self, path):
+        import numpy as np
+        self.np = np
+        self.path = path
+        with open(os.path.join(path, SCHEMA_FILE)) as infile:
+            self.schema = json.load(infile)
+        if self.schema['byteorder'] != 'little':
+            raise ValueError('Only little-endian columnar logs are supported')
+        self.columns = {c['name']: c for c in self.schema['columns']}
+        self.rows = os.path.getsize(os.path.join(path, TIME_FILE)) // 8
+
+    def _map(self, name, dtype, count):
+        if count == 0:
+            return self.np.empty(0, dtype=dtype)
+        return self.np.memmap(os.path.join(self.path, name), dtype=dtype, mode='r', shape=(count,))
+
+    @property
+    def fieldnames(self):
+        return [self.schema['time_field']] + list(self.columns)
+
+    @property
+    def timestamps(self):
+        # int64 epoch nanoseconds; .view('datetime64[ns]') for datetimes.
+        return self._map(TIME_FILE, '<i8', self.rows)
+
+    def values(self, name):
+        return self._map(self.columns[name]['file'] + '.f4', '<f4', self.rows)
+
+    def valid(self, name):
+        bits = self._map(self.columns[name]['file'] + '.valid', 'u1', (self.rows + 7) // 8)
+        return self.np.unpackbits(bits, count=self.rows, bitorder='little').view(bool)
+
+    def column(self, name):
+        # float32 copy of the column with missing readings as NaN.
+        values = self.np.array(self.values(name))
+        values[~self.valid(name)] = self.np.nan
+        return values
+
+    def categories(self, name):
+        return self.columns[name]['categories']
@@ -0,0 +1,173 @@
+import csv
+import io
+import os
+import queue
+import threading
+import time
+
+
+def open_for_append(path, fieldnames):
+    """Open a CSV file for appending without losing what is already in it.
+
+    A torn last line left by a crash mid-write is cut off, and a header is
+    written only if the file is new or empty."""
+    file = open(path, mode='a+', newline='', encoding='utf-8')
+    size = file.tell()
+    if size:
+        with open(path, 'rb') as raw:
+            raw.seek(max(0, size - 4096))
+            tail = raw.read()
+        if not tail.endswith(b'\n'):
+            cut = tail.rfind(b'\n')
+            file.truncate(size - len(tail) + cut + 1 if cut >= 0 else 0)
+            file.seek(0, os.SEEK_END)
+    if file.tell() == 0:
+        csv.DictWriter(file, fieldnames=fieldnames).writeheader()
+        file.flush()
+    return file
+
+
+def format_rows(fieldnames, rows):
+    buffer = io.StringIO()
+    csv.DictWriter(buffer, fieldnames=fieldnames).writerows(rows)
+    return buffer.getvalue()
+
+
+class BufferedCSVWriter:
+    """CSV writer that batches rows and writes them from a background thread.
+
+    writerow() only queues the row, so a slow SD card never blocks sampling.
+    The writer thread formats the rows and commits them as one write when
+    flush_rows rows are pending, when flush_interval seconds have passed since
+    the oldest pending row arrived, or when flush()/close() is called. With
+    fsync=True every commit is also forced to disk; otherwise sync() does it
+    on demand. An existing file is appended to.
+
+    If a commit fails (a full or failing SD card) the error is kept in error
+    and raised from the next writerow(), flush() or close(); rows that were
+    pending or arrive later are discarded and counted in dropped.
+    """
+
+    def __init__(self, path, fieldnames, flush_rows=60, flush_interval=60.0, fsync=False,
+                 max_queue=0):
+        self.path = path
+        self.fieldnames = fieldnames
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.queue = queue.Queue(max_queue)
+        self.dropped = 0  # rows rejected by a full queue or lost to a failed commit
+        self.commits = 0
+        self.rows_written = 0
+        self.closed = False
+        self.error = None  # exception that stopped the writer thread committing
+
+        self._open()
+        self.thread = threading.Thread(target=self._run, name='csv-writer', daemon=True)
+        self.thread.start()
+
+    def writerow(self, row):
+        if self.closed:
+            raise ValueError('write to closed BufferedCSVWriter')
+        if self.error is not None:
+            raise self.error
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self):
+        # Commit everything queued so far and wait until it is written.
+        self._wait(sync=False)
+
+    def sync(self):
+        # flush(), then force everything committed so far to disk.
+        self._wait(sync=True)
+
+    def _wait(self, sync):
+        done = threading.Event()
+        self.queue.put((done, sync))
+        done.wait()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join()
+        self._close_files()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open(self):
+        self.file = open_for_append(self.path, self.fieldnames)
+
+    def _close_files(self):
+        self.file.close()
+
+    def _sync_files(self):
+        os.fsync(self.file.fileno())
+
+    def _run(self):
+        pending = []
+        oldest = None  # monotonic time the oldest uncommitted row arrived
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(0.0, oldest + self.flush_interval - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # the oldest row has waited flush_interval
+
+            if isinstance(item, dict):
+                if self.error is not None:
+                    self.dropped += 1
+                    continue
+                if not pending:
+                    oldest = time.monotonic()
+                pending.append(item)
+                if len(pending) < self.flush_rows and time.monotonic() - oldest < self.flush_interval:
+                    continue
+
+            if pending:
+                try:
+                    self._commit(pending)
+                except Exception as e:
+                    # Keep answering flush() and close() so callers see the
+                    # error instead of hanging on a dead thread.
+                    self.error = e
+                    self.dropped += len(pending)
+                else:
+                    self.commits += 1
+                    self.rows_written += len(pending)
+                pending = []
+
+            if item is None:
+                return
+            if isinstance(item, tuple):
+                done, sync = item
+                if sync and self.error is None:
+                    try:
+                        self._sync_files()
+                    except Exception as e:
+                        self.error = e
+                done.set()
+
+    def _commit(self, rows):
+        self.file.write(format_rows(self.fieldnames, rows))
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
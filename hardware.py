@@ -0,0 +1,497 @@
+import math
+import os
+import random
+import struct
+import threading
+import time
+
+
+# Pick the device backend with AGRO_BACKEND=hardware (default) or AGRO_BACKEND=sim.
+BACKEND_ENV = 'AGRO_BACKEND'
+
+
+def get_backend(name=None, **kwargs):
+    """Return the device backend called name, or the one chosen by the
+    AGRO_BACKEND environment variable when name is None."""
+    if name is None:
+        name = os.environ.get(BACKEND_ENV, 'hardware')
+    if name == 'hardware':
+        return HardwareBackend()
+    if name in ('sim', 'simulated'):
+        seed = os.environ.get('AGRO_SIM_SEED')
+        kwargs.setdefault('seed', int(seed) if seed is not None else None)
+        return SimulatedBackend(**kwargs)
+    raise ValueError(f'Unknown device backend: {name}')
+
+
+class HardwareBackend:
+    # Real devices. The driver libraries are imported on first use so that
+    # importing this module works on machines without them.
+    name = 'hardware'
+
+    def pin(self, name):
+        import board
+        return getattr(board, name)
+
+    def dht11(self, pin):
+        import adafruit_dht
+        return adafruit_dht.DHT11(pin)
+
+    def dht22(self, pin):
+        import adafruit_dht
+        return adafruit_dht.DHT22(pin)
+
+    def digital_input(self, pin):
+        import digitalio
+        io = digitalio.DigitalInOut(pin)
+        io.direction = digitalio.Direction.INPUT
+        return io
+
+    def i2c(self):
+        import board
+        return board.I2C()
+
+    def tsl2561(self, i2c):
+        import adafruit_tsl2561
+        return adafruit_tsl2561.TSL2561(i2c)
+
+    def bh1750(self, i2c):
+        from adafruit_bh1750 import BH1750
+        return BH1750(i2c)
+
+    def bmp280(self, i2c):
+        import adafruit_bmp280
+        return adafruit_bmp280.Adafruit_BMP280_I2C(i2c)
+
+    def spi_device(self):
+        import spidev
+        return spidev.SpiDev()
+
+    def modbus_port(self, slaves=None, baudrate=9600):
+        # The RS485 adapter the Modbus probes hang off.
+        return os.environ.get('AGRO_MODBUS_PORT', '/dev/ttyUSB0')
+
+    def close(self):
+        # Real devices are closed by whoever opened them.
+        pass
+
+    def gpio(self):
+        import RPi.GPIO as GPIO
+        return GPIO
+
+
+# Value models for simulated devices. Each one maps the simulation time in
+# seconds to a value.
+
+class Constant:
+    def __init__(self, value):
+        self.value = value
+
+    def sample(self, t, rng):
+        return self.value
+
+
+class Diurnal:
+    # Daily sine cycle with gaussian noise, peaking at peak_hour.
+    def __init__(self, mean, amplitude, noise=0.0, peak_hour=14, period=86400.0, low=None, high=None):
+        self.mean = mean
+        self.amplitude = amplitude
+        self.noise = noise
+        self.peak = peak_hour * 3600.0
+        self.period = period
+        self.low = low
+        self.high = high
+
+    def sample(self, t, rng):
+        value = self.mean + self.amplitude * math.cos(2 * math.pi * (t - self.peak) / self.period)
+        if self.noise:
+            value += rng.gauss(0.0, self.noise)
+        if self.low is not None:
+            value = max(self.low, value)
+        if self.high is not None:
+            value = min(self.high, value)
+        return value
+
+
+class RandomWalk:
+    def __init__(self, start, step, low, high):
+        self.value = start
+        self.step = step
+        self.low = low
+        self.high = high
+        self.lock = threading.Lock()
+
+    def sample(self, t, rng):
+        with self.lock:
+            self.value = min(self.high, max(self.low, self.value + rng.gauss(0.0, self.step)))
+            return self.value
+
+
+def copy_model(model):
+    # Models with state get one copy per simulated device.
+    if isinstance(model, RandomWalk):
+        return RandomWalk(model.value, model.step, model.low, model.high)
+    return model
+
+
+class Bernoulli:
+    # Digital input that reads True with probability p.
+    def __init__(self, p):
+        self.p = p
+
+    def sample(self, t, rng):
+        return rng.random() < self.p
+
+
+class SimDeviceConfig:
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, models=None):
+        self.latency = latency  # seconds per access
+        self.jitter = jitter  # extra uniform random latency in seconds
+        self.failure_rate = failure_rate  # probability an access raises
+        self.models = models or {}
+
+
+def default_sim_config():
+    # Defaults roughly follow the real parts: the DHT bit-bangs for ~250 ms and
+    # fails often, I2C sensors answer in a few ms, GPIO reads are instant.
+    return {
+        'dht': SimDeviceConfig(latency=0.25, jitter=0.05, failure_rate=0.1, models={
+            'temperature': Diurnal(24.0, 6.0, noise=0.3),
+            'humidity': Diurnal(55.0, -15.0, noise=1.0, low=0.0, high=100.0),
+        }),
+        'digital': SimDeviceConfig(models={'value': Bernoulli(0.5)}),
+        'tsl2561': SimDeviceConfig(latency=0.015, failure_rate=0.01, models={
+            'lux': Diurnal(15000.0, 15000.0, noise=200.0, peak_hour=13, low=0.0),
+        }),
+        'bh1750': SimDeviceConfig(latency=0.12, failure_rate=0.01, models={
+            'lux': Diurnal(15000.0, 15000.0, noise=200.0, peak_hour=13, low=0.0),
+        }),
+        'bmp280': SimDeviceConfig(latency=0.005, failure_rate=0.01, models={
+            'pressure': RandomWalk(1013.25, 0.05, 980.0, 1040.0),
+            'temperature': Diurnal(24.0, 6.0, noise=0.1),
+        }),
+        'mcp3008': SimDeviceConfig(latency=0.00005, models={
+            'channel': RandomWalk(512.0, 4.0, 0.0, 1023.0),
+        }),
+        # Latency is the turnaround of an RS485 NPK probe, on top of the wire time.
+        'modbus': SimDeviceConfig(latency=0.01, jitter=0.005, failure_rate=0.01, models={
+            'moisture': RandomWalk(35.0, 0.2, 0.0, 100.0),
+            'temperature': Diurnal(18.0, 4.0, noise=0.1),
+            'ec': RandomWalk(450.0, 5.0, 0.0, 2000.0),
+            'ph': RandomWalk(6.5, 0.02, 3.0, 9.0),
+            'nitrogen': RandomWalk(40.0, 0.5, 0.0, 200.0),
+            'phosphorus': RandomWalk(20.0, 0.3, 0.0, 200.0),
+            'potassium': RandomWalk(120.0, 1.0, 0.0, 500.0),
+        }),
+    }
+
+
+class SimulatedBackend:
+    """Simulated devices with configurable latency, failure rate and value
+    models, for running and profiling the collectors off-device.
+
+    config maps a device kind ('dht', 'digital', 'tsl2561', 'bh1750',
+    'bmp280', 'mcp3008', 'modbus') to a SimDeviceConfig and overrides the
+    defaults.
+    Pass time_scale > 1 to run the value models faster than real time.
+    close() stops the simulated Modbus probes and closes their terminals.
+    """
+    name = 'sim'
+
+    def __init__(self, seed=None, config=None, time_scale=1.0):
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.config = default_sim_config()
+        self.config.update(config or {})
+        self.time_scale = time_scale
+        self.start = time.time()
+        self.start_monotonic = time.monotonic()
+        self.modbus_sims = []
+
+    def now(self):
+        # Seconds since local midnight in simulation time, for the daily models.
+        elapsed = (time.monotonic() - self.start_monotonic) * self.time_scale
+        local = time.localtime(self.start)
+        midnight = local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec
+        return midnight + elapsed
+
+    def access(self, kind):
+        # Sleep for the configured latency and maybe fail, like the real bus would.
+        config = self.config[kind]
+        with self.rng_lock:
+            delay = config.latency + (self.rng.uniform(0.0, config.jitter) if config.jitter else 0.0)
+            failed = self.rng.random() < config.failure_rate
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise RuntimeError(f'Simulated {kind} read failure')
+
+    def sample(self, kind, quantity, model=None):
+        if model is None:
+            model = self.config[kind].models[quantity]
+        with self.rng_lock:
+            return model.sample(self.now(), self.rng)
+
+    def pin(self, name):
+        return name
+
+    def dht11(self, pin):
+        return SimDHT(self, pin, decimals=0)
+
+    def dht22(self, pin):
+        return SimDHT(self, pin, decimals=1)
+
+    def digital_input(self, pin):
+        return SimDigitalInput(self, pin)
+
+    def i2c(self):
+        return SimI2C()
+
+    def tsl2561(self, i2c):
+        return SimLuxSensor(self, 'tsl2561')
+
+    def bh1750(self, i2c):
+        return SimLuxSensor(self, 'bh1750')
+
+    def bmp280(self, i2c):
+        return SimBMP280(self)
+
+    def spi_device(self):
+        return SimMCP3008(self)
+
+    def modbus_port(self, slaves=(1,), baudrate=9600):
+        # A pseudo terminal with simulated NPK probes at the slaves addresses,
+        # served until close().
+        sim = SimModbusNPK(self, slaves, baudrate)
+        self.modbus_sims.append(sim)
+        return sim.port
+
+    def close(self):
+        while self.modbus_sims:
+            self.modbus_sims.pop().close()
+
+    def gpio(self):
+        return SimGPIO(self)
+
+
+class SimDHT:
+    # Mirrors adafruit_dht: a reading is cached for 2 seconds and failures
+    # raise RuntimeError.
+    MIN_INTERVAL = 2.0
+
+    def __init__(self, backend, pin, decimals):
+        self.backend = backend
+        self.pin = pin
+        self.decimals = decimals
+        self.last_read = None
+        self._temperature = None
+        self._humidity = None
+        self.lock = threading.Lock()
+
+    def measure(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.last_read is not None and now - self.last_read < self.MIN_INTERVAL:
+                return
+            self.last_read = now
+            self.backend.access('dht')
+            temperature = self.backend.sample('dht', 'temperature')
+            humidity = self.backend.sample('dht', 'humidity')
+            if self.decimals:
+                self._temperature = round(temperature, self.decimals)
+                self._humidity = round(humidity, self.decimals)
+            else:
+                self._temperature = int(round(temperature))
+                self._humidity = int(round(humidity))
+
+    @property
+    def temperature(self):
+        self.measure()
+        return self._temperature
+
+    @property
+    def humidity(self):
+        self.measure()
+        return self._humidity
+
+    def exit(self):
+        pass
+
+
+class SimDigitalInput:
+    def __init__(self, backend, pin):
+        self.backend = backend
+        self.pin = pin
+        self.direction = None
+
+    @property
+    def value(self):
+        self.backend.access('digital')
+        return self.backend.sample('digital', 'value')
+
+
+class SimI2C:
+    def deinit(self):
+        pass
+
+
+class SimLuxSensor:
+    def __init__(self, backend, kind):
+        self.backend = backend
+        self.kind = kind
+        self.enabled = True
+
+    @property
+    def lux(self):
+        self.backend.access(self.kind)
+        return self.backend.sample(self.kind, 'lux')
+
+
+class SimBMP280:
+    def __init__(self, backend):
+        self.backend = backend
+
+    @property
+    def pressure(self):
+        self.backend.access('bmp280')
+        return self.backend.sample('bmp280', 'pressure')
+
+    @property
+    def temperature(self):
+        self.backend.access('bmp280')
+        return self.backend.sample('bmp280', 'temperature')
+
+
+class SimMCP3008:
+    # Answers MCP3008 single-ended conversion requests ([1, (8 + ch) << 4, 0])
+    # the way spidev.SpiDev.xfer2 would. Each channel gets its own copy of the
+    # configured value model.
+    def __init__(self, backend):
+        self.backend = backend
+        self.max_speed_hz = 0
+        self.mode = 0
+        self.is_open = False
+        template = backend.config['mcp3008'].models['channel']
+        self.models = [copy_model(template) for _ in range(8)]
+
+    def open(self, bus, device):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    def xfer2(self, data):
+        if not self.is_open:
+            raise OSError('SPI device is not open')
+        self.backend.access('mcp3008')
+        out = [0] * len(data)
+        # Every 3 byte group is one conversion request.
+        for i in range(0, len(data) - 2, 3):
+            if data[i] & 1 and data[i + 1] & 0x80:
+                channel = (data[i + 1] >> 4) & 7
+                value = int(self.backend.sample('mcp3008', 'channel', self.models[channel]))
+                out[i + 1] = (value >> 8) & 3
+                out[i + 2] = value & 0xFF
+        return out
+
+
+class SimModbusNPK:
+    # Modbus-RTU soil NPK probes at the given slave addresses, answering
+    # register reads on a pseudo terminal whose path is port. Answers come
+    # after the wire time of request and response at baudrate plus the
+    # configured latency; a failure is either no answer or a bad CRC.
+    # Addresses without a probe stay silent, like on a real bus.
+    def __init__(self, backend, slaves, baudrate):
+        import tty
+        from modbus import NPK_REGISTERS
+        self.backend = backend
+        self.char_time = 10.0 / baudrate
+        self.registers = {register: (name, decimals) for name, (register, decimals, _) in NPK_REGISTERS.items()}
+        models = backend.config['modbus'].models
+        self.models = {slave: {name: copy_model(model) for name, model in models.items()} for slave in slaves}
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.serve, name='sim-modbus', daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.stop_event.set()
+        self.thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def serve(self):
+        import select
+        buffer = bytearray()
+        while not self.stop_event.is_set():
+            if not select.select((self.master,), (), (), 0.1)[0]:
+                # A gap in the traffic ends any partial frame.
+                buffer.clear()
+                continue
+            buffer += os.read(self.master, 256)
+            # Requests for register reads are 8 bytes.
+            while len(buffer) >= 8:
+                response = self.answer(bytes(buffer[:8]))
+                del buffer[:8]
+                if response is not None:
+                    os.write(self.master, response)
+
+    def answer(self, request):
+        from modbus import crc16, frame
+        slave, function, address, count, crc = struct.unpack('>BBHHH', request)
+        if crc16(request[:6]) != int.from_bytes(request[6:], 'little') or slave not in self.models:
+            return None
+        config = self.backend.config['modbus']
+        with self.backend.rng_lock:
+            delay = config.latency + (self.backend.rng.uniform(0.0, config.jitter) if config.jitter else 0.0)
+            failure = self.backend.rng.random() < config.failure_rate
+            corrupt = failure and self.backend.rng.random() < 0.5
+        if failure and not corrupt:
+            return None
+        if function not in (3, 4):
+            response = frame(slave, bytes((function | 0x80, 1)))  # illegal function
+        elif not all(register in self.registers for register in range(address, address + count)):
+            response = frame(slave, bytes((function | 0x80, 2)))  # illegal data address
+        else:
+            values = []
+            for register in range(address, address + count):
+                name, decimals = self.registers[register]
+                value = self.backend.sample('modbus', name, self.models[slave][name])
+                values.append(int(round(value * 10 ** decimals)) & 0xFFFF)
+            response = frame(slave, struct.pack(f'>BB{count}H', function, 2 * count, *values))
+        if corrupt:
+            response = response[:-1] + bytes((response[-1] ^ 0xFF,))
+        time.sleep(delay + (len(request) + len(response)) * self.char_time)
+        return response
+
+
+class SimGPIO:
+    # Stand-in for the RPi.GPIO module.
+    BCM = 11
+    BOARD = 10
+    IN = 1
+    OUT = 0
+    LOW = 0
+    HIGH = 1
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.mode = None
+        self.pins = {}
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setup(self, pin, direction):
+        self.pins[pin] = direction
+
+    def input(self, pin):
+        if pin not in self.pins:
+            raise RuntimeError('You must setup() the GPIO channel first')
+        self.backend.access('digital')
+        return self.HIGH if self.backend.sample('digital', 'value') else self.LOW
+
+    def cleanup(self):
+        self.pins.clear()
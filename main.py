@@ -1,36 +1,59 @@
-import time
-import board
-import adafruit_dht
-import adafruit_tsl2561
-import csv
 from datetime import datetime
-import digitalio
+import signal
 import random  # For simulating gas concentrations and pH values
 
+from buses import BusManager, get_bus_manager
+from collector import SensorCollector
+from columnar import ColumnarWriter
+from partitioned import PartitionedCSVWriter
+from rollup import ROLLUP_FIELDS, RollupEngine
+from scheduler import FixedRateScheduler
+from sqlite_store import SQLiteWriter
+from wal import DurableWriter
+
 class SensorApp:
-    def __init__(self):
+    LOG_INTERVAL = 10  # Seconds between logged rows
+    # Seconds between reads of each sensor; every logged row holds the latest
+    # reading of each one.
+    SAMPLE_INTERVALS = {'gas': 0.5, 'soil_moisture': 1.0, 'smoke': 1.0, 'dht': 2.0,
+                        'lux': 10.0, 'ph': 10.0}
+
+    def __init__(self, concurrent=True, backend=None, storage='csv', durable=True):
+        # Real devices by default, simulated ones with AGRO_BACKEND=sim. The bus
+        # manager owns the I2C and SPI buses, shared with any other collector
+        # running in this process.
+        self.buses = BusManager(backend) if backend is not None else get_bus_manager()
+        self.hw = self.buses.backend
+
         # Define the pins where the sensors are connected
-        self.DHT_PIN = board.D4  # DHT sensor pin
-        self.SOIL_MOISTURE_PIN = board.D17  # Soil moisture sensor pin
-        self.SMOKE_SENSOR_PIN = board.D18  # Smoke sensor pin
-        self.PH_SENSOR_PIN = board.A0  # Analog pin for pH sensor (example)
+        self.DHT_PIN = self.hw.pin('D4')  # DHT sensor pin
+        self.SOIL_MOISTURE_PIN = self.hw.pin('D17')  # Soil moisture sensor pin
+        self.SMOKE_SENSOR_PIN = self.hw.pin('D18')  # Smoke sensor pin
+        self.PH_SENSOR_PIN = self.hw.pin('A0')  # Analog pin for pH sensor (example)
 
         # Create instances for the sensors
-        self.dht_sensor = adafruit_dht.DHT11(self.DHT_PIN)
-        self.smoke_sensor = digitalio.DigitalInOut(self.SMOKE_SENSOR_PIN)
-        self.smoke_sensor.direction = digitalio.Direction.INPUT
-        self.soil_moisture_sensor = digitalio.DigitalInOut(self.SOIL_MOISTURE_PIN)
-        self.soil_moisture_sensor.direction = digitalio.Direction.INPUT
+        self.dht_sensor = self.hw.dht11(self.DHT_PIN)
+        self.smoke_sensor = self.hw.digital_input(self.SMOKE_SENSOR_PIN)
+        self.soil_moisture_sensor = self.hw.digital_input(self.SOIL_MOISTURE_PIN)
 
         # Set up the lux sensor (TSL2561)
-        self.i2c = board.I2C()  # Create I2C bus
-        self.lux_sensor = adafruit_tsl2561.TSL2561(self.i2c)
+        self.lux_sensor = self.buses.device('tsl2561')
         self.lux_sensor.enabled = True  # Enable the sensor
 
-        # Set up the CSV file
-        self.csvfile = open('sensorData.csv', mode='w', newline='')
-        self.writer = csv.DictWriter(self.csvfile, fieldnames=self.get_fieldnames())
-        self.writer.writeheader()
+        # Set up the output file
+        self.writer = self.create_writer(storage)
+        if durable:
+            # Rows go to the write-ahead log in wal/ in groups of 6, one fsync
+            # per group, before reaching the output file, so a power cut loses
+            # at most the last 5 rows (50 s at LOG_INTERVAL). Rows the output
+            # file missed are replayed into it on the next start.
+            self.writer = DurableWriter(self.writer, 'wal', commit_rows=6, apply_rows=6)
+
+        # Min/max/mean/stddev of each reading over 1 min, 1 h and 1 day
+        # windows. Every closed window is written to rollups/ as its own row.
+        self.rollups = RollupEngine()
+        self.rollup_writer = PartitionedCSVWriter('rollups', ROLLUP_FIELDS, period='month', prefix='rollups',
+                                                  time_field='End', flush_rows=60, flush_interval=60.0)
 
         # Initialize sensor connection status
         self.dht_connected = True
@@ -38,6 +61,26 @@ class SensorApp:
         self.smoke_connected = True
         self.soil_moisture_connected = True
 
+        # Read all sensors in parallel so a slow DHT or I2C read only delays itself
+        self.collector = self.create_collector(concurrent)
+        self.scheduler = FixedRateScheduler()
+
+    def create_writer(self, storage):
+        if storage == 'csv':
+            # One CSV file per day under logs/, appended to across restarts.
+            # Rows are committed in groups of 6 (one minute of data) instead
+            # of flushing the SD card on every row.
+            return PartitionedCSVWriter('logs', self.get_fieldnames(),
+                                        flush_rows=6, flush_interval=60.0)
+        if storage == 'columnar':
+            # One typed binary file per field, readable with columnar.ColumnarReader
+            return ColumnarWriter('sensorData', self.get_fieldnames(), flush_rows=6,
+                                  types={'Smoke Detected': 'bool', 'pH Condition': 'category'})
+        if storage == 'sqlite':
+            # One row per reading in sensorData.db, queryable with sqlite_store.SQLiteStore
+            return SQLiteWriter('sensorData.db', self.get_fieldnames(), batch_rows=6)
+        raise ValueError(f'Unknown storage type: {storage}')
+
     def get_fieldnames(self):
         return [
             'Timestamp', 
@@ -114,6 +157,22 @@ class SensorApp:
         pH_value = random.uniform(0, 14)  # pH scale typically ranges from 0 to 14
         return pH_value
 
+    def create_collector(self, concurrent):
+        collector = SensorCollector(concurrent=concurrent)
+        # The DHT can take a couple of seconds when it retries internally
+        collector.add_reader('dht', lambda: self.read_dht_sensor() if self.dht_connected else (None, None),
+                             timeout=3.0, default=(None, None))
+        collector.add_reader('soil_moisture', lambda: self.read_soil_moisture() if self.soil_moisture_connected else None,
+                             timeout=1.0)
+        collector.add_reader('smoke', lambda: self.read_smoke_sensor() if self.smoke_connected else None,
+                             timeout=1.0)
+        collector.add_reader('lux', lambda: self.read_lux() if self.lux_connected else None,
+                             timeout=1.0)
+        collector.add_reader('gas', self.read_gas_concentrations, timeout=1.0,
+                             default={'Alcohol': 0.0, 'Ammonia': 0.0, 'Benzene': 0.0, 'CO2': 0.0, 'Smoke': 0.0})
+        collector.add_reader('ph', self.read_ph_sensor, timeout=1.0, default=7.0)
+        return collector
+
     def get_ph_condition(self, ph_value):
         if ph_value < 7:
             return "Acidic"
@@ -122,73 +181,105 @@ class SensorApp:
         else:
             return "Basic"
 
+    def log_once(self):
+        current_time = datetime.now()
+        print(f"Current time: {current_time.isoformat()}", flush=True)
+
+        readings = self.collector.latest()
+        temperature, humidity = readings['dht']
+        soil_moisture = readings['soil_moisture']
+        smoke_detected = readings['smoke']
+        lux = readings['lux']
+
+        # Read gas concentrations
+        gas_levels = readings['gas']
+        alcohol_ppm = gas_levels['Alcohol']
+        ammonia_ppm = gas_levels['Ammonia']
+        benzene_ppm = gas_levels['Benzene']
+        co2_ppm = gas_levels['CO2']
+        smoke_ppm = gas_levels['Smoke']
+
+        # Read pH level
+        ph_value = readings['ph']
+        ph_condition = self.get_ph_condition(ph_value)
+
+        # Print the data to the console
+        print(f'Temperature: {temperature if self.dht_connected else "N/A"}°C  '
+              f'Humidity: {humidity if self.dht_connected else "N/A"}%  '
+              f'Soil Moisture: {soil_moisture if self.soil_moisture_connected else "N/A"}%  '
+              f'Smoke Detected: {"Yes" if smoke_detected else "No"}  '
+              f'Lux: {lux if self.lux_connected else "N/A"} lux  '
+              f'Alcohol: {alcohol_ppm:.2f} ppm  '
+              f'Ammonia: {ammonia_ppm:.2f} ppm  '
+              f'Benzene: {benzene_ppm:.2f} ppm  '
+              f'CO2: {co2_ppm:.2f} ppm  '
+              f'Smoke Gas: {smoke_ppm:.2f} ppm  '
+              f'pH Level: {ph_value:.2f}  '
+              f'pH Condition: {ph_condition}', flush=True)
+        print(f'Read times: {readings.format_durations()}', flush=True)
+
+        # Update the window statistics; today's window gives the daily max/min
+        self.rollup_writer.writerows(self.rollups.update({
+            'Temperature (°C)': temperature,
+            'Humidity (%)': humidity,
+            'Lux (lux)': lux,
+            'Alcohol (ppm)': alcohol_ppm,
+            'Ammonia (ppm)': ammonia_ppm,
+            'Benzene (ppm)': benzene_ppm,
+            'CO2 (ppm)': co2_ppm,
+            'Smoke (ppm)': smoke_ppm,
+            'pH Level': ph_value,
+        }, current_time))
+        today = self.rollups.tumbling('Temperature (°C)', '1day')
+
+        # Get the current timestamp
+        timestamp = current_time.isoformat()
+
+        # Write the data to the CSV file
+        self.writer.writerow({
+            'Timestamp': timestamp,
+            'Temperature (°C)': f'{temperature}' if self.dht_connected else 'N/A',
+            'Humidity (%)': f'{humidity}' if self.dht_connected else 'N/A',
+            'Max Temperature (°C)': f'{today.max:.2f}' if today.count else 'N/A',
+            'Min Temperature (°C)': f'{today.min:.2f}' if today.count else 'N/A',
+            'PKN (units)': random.uniform(0, 100),  # Simulated PKN value
+            'Soil Moisture (%)': f'{soil_moisture if self.soil_moisture_connected else "N/A"}',
+            'Smoke Detected': 'Yes' if smoke_detected else 'No',
+            'Lux (lux)': f'{lux}' if self.lux_connected else 'N/A',
+            'Alcohol (ppm)': f'{alcohol_ppm:.2f}',
+            'Ammonia (ppm)': f'{ammonia_ppm:.2f}',
+            'Benzene (ppm)': f'{benzene_ppm:.2f}',
+            'CO2 (ppm)': f'{co2_ppm:.2f}',
+            'Smoke (ppm)': f'{smoke_ppm:.2f}',
+            'pH Level': f'{ph_value:.2f}',
+            'pH Condition': ph_condition
+        })
+
+        print(f'Schedule:\n{self.scheduler.report()}', flush=True)
+        print(f'Buses: {self.buses.report()}', flush=True)
+
     def log_data(self):
-        while True:
-            current_time = datetime.now()
-            print(f"Current time: {current_time.isoformat()}", flush=True)
-
-            temperature, humidity = self.read_dht_sensor() if self.dht_connected else (None, None)
-            soil_moisture = self.read_soil_moisture() if self.soil_moisture_connected else None
-            smoke_detected = self.read_smoke_sensor() if self.smoke_connected else None
-            lux = self.read_lux() if self.lux_connected else None
-            
-            # Read gas concentrations
-            gas_levels = self.read_gas_concentrations()
-            alcohol_ppm = gas_levels['Alcohol']
-            ammonia_ppm = gas_levels['Ammonia']
-            benzene_ppm = gas_levels['Benzene']
-            co2_ppm = gas_levels['CO2']
-            smoke_ppm = gas_levels['Smoke']
-
-            # Read pH level
-            ph_value = self.read_ph_sensor()
-            ph_condition = self.get_ph_condition(ph_value)
-
-            # Print the data to the console
-            print(f'Temperature: {temperature if self.dht_connected else "N/A"}°C  '
-                  f'Humidity: {humidity if self.dht_connected else "N/A"}%  '
-                  f'Soil Moisture: {soil_moisture if self.soil_moisture_connected else "N/A"}%  '
-                  f'Smoke Detected: {"Yes" if smoke_detected else "No"}  '
-                  f'Lux: {lux if self.lux_connected else "N/A"} lux  '
-                  f'Alcohol: {alcohol_ppm:.2f} ppm  '
-                  f'Ammonia: {ammonia_ppm:.2f} ppm  '
-                  f'Benzene: {benzene_ppm:.2f} ppm  '
-                  f'CO2: {co2_ppm:.2f} ppm  '
-                  f'Smoke Gas: {smoke_ppm:.2f} ppm  '
-                  f'pH Level: {ph_value:.2f}  '
-                  f'pH Condition: {ph_condition}', flush=True)
-
-            # Get the current timestamp
-            timestamp = current_time.isoformat()
-
-            # Write the data to the CSV file
-            self.writer.writerow({
-                'Timestamp': timestamp,
-                'Temperature (°C)': f'{temperature}' if self.dht_connected else 'N/A',
-                'Humidity (%)': f'{humidity}' if self.dht_connected else 'N/A',
-                'Max Temperature (°C)': f'{self.max_temperature:.2f}',
-                'Min Temperature (°C)': f'{self.min_temperature:.2f}',
-                'PKN (units)': random.uniform(0, 100),  # Simulated PKN value
-                'Soil Moisture (%)': f'{soil_moisture if self.soil_moisture_connected else "N/A"}',
-                'Smoke Detected': 'Yes' if smoke_detected else 'No',
-                'Lux (lux)': f'{lux}' if self.lux_connected else 'N/A',
-                'Alcohol (ppm)': f'{alcohol_ppm:.2f}',
-                'Ammonia (ppm)': f'{ammonia_ppm:.2f}',
-                'Benzene (ppm)': f'{benzene_ppm:.2f}',
-                'CO2 (ppm)': f'{co2_ppm:.2f}',
-                'Smoke (ppm)': f'{smoke_ppm:.2f}',
-                'pH Level': f'{ph_value:.2f}',
-                'pH Condition': ph_condition
-            })
-
-            self.csvfile.flush()
-            time.sleep(10)  # Wait for 10 seconds before the next reading
+        # Each sensor is read on its own fixed-rate grid. The reads run on the
+        # collector's workers, not the scheduler thread, so a DHT read that
+        # retries for seconds doesn't hold up the 0.5 s gas job. Rows are
+        # logged on a fixed 10 second grid, starting one interval in so every
+        # sensor has been read.
+        for name, interval in self.SAMPLE_INTERVALS.items():
+            self.scheduler.add_job(name, interval, lambda name=name: self.collector.sample(name))
+        self.scheduler.add_job('log', self.LOG_INTERVAL, self.log_once, delay=self.LOG_INTERVAL)
+        self.scheduler.run()
 
     def close(self):
-        self.csvfile.close()
+        self.scheduler.stop()
+        self.collector.close()
+        self.writer.close()
+        self.rollup_writer.close()
+        self.buses.close()
         print("Exiting the program.")
 
 if __name__ == '__main__':
+    # Treat SIGTERM like Ctrl+C so buffered rows are written on shutdown
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
     app = SensorApp()
     try:
         app.log_data()
@@ -0,0 +1,309 @@
+import os
+import select
+import struct
+import termios
+import time
+
+
+# Modbus-RTU master for RS485 probes, on any serial device (a USB RS485
+# adapter, the Pi's UART or a pseudo terminal) through termios, so it needs
+# no serial library. Frames are slave address, function code, data and a
+# CRC16 sent low byte first; frames are separated by 3.5 character times of
+# silence.
+
+# Register map of the common RS485 soil NPK / 7 in 1 probes (JXBS-3001 and
+# its clones): name -> (holding register, decimals, signed), where the
+# register holds the value times 10 ** decimals. Every value is read in one
+# request.
+NPK_REGISTERS = {
+    'moisture': (0x0000, 1, False),     # %
+    'temperature': (0x0001, 1, True),   # C
+    'ec': (0x0002, 0, False),           # uS/cm
+    'ph': (0x0003, 1, False),
+    'nitrogen': (0x0004, 0, False),     # mg/kg
+    'phosphorus': (0x0005, 0, False),   # mg/kg
+    'potassium': (0x0006, 0, False),    # mg/kg
+}
+
+READ_HOLDING_REGISTERS = 0x03
+READ_INPUT_REGISTERS = 0x04
+
+
+class ModbusError(RuntimeError):
+    pass
+
+
+class ModbusTimeout(ModbusError):
+    pass
+
+
+class ModbusCRCError(ModbusError):
+    pass
+
+
+def _crc_table():
+    # CRC16/MODBUS: reflected polynomial 0xA001, worked out once per byte value.
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(data):
+    crc = 0xFFFF
+    table = _CRC_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def frame(slave, pdu):
+    """Add the slave address and CRC to a protocol data unit."""
+    body = bytes((slave,)) + pdu
+    return body + struct.pack('<H', crc16(body))
+
+
+def _baud_constant(baudrate):
+    try:
+        return getattr(termios, f'B{baudrate}')
+    except AttributeError:
+        raise ValueError(f'Unsupported baud rate {baudrate}') from None
+
+
+class ModbusRTU:
+    """Modbus-RTU master on the serial device port.
+
+    Requests go out as soon as the line has been quiet for the 3.5 character
+    frame gap (1.75 ms above 19200 baud, as the spec allows), and a response
+    is complete as soon as its expected length has arrived, so a poll costs
+    the wire time plus the slave's turnaround and nothing more. timeout is
+    how long a slave may take to turn around; the wire time of the request
+    and of the expected response is added to it.
+    """
+
+    def __init__(self, port, baudrate=9600, parity='N', stopbits=1, timeout=0.2):
+        if parity not in ('N', 'E', 'O'):
+            raise ValueError('Parity must be N, E or O.')
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.fd = os.open(port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            self._configure(baudrate, parity, stopbits)
+        except Exception:
+            os.close(self.fd)
+            raise
+        bits = 1 + 8 + (parity != 'N') + stopbits
+        self.char_time = bits / baudrate
+        self.frame_gap = 0.00175 if baudrate > 19200 else 3.5 * self.char_time
+        self.idle_since = 0.0  # monotonic time the line last went quiet
+
+    def _configure(self, baudrate, parity, stopbits):
+        # Raw 8 bit mode: no echo, no line editing, no flow control, and reads
+        # that return whatever has arrived.
+        speed = _baud_constant(baudrate)
+        attrs = termios.tcgetattr(self.fd)
+        attrs[0] = termios.IGNBRK
+        attrs[1] = 0
+        cflag = termios.CS8 | termios.CREAD | termios.CLOCAL
+        if parity != 'N':
+            cflag |= termios.PARENB
+        if parity == 'O':
+            cflag |= termios.PARODD
+        if stopbits == 2:
+            cflag |= termios.CSTOPB
+        attrs[2] = cflag
+        attrs[3] = 0
+        attrs[4] = attrs[5] = speed
+        attrs[6][termios.VMIN] = 0
+        attrs[6][termios.VTIME] = 0
+        termios.tcsetattr(self.fd, termios.TCSANOW, attrs)
+        termios.tcflush(self.fd, termios.TCIOFLUSH)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def transaction(self, slave, pdu, length, timeout=None):
+        """Send pdu to slave and return the response frame, which is length
+        bytes long unless the slave answers with an exception."""
+        timeout = self.timeout if timeout is None else timeout
+        request = frame(slave, pdu)
+        gap = self.idle_since + self.frame_gap - time.monotonic()
+        if gap > 0:
+            time.sleep(gap)
+        # Drop the tail of an earlier answer that came in after its timeout.
+        termios.tcflush(self.fd, termios.TCIFLUSH)
+        os.write(self.fd, request)
+        # The request is still going out while os.write returns and the
+        # response takes its own wire time, so timeout only covers turnaround.
+        deadline = time.monotonic() + (len(request) + length) * self.char_time + timeout
+        response = bytearray()
+        try:
+            while len(response) < length:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ModbusTimeout(f'Slave {slave} did not answer within {timeout * 1000:.0f} ms')
+                if select.select((self.fd,), (), (), remaining)[0]:
+                    response += os.read(self.fd, 256)
+                # An exception response is 5 bytes whatever was asked for.
+                if len(response) >= 2 and response[1] & 0x80:
+                    length = 5
+        finally:
+            self.idle_since = time.monotonic()
+        response = bytes(response[:length])
+        if crc16(response[:-2]) != struct.unpack('<H', response[-2:])[0]:
+            raise ModbusCRCError(f'Bad CRC in the answer of slave {slave}')
+        if response[0] != slave:
+            raise ModbusError(f'Asked slave {slave}, slave {response[0]} answered')
+        if response[1] & 0x80:
+            raise ModbusError(f'Slave {slave} returned exception code {response[2]}')
+        if response[1] != pdu[0]:
+            raise ModbusError(f'Slave {slave} answered function {response[1]} to function {pdu[0]}')
+        return response
+
+    def read_registers(self, slave, address, count, function=READ_HOLDING_REGISTERS, timeout=None):
+        """Read count 16 bit registers from address and return the raw
+        response data (2 * count bytes, big endian)."""
+        if not 1 <= count <= 125:
+            raise ValueError('Can read 1 to 125 registers at a time.')
+        response = self.transaction(slave, struct.pack('>BHH', function, address, count),
+                                    5 + 2 * count, timeout)
+        if response[2] != 2 * count:
+            raise ModbusError(f'Slave {slave} sent {response[2]} data bytes for {count} registers')
+        return response[3:-2]
+
+
+class ProbeStats:
+    # Polling statistics of one slave. Skipped counts polls left out while
+    # the probe was backed off after failing max_failures times in a row.
+    def __init__(self):
+        self.polls = 0
+        self.good = 0
+        self.timeouts = 0
+        self.crc_errors = 0
+        self.errors = 0
+        self.skipped = 0
+        self.failures_in_row = 0
+        self.total_latency = 0.0
+
+    @property
+    def mean_latency(self):
+        return self.total_latency / self.good if self.good else 0.0
+
+    def __repr__(self):
+        return (f'polls={self.polls} good={self.good} timeouts={self.timeouts} '
+                f'crc_errors={self.crc_errors} errors={self.errors} skipped={self.skipped} '
+                f'latency_mean={self.mean_latency * 1000:.1f}ms')
+
+
+class NPKProbe:
+    def __init__(self, slave, timeout):
+        self.slave = slave
+        self.timeout = timeout
+        self.retry_at = 0.0  # monotonic time a backed off probe is polled again
+        self.stats = ProbeStats()
+
+
+class NPKModbusReader:
+    """Polls Modbus-RTU soil NPK probes on one RS485 line.
+
+    slaves is a list of slave addresses, or a dict of slave address to that
+    probe's timeout in seconds (timeout for the rest). Every registers value
+    (NPK_REGISTERS by default) of a probe comes back in one request for the
+    register span they cover, converted to engineering units.
+
+    One RS485 line carries one transaction at a time, so probes are polled
+    back to back with only the frame gap between them. A probe that doesn't
+    answer costs its own timeout; after max_failures failures in a row it is
+    only polled again every retry_interval seconds, so a dead probe doesn't
+    slow down every cycle of the others.
+    """
+
+    def __init__(self, port, slaves, baudrate=9600, timeout=0.2, registers=None, function=READ_HOLDING_REGISTERS,
+                 max_failures=3, retry_interval=60.0, parity='N'):
+        self.bus = ModbusRTU(port, baudrate, parity=parity, timeout=timeout)
+        if not isinstance(slaves, dict):
+            slaves = {slave: timeout for slave in slaves}
+        self.probes = [NPKProbe(slave, probe_timeout) for slave, probe_timeout in slaves.items()]
+        self.function = function
+        self.max_failures = max_failures
+        self.retry_interval = retry_interval
+        registers = registers or NPK_REGISTERS
+        # One struct format for the whole span; registers not in the map are
+        # skipped as padding.
+        self.address = min(register for register, _, _ in registers.values())
+        self.count = max(register for register, _, _ in registers.values()) - self.address + 1
+        by_register = {register: (name, decimals, signed) for name, (register, decimals, signed) in registers.items()}
+        layout = '>'
+        self.fields = []
+        for register in range(self.address, self.address + self.count):
+            if register in by_register:
+                name, decimals, signed = by_register[register]
+                layout += 'h' if signed else 'H'
+                self.fields.append((name, 10 ** decimals))
+            else:
+                layout += '2x'
+        self.layout = struct.Struct(layout)
+
+    def close(self):
+        self.bus.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read(self, slave, timeout=None):
+        """Read one probe now and return its values as a dict."""
+        data = self.bus.read_registers(slave, self.address, self.count, self.function, timeout)
+        return {name: value / divisor for (name, divisor), value in zip(self.fields, self.layout.unpack(data))}
+
+    def poll(self):
+        """Read every probe once and return {slave: values}, with None for
+        probes that failed or are backed off."""
+        results = {}
+        for probe in self.probes:
+            stats = probe.stats
+            now = time.monotonic()
+            if probe.retry_at > now:
+                stats.skipped += 1
+                results[probe.slave] = None
+                continue
+            stats.polls += 1
+            try:
+                results[probe.slave] = self.read(probe.slave, probe.timeout)
+            except ModbusError as e:
+                if isinstance(e, ModbusTimeout):
+                    stats.timeouts += 1
+                elif isinstance(e, ModbusCRCError):
+                    stats.crc_errors += 1
+                else:
+                    stats.errors += 1
+                stats.failures_in_row += 1
+                if stats.failures_in_row >= self.max_failures:
+                    probe.retry_at = time.monotonic() + self.retry_interval
+                results[probe.slave] = None
+                continue
+            stats.good += 1
+            stats.failures_in_row = 0
+            stats.total_latency += time.monotonic() - now
+            probe.retry_at = 0.0
+        return results
+
+    def report(self):
+        return '\n'.join(f'slave {probe.slave}: {probe.stats}' for probe in self.probes)
@@ -0,0 +1,215 @@
+import csv
+import json
+import os
+from datetime import datetime
+
+from csv_writer import BufferedCSVWriter, format_rows, open_for_append
+
+
+INDEX_FILE = 'index.json'
+
+# strftime patterns naming the partition a timestamp falls into.
+PERIODS = {
+    'hour': '%Y-%m-%dT%H',
+    'day': '%Y-%m-%d',
+    'month': '%Y-%m',
+}
+
+
+def _parse_time(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def scan_partition(path, time_field='Timestamp'):
+    # Rebuild the index entry of one partition from its contents.
+    entry = {'file': os.path.basename(path), 'rows': 0, 'first': None, 'last': None,
+             'data_offset': 0, 'end_offset': 0}
+    with open(path, 'rb') as infile:
+        header = infile.readline()
+        entry['data_offset'] = len(header)
+        offset = len(header)
+        fields = next(csv.reader([header.decode('utf-8')]), [])
+        column = fields.index(time_field) if time_field in fields else 0
+        for line in infile:
+            if not line.endswith(b'\n'):
+                break  # torn last line, ignored until the writer trims it
+            offset += len(line)
+            if not line.strip():
+                continue
+            timestamp = next(csv.reader([line.decode('utf-8')]))[column]
+            if entry['first'] is None:
+                entry['first'] = timestamp
+            entry['last'] = timestamp
+            entry['rows'] += 1
+        entry['end_offset'] = offset
+    return entry
+
+
+class PartitionIndex:
+    """Index of the partitions in a log directory: the time range, row count
+    and byte offsets (start of data, end of committed data) of each file.
+    """
+
+    def __init__(self, directory, prefix='sensorData', time_field='Timestamp'):
+        self.directory = directory
+        self.prefix = prefix
+        self.time_field = time_field
+        self.partitions = {}  # partition key -> index entry
+        self.load()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def key_for_file(self, name):
+        return name[len(self.prefix) + 1:-len('.csv')]
+
+    def load(self):
+        try:
+            with open(self.path(INDEX_FILE)) as infile:
+                self.partitions = json.load(infile)['partitions']
+        except (FileNotFoundError, ValueError, KeyError):
+            self.partitions = {}
+        # Rescan partitions the index doesn't know about or whose size no
+        # longer matches (a crash between a write and the index update), and
+        # drop entries whose file has been deleted (old partitions pruned by
+        # hand). Anything else is trusted without opening the file.
+        changed = False
+        found = set()
+        if os.path.isdir(self.directory):
+            for name in sorted(os.listdir(self.directory)):
+                if not (name.startswith(self.prefix + '-') and name.endswith('.csv')):
+                    continue
+                key = self.key_for_file(name)
+                found.add(key)
+                entry = self.partitions.get(key)
+                if entry is None or entry['end_offset'] != os.path.getsize(self.path(name)):
+                    self.partitions[key] = scan_partition(self.path(name), self.time_field)
+                    changed = True
+        for key in set(self.partitions) - found:
+            del self.partitions[key]
+            changed = True
+        if changed:
+            self.save()
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.path(INDEX_FILE + '.tmp')
+        with open(tmp, 'w') as outfile:
+            json.dump({'partitions': self.partitions}, outfile, indent=1, sort_keys=True)
+        os.replace(tmp, self.path(INDEX_FILE))
+
+    def partitions_for(self, start=None, end=None):
+        # Index entries whose time range overlaps [start, end], oldest first.
+        start = _parse_time(start) if start is not None else None
+        end = _parse_time(end) if end is not None else None
+        selected = []
+        for key in sorted(self.partitions):
+            entry = self.partitions[key]
+            if not entry['rows']:
+                continue
+            if start is not None and _parse_time(entry['last']) < start:
+                continue
+            if end is not None and _parse_time(entry['first']) > end:
+                continue
+            selected.append(entry)
+        return selected
+
+    def read_range(self, start=None, end=None):
+        """Yield the rows with start <= timestamp <= end as dicts, opening
+        only the partitions that overlap the range."""
+        start = _parse_time(start) if start is not None else None
+        end = _parse_time(end) if end is not None else None
+        for entry in self.partitions_for(start, end):
+            inside = ((start is None or _parse_time(entry['first']) >= start) and
+                      (end is None or _parse_time(entry['last']) <= end))
+            with open(self.path(entry['file']), newline='', encoding='utf-8') as infile:
+                reader = csv.DictReader(infile)
+                for row in reader:
+                    if not row.get(self.time_field):
+                        continue
+                    if not inside:
+                        timestamp = _parse_time(row[self.time_field])
+                        if (start is not None and timestamp < start) or (end is not None and timestamp > end):
+                            continue
+                    yield row
+
+
+class PartitionedCSVWriter(BufferedCSVWriter):
+    """Buffered CSV writer that splits rows into one file per period
+    (sensorData-2024-10-09.csv for period='day') inside directory and keeps
+    index.json up to date after each commit. Existing files are appended to,
+    so restarts never lose history.
+    """
+
+    def __init__(self, directory, fieldnames, period='day', prefix='sensorData',
+                 time_field='Timestamp', **kwargs):
+        if period not in PERIODS:
+            raise ValueError(f'Period must be one of {", ".join(PERIODS)}')
+        self.period = period
+        self.prefix = prefix
+        self.time_field = time_field
+        super().__init__(directory, fieldnames, **kwargs)
+
+    def _open(self):
+        os.makedirs(self.path, exist_ok=True)
+        self.index = PartitionIndex(self.path, self.prefix, self.time_field)
+        self.files = {}  # partition key -> open file
+
+    def last_timestamp(self):
+        # Newest committed timestamp, or None for an empty log.
+        lasts = [_parse_time(entry['last']) for entry in self.index.partitions.values() if entry['last']]
+        return max(lasts) if lasts else None
+
+    def _close_files(self):
+        for file in self.files.values():
+            file.close()
+        self.files.clear()
+
+    def _sync_files(self):
+        for file in self.files.values():
+            os.fsync(file.fileno())
+
+    def _partition_file(self, key):
+        file = self.files.get(key)
+        if file is None:
+            name = f'{self.prefix}-{key}.csv'
+            file = open_for_append(os.path.join(self.path, name), self.fieldnames)
+            self.files[key] = file
+            # Keep only the current partitions open; a closed partition is
+            # synced first, as sync() only reaches the open ones.
+            for old in sorted(self.files)[:-2]:
+                old_file = self.files.pop(old)
+                if not self.fsync:
+                    os.fsync(old_file.fileno())
+                old_file.close()
+            entry = self.index.partitions.get(key)
+            if entry is None or entry['end_offset'] != file.tell():
+                file.flush()
+                self.index.partitions[key] = scan_partition(os.path.join(self.path, name), self.time_field)
+        return file
+
+    def _commit(self, rows):
+        groups = {}
+        for row in rows:
+            timestamp = row[self.time_field]
+            key = _parse_time(timestamp).strftime(PERIODS[self.period])
+            groups.setdefault(key, []).append(row)
+
+        for key, group in groups.items():
+            file = self._partition_file(key)
+            file.write(format_rows(self.fieldnames, group))
+            file.flush()
+            if self.fsync:
+                os.fsync(file.fileno())
+            entry = self.index.partitions[key]
+            first = str(group[0][self.time_field])
+            if entry['first'] is None or first < entry['first']:
+                entry['first'] = first
+            last = str(group[-1][self.time_field])
+            if entry['last'] is None or last > entry['last']:
+                entry['last'] = last
+            entry['rows'] += len(group)
+            entry['end_offset'] = file.tell()
+        self.index.save()
@@ -0,0 +1,220 @@
+import math
+from datetime import datetime, timedelta
+
+
+# Window lengths in seconds. Windows are aligned to the local wall clock, so
+# '1day' runs from midnight to midnight.
+WINDOWS = {
+    '1min': 60,
+    '1h': 3600,
+    '1day': 86400,
+}
+
+ROLLUP_FIELDS = ['Start', 'End', 'Window', 'Channel', 'Count', 'Min', 'Max', 'Mean', 'Stddev']
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _seconds(timestamp):
+    # Local wall-clock seconds since 1970 for a datetime, ISO string or number.
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if isinstance(timestamp, datetime):
+        return (timestamp.replace(tzinfo=None) - _EPOCH).total_seconds()
+    return float(timestamp)
+
+
+def _datetime(seconds):
+    return _EPOCH + timedelta(seconds=seconds)
+
+
+class Stats:
+    """Running count, min, max, mean and standard deviation of a stream of
+    values in constant memory (Welford's algorithm)."""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        # Combine two disjoint sets of values (Chan et al.).
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def stddev(self):
+        # Sample standard deviation; 0.0 for fewer than two values.
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self.m2 / (self.count - 1))
+
+    def __repr__(self):
+        if not self.count:
+            return 'count=0'
+        return (f'count={self.count} min={self.min:.2f} max={self.max:.2f} '
+                f'mean={self.mean:.2f} stddev={self.stddev:.2f}')
+
+
+class TumblingWindow:
+    """Statistics over consecutive, non-overlapping windows of length
+    seconds. Only the open window is kept."""
+
+    def __init__(self, length):
+        self.length = length
+        self.start = None
+        self.stats = Stats()
+
+    def advance(self, t):
+        # Close the open window if t lies past its end; returns
+        # (start, stats) of the closed window or None.
+        start = math.floor(t / self.length) * self.length
+        if self.start is None:
+            self.start = start
+            return None
+        if start <= self.start:
+            return None
+        closed = (self.start, self.stats)
+        self.start = start
+        self.stats = Stats()
+        return closed if closed[1].count else None
+
+    def add(self, t, value):
+        closed = self.advance(t)
+        self.stats.add(value)
+        return closed
+
+
+class SlidingWindow:
+    """Statistics over the last length seconds, updated as values arrive.
+
+    The window is split into slots sub-windows kept in a ring, so memory is
+    fixed and the window slides in steps of length / slots seconds.
+    """
+
+    def __init__(self, length, slots=60):
+        self.length = length
+        self.slots = slots
+        self.step = length / slots
+        self.ring = [None] * slots  # (slot number, Stats) per ring position
+
+    def add(self, t, value):
+        number = math.floor(t / self.step)
+        index = number % self.slots
+        entry = self.ring[index]
+        if entry is None or entry[0] != number:
+            entry = (number, Stats())
+            self.ring[index] = entry
+        entry[1].add(value)
+
+    def stats(self, t):
+        # Statistics of the values in the slots covering (t - length, t].
+        newest = math.floor(t / self.step)
+        total = Stats()
+        for entry in self.ring:
+            if entry is not None and newest - self.slots < entry[0] <= newest:
+                total.merge(entry[1])
+        return total
+
+
+class RollupEngine:
+    """Tumbling and sliding window statistics for every channel.
+
+    update() takes one sample of all channels and returns a rollup row
+    (ROLLUP_FIELDS) for each tumbling window that the sample closed, ready
+    for a CSV writer. tumbling() gives the window still being filled, for
+    example today's min/max, and sliding() the trailing window ending now.
+    State lives in memory; after a restart the open windows start empty.
+    """
+
+    def __init__(self, channels=None, windows=WINDOWS, sliding=True, slots=60):
+        self.windows = dict(windows)
+        self.channels = {}
+        self.use_sliding = sliding
+        self.slots = slots
+        for channel in channels or []:
+            self._channel(channel)
+
+    def _channel(self, channel):
+        windows = self.channels.get(channel)
+        if windows is None:
+            windows = {}
+            for name, length in self.windows.items():
+                sliding = SlidingWindow(length, self.slots) if self.use_sliding else None
+                windows[name] = (TumblingWindow(length), sliding)
+            self.channels[channel] = windows
+        return windows
+
+    def update(self, values, timestamp):
+        """Add {channel: value} taken at timestamp. None, NaN and values
+        that are not numbers are skipped."""
+        t = _seconds(timestamp)
+        rows = self.advance(t)
+        for channel, value in values.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or math.isnan(value):
+                continue
+            for tumbling, sliding in self._channel(channel).values():
+                tumbling.add(t, value)
+                if sliding is not None:
+                    sliding.add(t, value)
+        return rows
+
+    def advance(self, timestamp):
+        # Close every window that ends at or before timestamp, including
+        # those of channels that had no valid value lately.
+        t = _seconds(timestamp)
+        rows = []
+        for channel, windows in self.channels.items():
+            for name, (tumbling, _) in windows.items():
+                closed = tumbling.advance(t)
+                if closed is not None:
+                    rows.append(self._row(channel, name, *closed))
+        return rows
+
+    def _row(self, channel, window, start, stats):
+        return {
+            'Start': _datetime(start).isoformat(),
+            'End': _datetime(start + self.windows[window]).isoformat(),
+            'Window': window,
+            'Channel': channel,
+            'Count': stats.count,
+            'Min': f'{stats.min:.2f}',
+            'Max': f'{stats.max:.2f}',
+            'Mean': f'{stats.mean:.2f}',
+            'Stddev': f'{stats.stddev:.2f}',
+        }
+
+    def tumbling(self, channel, window):
+        # Stats of the open window; empty before the first value.
+        return self._channel(channel)[window][0].stats
+
+    def sliding(self, channel, window, timestamp):
+        sliding = self._channel(channel)[window][1]
+        if sliding is None:
+            raise ValueError('Sliding windows are disabled')
+        return sliding.stats(_seconds(timestamp))
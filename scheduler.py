@@ -0,0 +1,163 @@
+import heapq
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+class JobStats:
+    # Timing statistics for one scheduled job. Lateness is how long after its
+    # deadline the job actually started; missed counts deadlines that were
+    # skipped because the previous run overran them.
+    def __init__(self):
+        self.runs = 0
+        self.missed = 0
+        self.errors = 0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+        self.last_lateness = 0.0
+
+    def record(self, lateness):
+        self.runs += 1
+        self.last_lateness = lateness
+        self.total_lateness += lateness
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+
+    @property
+    def mean_lateness(self):
+        return self.total_lateness / self.runs if self.runs else 0.0
+
+    def __repr__(self):
+        return (f'runs={self.runs} missed={self.missed} errors={self.errors} '
+                f'jitter_mean={self.mean_lateness * 1000:.2f}ms '
+                f'jitter_max={self.max_lateness * 1000:.2f}ms')
+
+
+class Job:
+    def __init__(self, name, func, interval=None, hours=None, minute=0, delay=0.0):
+        self.name = name
+        self.func = func
+        self.interval = interval  # seconds between runs, for fixed-rate jobs
+        self.hours = hours  # wall-clock hours of the day, for calendar jobs
+        self.minute = minute
+        self.delay = delay  # seconds before the first run, for fixed-rate jobs
+        self.slot = None  # wall-clock slot of the pending deadline, for calendar jobs
+        self.origin = None  # monotonic time of the first deadline
+        self.index = 0  # number of intervals since origin
+        self.deadline = None
+        self.stats = JobStats()
+
+    def first_deadline(self, now):
+        if self.interval is not None:
+            self.origin = now + self.delay
+            self.index = 0
+            return self.origin
+        return self.next_calendar_deadline(now)
+
+    def next_deadline(self, now):
+        if self.interval is None:
+            return self.next_calendar_deadline(now)
+        # Deadlines always sit on the grid origin + k * interval, so run time
+        # and sleep overshoot never accumulate into drift.
+        self.index += 1
+        deadline = self.origin + self.index * self.interval
+        if deadline < now:
+            # We overran one or more slots; skip them instead of firing a burst.
+            # A slot exactly at now is still on time, not missed.
+            behind = math.ceil((now - deadline) / self.interval)
+            self.stats.missed += behind
+            self.index += behind
+            deadline = self.origin + self.index * self.interval
+        return deadline
+
+    def next_calendar_deadline(self, now):
+        # Find the next wall-clock slot and convert the distance to it onto the
+        # monotonic clock so clock adjustments don't fire the job twice. Slots
+        # are counted from the last one scheduled as well as from the wall
+        # clock, so an NTP step back can't bring a slot that already fired
+        # round again.
+        wall = datetime.now()
+        after = wall if self.slot is None else max(wall, self.slot)
+        candidates = []
+        for day in (0, 1):
+            base = (after + timedelta(days=day)).replace(minute=self.minute, second=0, microsecond=0)
+            for hour in self.hours:
+                slot = base.replace(hour=hour)
+                if slot > after:
+                    candidates.append(slot)
+        self.slot = min(candidates)
+        return now + (self.slot - wall).total_seconds()
+
+
+class FixedRateScheduler:
+    """Run jobs on fixed deadlines measured with the monotonic clock.
+
+    Each job has its own interval (for example gas every 0.5 s, soil moisture
+    every 1 s, DHT every 2 s and lux every 10 s) or a list of wall-clock hours
+    such as the 8/12/20 h readings. Jobs run in the scheduler thread, in
+    deadline order, and their lateness is kept in ``stats(name)``.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.jobs = {}
+        self.queue = []
+        self.stop_event = threading.Event()
+
+    def add_job(self, name, interval, func, delay=0.0):
+        if interval <= 0:
+            raise ValueError('Interval must be greater than zero.')
+        if delay < 0:
+            raise ValueError('Delay must not be negative.')
+        self._add(Job(name, func, interval=interval, delay=delay))
+
+    def add_calendar_job(self, name, hours, func, minute=0):
+        if not hours or any(hour < 0 or hour > 23 for hour in hours):
+            raise ValueError('Hours must be a list of values from 0 to 23.')
+        self._add(Job(name, func, hours=sorted(hours), minute=minute))
+
+    def _add(self, job):
+        if job.name in self.jobs:
+            raise ValueError(f'Job {job.name} is already scheduled.')
+        self.jobs[job.name] = job
+        job.deadline = job.first_deadline(self.clock())
+        heapq.heappush(self.queue, (job.deadline, job.name))
+
+    def stats(self, name):
+        return self.jobs[name].stats
+
+    def report(self):
+        return '\n'.join(f'{name}: {job.stats}' for name, job in self.jobs.items())
+
+    def run_pending(self):
+        # Run every job whose deadline has passed and return the time until the
+        # next deadline.
+        while self.queue:
+            deadline, name = self.queue[0]
+            now = self.clock()
+            if deadline > now:
+                return deadline - now
+            heapq.heappop(self.queue)
+            job = self.jobs[name]
+            job.stats.record(now - deadline)
+            try:
+                job.func()
+            except Exception as e:
+                job.stats.errors += 1
+                print(f'Scheduled job {name} failed: {e}', flush=True)
+            job.deadline = job.next_deadline(self.clock())
+            heapq.heappush(self.queue, (job.deadline, name))
+        return None
+
+    def run(self):
+        self.stop_event.clear()
+        while not self.stop_event.is_set():
+            wait = self.run_pending()
+            if wait is None:
+                break
+            # Event.wait lets stop() interrupt the sleep immediately.
+            self.stop_event.wait(wait)
+
+    def stop(self):
+        self.stop_event.set()
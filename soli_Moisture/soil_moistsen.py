@@ -1,5 +1,12 @@
-import RPi.GPIO as GPIO
-import time
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hardware import get_backend
+from scheduler import FixedRateScheduler
+
+# RPi.GPIO on the Pi, a simulated stand-in with AGRO_BACKEND=sim
+GPIO = get_backend().gpio()
 
 # Set the GPIO pin for the digital sensor
 MOISTURE_SENSOR_PIN = 17
@@ -8,18 +15,23 @@ MOISTURE_SENSOR_PIN = 17
 GPIO.setmode(GPIO.BCM)
 GPIO.setup(MOISTURE_SENSOR_PIN, GPIO.IN)
 
-try:
-    while True:
-        # Read the moisture level
-        if GPIO.input(MOISTURE_SENSOR_PIN):
-            print("Soil is wet!")
-        else:
-            print("Soil is dry!")
+def read_moisture():
+    # Read the moisture level
+    if GPIO.input(MOISTURE_SENSOR_PIN):
+        print("Soil is wet!")
+    else:
+        print("Soil is dry!")
 
-        time.sleep(1)  # Wait for a second before reading again
+# Read once a second on a fixed grid
+scheduler = FixedRateScheduler()
+scheduler.add_job('soil_moisture', 1.0, read_moisture)
+
+try:
+    scheduler.run()
 
 except KeyboardInterrupt:
     print("Program stopped.")
+    print(scheduler.report())
 
 finally:
     GPIO.cleanup()  # Clean up GPIO settings
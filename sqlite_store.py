@@ -0,0 +1,161 @@
+import os
+import sqlite3
+
+from columnar import MISSING, from_epoch_ns, to_epoch_ns
+
+
+# Narrow layout: one row per (sensor, timestamp) reading. Numeric and yes/no
+# readings go in value, text readings such as 'pH Condition' in label.
+# Missing readings are not stored.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sensors (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS readings (
+    sensor_id INTEGER NOT NULL REFERENCES sensors(id),
+    ts INTEGER NOT NULL,
+    value REAL,
+    label TEXT
+);
+CREATE INDEX IF NOT EXISTS readings_sensor_ts ON readings (sensor_id, ts);
+CREATE INDEX IF NOT EXISTS readings_ts ON readings (ts);
+"""
+
+INSERT = 'INSERT INTO readings (sensor_id, ts, value, label) VALUES (?, ?, ?, ?)'
+
+
+def _cell(value):
+    # Return (value, label) for one logged cell, or None when it is missing.
+    if isinstance(value, str):
+        value = value.strip()
+        if value in MISSING:
+            return None
+        if value in ('Yes', 'True'):
+            return 1.0, None
+        if value in ('No', 'False'):
+            return 0.0, None
+        try:
+            return float(value), None
+        except ValueError:
+            return None, value
+    if value is None:
+        return None
+    return float(value), None
+
+
+def connect(path):
+    connection = sqlite3.connect(path)
+    # WAL lets analysts read while the logger writes. NORMAL sync avoids an
+    # fsync per transaction; in WAL mode it never corrupts the database, but
+    # a power cut can lose the last transactions (SQLiteWriter.sync() forces
+    # them to disk).
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class SQLiteWriter:
+    """Store logger rows in a SQLite database.
+
+    Rows are buffered and inserted batch_rows at a time with one prepared
+    INSERT executed for the whole batch inside a single transaction.
+    """
+
+    def __init__(self, path, fieldnames, time_field='Timestamp', batch_rows=60):
+        self.path = path
+        self.time_field = time_field
+        self.batch_rows = batch_rows
+        self.connection = connect(path)
+        self.fields = [f for f in fieldnames if f != time_field]
+        self.sensor_ids = {}
+        with self.connection:
+            for name in self.fields:
+                self.connection.execute('INSERT OR IGNORE INTO sensors (name) VALUES (?)', (name,))
+        for sensor_id, name in self.connection.execute('SELECT id, name FROM sensors'):
+            self.sensor_ids[name] = sensor_id
+        self.pending = []
+        self.rows = 0
+
+    def writerow(self, row):
+        ts = to_epoch_ns(row[self.time_field])
+        for name in self.fields:
+            cell = _cell(row.get(name))
+            if cell is not None:
+                self.pending.append((self.sensor_ids[name], ts, cell[0], cell[1]))
+        self.rows += 1
+        if self.rows % self.batch_rows == 0:
+            self.flush()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.connection:
+            self.connection.executemany(INSERT, self.pending)
+        self.pending = []
+
+    def sync(self):
+        # flush(), then force the transactions that NORMAL sync left in the
+        # WAL file to disk.
+        self.flush()
+        for path in (self.path + '-wal', self.path):
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    os.fsync(f.fileno())
+
+    def last_timestamp(self):
+        ts = self.connection.execute('SELECT MAX(ts) FROM readings').fetchone()[0]
+        return from_epoch_ns(ts) if ts is not None else None
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteStore:
+    """Read-side query API over a database written by SQLiteWriter.
+
+    Timestamps are returned as naive local datetimes; start and end accept
+    datetimes or ISO strings.
+    """
+
+    def __init__(self, path):
+        self.connection = connect(path)
+
+    def sensors(self):
+        return [name for (name,) in self.connection.execute('SELECT name FROM sensors ORDER BY id')]
+
+    def range(self, sensor, start=None, end=None):
+        # [(timestamp, value or label)] for one sensor, oldest first.
+        low = to_epoch_ns(start) if start is not None else -(1 << 63)
+        high = to_epoch_ns(end) if end is not None else (1 << 63) - 1
+        cursor = self.connection.execute(
+            'SELECT r.ts, r.value, r.label FROM readings r JOIN sensors s ON s.id = r.sensor_id '
+            'WHERE s.name = ? AND r.ts BETWEEN ? AND ? ORDER BY r.ts', (sensor, low, high))
+        return [(from_epoch_ns(ts), label if value is None else value) for ts, value, label in cursor]
+
+    def latest(self, sensor):
+        # (timestamp, value or label) of the newest reading, or None.
+        row = self.connection.execute(
+            'SELECT r.ts, r.value, r.label FROM readings r JOIN sensors s ON s.id = r.sensor_id '
+            'WHERE s.name = ? ORDER BY r.ts DESC LIMIT 1', (sensor,)).fetchone()
+        if row is None:
+            return None
+        return from_epoch_ns(row[0]), row[2] if row[1] is None else row[1]
+
+    def latest_all(self):
+        return {name: self.latest(name) for name in self.sensors()}
+
+    def close(self):
+        self.connection.close()
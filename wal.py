@@ -0,0 +1,256 @@
+import json
+import os
+import struct
+import zlib
+from datetime import datetime
+
+
+# Record framing: little-endian u32 payload length, u32 CRC-32 of the payload,
+# then the payload (one JSON-encoded row).
+HEADER = struct.Struct('<II')
+MAX_RECORD = 1 << 20  # anything longer is garbage from a torn header
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+class WriteAheadLog:
+    """Append-only log of checksummed, length-prefixed records.
+
+    Records are split over numbered segment files. After every commit the
+    committed end is recorded in checkpoint.json, so opening the log only
+    verifies the records written after the last checkpoint and truncates the
+    tail at the first torn or corrupt record. Recovery therefore reads the
+    unverified tail, not the whole log.
+    """
+
+    def __init__(self, directory, segment_size=4 << 20, sync=True):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.sync = sync
+        self.pending = []
+        self.scanned_bytes = 0  # bytes verified during recovery
+        self.truncated_bytes = 0  # bytes dropped during recovery
+        os.makedirs(directory, exist_ok=True)
+
+        self.checkpoint = self._load_checkpoint()
+        segments = self.segments()
+        self.segment = segments[-1] if segments else 1
+        self.file = open(self._segment_path(self.segment), 'ab')
+        self._recover()
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f'wal-{number:06d}.log')
+
+    def segments(self):
+        numbers = []
+        for name in os.listdir(self.directory):
+            if name.startswith('wal-') and name.endswith('.log'):
+                numbers.append(int(name[4:-4]))
+        return sorted(numbers)
+
+    def _load_checkpoint(self):
+        try:
+            with open(os.path.join(self.directory, CHECKPOINT_FILE)) as infile:
+                return json.load(infile)
+        except (FileNotFoundError, ValueError):
+            return {'segment': 0, 'committed': 0, 'applied_segment': 0, 'applied': 0}
+
+    def _save_checkpoint(self):
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        with open(path + '.tmp', 'w') as outfile:
+            json.dump(self.checkpoint, outfile)
+            if self.sync:
+                outfile.flush()
+                os.fsync(outfile.fileno())
+        os.replace(path + '.tmp', path)
+
+    def _recover(self):
+        size = self.file.tell()
+        start = 0
+        if self.checkpoint['segment'] == self.segment and self.checkpoint['committed'] <= size:
+            start = self.checkpoint['committed']
+        good = start
+        with open(self._segment_path(self.segment), 'rb') as infile:
+            infile.seek(start)
+            for end, _ in self._read_records(infile, start):
+                good = end
+        self.scanned_bytes = size - start
+        if good < size:
+            self.truncated_bytes = size - good
+            self.file.truncate(good)
+            self.file.seek(good)
+            if self.sync:
+                os.fsync(self.file.fileno())
+        self.checkpoint['segment'] = self.segment
+        self.checkpoint['committed'] = good
+        self._save_checkpoint()
+
+    @staticmethod
+    def _read_records(infile, offset):
+        # Yield (end offset, payload) for each valid record, stopping at the
+        # first short or corrupt one.
+        while True:
+            header = infile.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            length, crc = HEADER.unpack(header)
+            if length > MAX_RECORD:
+                return
+            payload = infile.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            offset += HEADER.size + length
+            yield offset, payload
+
+    @property
+    def position(self):
+        # (segment, offset) just past the last committed record.
+        return self.checkpoint['segment'], self.checkpoint['committed']
+
+    def append(self, record):
+        payload = json.dumps(record, separators=(',', ':'), default=str).encode('utf-8')
+        self.pending.append(HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+
+    def commit(self):
+        # Write every appended record in one go and make it durable.
+        if not self.pending:
+            return self.position
+        if self.file.tell() >= self.segment_size:
+            self._roll()
+        self.file.write(b''.join(self.pending))
+        self.file.flush()
+        if self.sync:
+            os.fsync(self.file.fileno())
+        self.pending = []
+        self.checkpoint['segment'] = self.segment
+        self.checkpoint['committed'] = self.file.tell()
+        self._save_checkpoint()
+        return self.position
+
+    def _roll(self):
+        self.file.close()
+        self.segment += 1
+        self.file = open(self._segment_path(self.segment), 'ab')
+
+    def replay(self, start=None):
+        """Yield (position, record) for committed records after start, which
+        defaults to the last position passed to mark_applied()."""
+        if start is None:
+            start = (self.checkpoint['applied_segment'], self.checkpoint['applied'])
+        for number in self.segments():
+            if number < start[0]:
+                continue
+            offset = start[1] if number == start[0] else 0
+            end = self.checkpoint['committed'] if number == self.segment else None
+            with open(self._segment_path(number), 'rb') as infile:
+                infile.seek(offset)
+                for position, payload in self._read_records(infile, offset):
+                    if end is not None and position > end:
+                        return
+                    yield (number, position), json.loads(payload)
+
+    def mark_applied(self, position):
+        # Records up to position are safely stored elsewhere; segments that
+        # hold only applied records are deleted.
+        self.checkpoint['applied_segment'], self.checkpoint['applied'] = position
+        self._save_checkpoint()
+        for number in self.segments():
+            if number < position[0]:
+                os.remove(self._segment_path(number))
+
+    def close(self):
+        self.commit()
+        self.file.close()
+
+
+class DurableWriter:
+    """Put a write-ahead log in front of a row sink (any writer with
+    writerow/flush/close, such as PartitionedCSVWriter or ColumnarWriter).
+
+    Every commit_rows rows are committed to the log before being handed to
+    the sink. Every apply_rows rows the sink is synced to disk with its
+    sync() and the log marked applied up to that point. A sink without sync()
+    is only flushed, and the mark then stays one apply interval behind, so
+    rows it may still hold in the page cache are kept in the log.
+
+    On start-up, rows that reached the log but not the sink are replayed into
+    it; rows the sink already holds (timestamp not after
+    sink.last_timestamp()) are skipped.
+
+    Rows not yet committed to the log are lost on a crash or power cut, so at
+    most commit_rows - 1 rows; commit_rows=1 costs an fsync per row.
+    """
+
+    def __init__(self, sink, directory, commit_rows=1, apply_rows=60, time_field='Timestamp', sync=True):
+        self.sink = sink
+        self.commit_rows = commit_rows
+        self.apply_rows = apply_rows
+        self.time_field = time_field
+        self.wal = WriteAheadLog(directory, sync=sync)
+        self.pending = []
+        self.unapplied = 0
+        self.flushed = None  # position flushed to a sink without sync()
+        self.replayed = self._replay()
+
+    def _replay(self):
+        last = self.sink.last_timestamp() if hasattr(self.sink, 'last_timestamp') else None
+        count = 0
+        position = None
+        for position, row in self.wal.replay():
+            timestamp = row.get(self.time_field)
+            if last is not None and timestamp is not None and datetime.fromisoformat(timestamp) <= last:
+                continue
+            self.sink.writerow(row)
+            count += 1
+        if position is not None:
+            self._store(position)
+        return count
+
+    def writerow(self, row):
+        self.wal.append(row)
+        self.pending.append(row)
+        if len(self.pending) >= self.commit_rows:
+            self.commit()
+
+    def commit(self):
+        position = self.wal.commit()
+        for row in self.pending:
+            self.sink.writerow(row)
+        self.unapplied += len(self.pending)
+        self.pending = []
+        if self.unapplied >= self.apply_rows:
+            self.apply(position)
+
+    def apply(self, position=None):
+        if position is None:
+            position = self.wal.position
+        self._store(position)
+        self.unapplied = 0
+
+    def _store(self, position):
+        # Mark the log applied up to position once the sink's copy is durable.
+        if hasattr(self.sink, 'sync'):
+            self.sink.sync()
+            self.wal.mark_applied(position)
+            return
+        self.sink.flush()
+        if self.flushed is not None:
+            self.wal.mark_applied(self.flushed)
+        self.flushed = position
+
+    def flush(self):
+        self.commit()
+        self.apply()
+
+    def last_timestamp(self):
+        return self.sink.last_timestamp() if hasattr(self.sink, 'last_timestamp') else None
+
+    def close(self):
+        self.flush()
+        self.sink.close()
+        self.wal.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()